@@ -0,0 +1,140 @@
+# app/admission.py
+import math
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from fastapi import HTTPException
+
+# Commands that stop or reset the machine are never delayed or rejected.
+PRIORITY_COMMANDS = {"M112", "FIRMWARE_RESTART", "RESTART", "CANCEL_PRINT", "CANCEL_PROGRAM"}
+
+REASON_RATE_LIMITED = "rate_limited"
+REASON_OVERLOADED = "overloaded"
+
+
+def is_priority_script(script: str) -> bool:
+    """True for a single-line emergency/cancel command (e.g. `M112`)."""
+    lines = [line for line in script.strip().splitlines() if line.strip()]
+    return len(lines) == 1 and lines[0].split()[0].upper() in PRIORITY_COMMANDS
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+        message = "Too many G-code commands, slow down." if reason == REASON_RATE_LIMITED \
+            else "Klipper G-code queue is busy, try again later."
+        super().__init__(message)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Takes one token; returns 0 on success or the seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.:
+            self.tokens -= 1.
+            return 0.
+        return (1. - self.tokens) / self.rate
+
+
+class GcodeAdmission:
+    """
+    Admission control for G-code scripts sent to Klipper's single G-code queue.
+
+    Every client (by host) gets a token bucket of `rate` scripts per second with
+    bursts up to `burst`; on top of that at most `max_in_flight` scripts may be
+    waiting for Klipper at once. Anything over the limits is rejected at once
+    instead of being queued, so a stuck client cannot delay the oven timer.
+    Emergency and cancel commands bypass both limits.
+    """
+
+    def __init__(self, rate: float, burst: float, max_in_flight: int, max_clients: int = 256):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.accepted: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        self.priority = 0
+
+    def _bucket(self, client: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket
+
+    def acquire(self, client: str, script: str, source: str = "http") -> None:
+        """Admits one script or raises `AdmissionRejected`. Call `release()` once it is done."""
+        if is_priority_script(script):
+            self.priority += 1
+        else:
+            if self.in_flight >= self.max_in_flight:
+                self._reject(source, REASON_OVERLOADED)
+                raise AdmissionRejected(REASON_OVERLOADED, 1.)
+            now = time.monotonic()
+            wait = self._bucket(client, now).take(now)
+            if wait:
+                self._reject(source, REASON_RATE_LIMITED)
+                raise AdmissionRejected(REASON_RATE_LIMITED, wait)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.accepted[source] = self.accepted.get(source, 0) + 1
+
+    def release(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def _reject(self, source: str, reason: str) -> None:
+        key = f"{source}:{reason}"
+        self.rejected[key] = self.rejected.get(key, 0) + 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "limits": {"rate_per_s": self.rate, "burst": self.burst, "max_in_flight": self.max_in_flight},
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "clients": len(self._buckets),
+            "accepted": dict(self.accepted),
+            "accepted_total": sum(self.accepted.values()),
+            "priority_total": self.priority,
+            "rejected": dict(self.rejected),
+            "rejected_total": sum(self.rejected.values()),
+        }
+
+
+def client_key(client: Optional[Any]) -> str:
+    """Host of a Starlette `request.client` / `websocket.client`."""
+    return client.host if client else "unknown"
+
+
+@contextmanager
+def admitted(admission: Optional[GcodeAdmission], client: str, script: str, source: str = "http") -> Iterator[None]:
+    """Holds an admission slot for the duration of an HTTP G-code request; rejections become 429."""
+    if admission is None:
+        yield
+        return
+    try:
+        admission.acquire(client, script, source)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    try:
+        yield
+    finally:
+        admission.release()
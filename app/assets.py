@@ -0,0 +1,234 @@
+# app/assets.py
+"""
+Static asset pipeline.
+
+Copies every file from `static/` into a build directory under a content-hashed
+name (`js/app.js` -> `js/app.1a2b3c4d5e.js`), rewrites relative ES module
+imports and CSS `url()` references to the hashed names, and precomputes gzip
+(and brotli, when the `brotli` package is installed) variants. Templates link
+assets through `asset_url()`, and hashed files are served with
+`Cache-Control: immutable`, so repeat page loads need no static requests.
+
+The build runs at start-up and is skipped when the sources did not change.
+It can also be run ahead of time (e.g. from install.sh):
+
+    python -m app.assets
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import FileResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 10
+COMPRESSIBLE_SUFFIXES = {".js", ".css", ".svg", ".json", ".html", ".txt", ".map"}
+MIN_COMPRESS_SIZE = 512  # Bytes; smaller files are not worth a variant
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# `import x from './a.js'`, `export * from "../b.js"`, `import './c.js'`, `import('./d.js')`
+_JS_IMPORT_RE = re.compile(r"""((?:\bfrom|\bimport)\s*\(?\s*)(['"])(\.{1,2}/[^'"]+)\2""")
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)(?!data:|https?:|/|#)([^'")?#]+)([^'")]*)\1\s*\)""")
+
+
+def _hashed_name(rel_path: str, digest: str) -> str:
+    stem, ext = posixpath.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+
+class AssetPipeline:
+    def __init__(self, source_dir: Path, build_dir: Path):
+        self.source_dir = Path(source_dir)
+        self.build_dir = Path(build_dir)
+        self.manifest: Dict[str, str] = {}  # logical path -> hashed path
+        self.hashed: Set[str] = set()
+        self.variants: Dict[str, List[str]] = {}  # hashed path -> available encodings
+        self.version: Optional[str] = None  # Source signature of the loaded build
+
+    # --- build -----------------------------------------------------------
+
+    def _source_files(self) -> List[str]:
+        out = []
+        for root, dirs, files in os.walk(self.source_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if name.startswith("."):
+                    continue
+                out.append(Path(root, name).relative_to(self.source_dir).as_posix())
+        return out
+
+    def _signature(self, files: List[str]) -> str:
+        h = hashlib.sha256()
+        h.update(b"brotli" if brotli else b"gzip")
+        for rel in files:
+            st = (self.source_dir / rel).stat()
+            h.update(f"{rel}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+        return h.hexdigest()
+
+    def load_or_build(self) -> None:
+        """Loads the existing build when it matches the sources, otherwise rebuilds."""
+        files = self._source_files()
+        signature = self._signature(files)
+        manifest_path = self.build_dir / MANIFEST_NAME
+        try:
+            data = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if data.get("signature") == signature:
+                self._apply(data)
+                return
+        except (OSError, ValueError):
+            pass
+        self.build(files, signature)
+
+    def build(self, files: Optional[List[str]] = None, signature: Optional[str] = None) -> None:
+        files = files if files is not None else self._source_files()
+        signature = signature or self._signature(files)
+        tmp_dir = self.build_dir.with_name(self.build_dir.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        manifest: Dict[str, str] = {}
+        variants: Dict[str, List[str]] = {}
+        available = set(files)
+
+        def process(rel: str, stack: tuple = ()) -> str:
+            if rel in manifest:
+                return manifest[rel]
+            data = (self.source_dir / rel).read_bytes()
+            suffix = posixpath.splitext(rel)[1]
+            if suffix in (".js", ".mjs"):
+                data = self._rewrite(rel, data, _JS_IMPORT_RE, 3, available, stack, process)
+            elif suffix == ".css":
+                data = self._rewrite(rel, data, _CSS_URL_RE, 2, available, stack, process)
+            hashed = _hashed_name(rel, hashlib.sha256(data).hexdigest()[:HASH_LENGTH])
+            target = tmp_dir / hashed
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            variants[hashed] = self._compress(target, data)
+            manifest[rel] = hashed
+            return hashed
+
+        for rel in files:
+            process(rel)
+
+        payload = {"signature": signature, "manifest": manifest, "variants": variants}
+        (tmp_dir / MANIFEST_NAME).write_text(json.dumps(payload, indent=1), encoding="utf-8")
+        shutil.rmtree(self.build_dir, ignore_errors=True)
+        tmp_dir.rename(self.build_dir)
+        self._apply(payload)
+        logging.info(f"Static assets built: {len(manifest)} files in {self.build_dir}")
+
+    def _rewrite(self, rel, data, pattern, group, available, stack, process) -> bytes:
+        """Replaces relative references with the hashed names of their targets."""
+        text = data.decode("utf-8")
+        base = posixpath.dirname(rel)
+
+        def replace(match: re.Match) -> str:
+            ref = match.group(group)
+            target = posixpath.normpath(posixpath.join(base, ref))
+            if target not in available or target in stack or target == rel:
+                return match.group(0)
+            hashed_target = process(target, stack + (rel,))
+            new_ref = posixpath.relpath(hashed_target, base or ".")
+            if ref.startswith("./") and not new_ref.startswith("."):
+                new_ref = "./" + new_ref
+            start, end = match.span(group)
+            offset = match.start(0)
+            whole = match.group(0)
+            return whole[:start - offset] + new_ref + whole[end - offset:]
+
+        return pattern.sub(replace, text).encode("utf-8")
+
+    @staticmethod
+    def _compress(target: Path, data: bytes) -> List[str]:
+        if target.suffix not in COMPRESSIBLE_SUFFIXES or len(data) < MIN_COMPRESS_SIZE:
+            return []
+        encodings = []
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(gz) < len(data):
+            target.with_name(target.name + ".gz").write_bytes(gz)
+            encodings.append("gzip")
+        if brotli:
+            br = brotli.compress(data, quality=11)
+            if len(br) < len(data):
+                target.with_name(target.name + ".br").write_bytes(br)
+                encodings.append("br")
+        return encodings
+
+    def _apply(self, data: Dict) -> None:
+        self.version = data.get("signature")
+        self.manifest = data.get("manifest", {})
+        self.hashed = set(self.manifest.values())
+        self.variants = data.get("variants", {})
+
+    # --- lookup ----------------------------------------------------------
+
+    def url(self, path: str) -> str:
+        """URL of a static asset; falls back to the unhashed path before the first build."""
+        path = path.lstrip("/")
+        return f"/static/{self.manifest.get(path, path)}"
+
+
+class AssetStaticFiles(StaticFiles):
+    """
+    Serves hashed assets from the build directory with immutable caching and a
+    precompressed variant when the client accepts it. Unhashed paths are served
+    from the source directory as before.
+    """
+
+    def __init__(self, pipeline: AssetPipeline, **kwargs):
+        super().__init__(directory=str(pipeline.source_dir), **kwargs)
+        self.pipeline = pipeline
+
+    async def get_response(self, path: str, scope):
+        rel = path.replace(os.sep, "/")
+        if rel not in self.pipeline.hashed:
+            return await super().get_response(path, scope)
+
+        accept = ""
+        for key, value in scope.get("headers", []):
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1").lower()
+                break
+
+        file_path = self.pipeline.build_dir / rel
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        available = self.pipeline.variants.get(rel, [])
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding in available and encoding in accept:
+                file_path = file_path.with_name(file_path.name + suffix)
+                headers["Content-Encoding"] = encoding
+                break
+
+        media_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+        if not file_path.is_file():
+            return await super().get_response(path, scope)
+        return FileResponse(file_path, media_type=media_type, headers=headers)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from . import settings
+    base = Path(__file__).resolve().parent.parent
+    pipeline = AssetPipeline(base / "static", Path(settings.ASSETS_BUILD_DIR))
+    pipeline.build()
+    print(f"Built {len(pipeline.manifest)} assets into {pipeline.build_dir}"
+          f" ({'gzip + brotli' if brotli else 'gzip'})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
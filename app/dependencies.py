@@ -1,23 +1,99 @@
 # app/dependencies.py
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from pathlib import Path
+from typing import AsyncIterator, Optional
 import httpx
 from fastapi import FastAPI, Request
 from . import settings
+from .admission import GcodeAdmission
+from .host_stats import HostSampler
+from .jobqueue import JobQueue
+from .startup import startup_report
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """
     Správce kontextu pro životní cyklus aplikace.
     Vytvoří instanci httpx.AsyncClient při startu a zavře ji při vypnutí.
+    Spustí také vzorkování stavu hostitele na pozadí.
     """
-    # Použijeme base_url z nastavení pro všechny odchozí požadavky
-    async with httpx.AsyncClient(base_url=settings.KLIPPER_API_URL, timeout=10.0) as client:
+    startup_report.mark("lifespan started")
+    settings.prepare_directories()
+    # Omezený počet vláken pro blokující práci (v režimu LOW_MEMORY)
+    executor = None
+    if settings.WORKER_THREADS > 0:
+        executor = ThreadPoolExecutor(max_workers=settings.WORKER_THREADS, thread_name_prefix="pizza-worker")
+        asyncio.get_running_loop().set_default_executor(executor)
+    # Otiskované a předkomprimované statické soubory (přestaví se jen při změně zdrojů)
+    assets = getattr(app.state, "assets", None)
+    if assets:
+        try:
+            await asyncio.to_thread(assets.load_or_build)
+        except OSError as e:
+            logging.error(f"Static asset build failed, serving unhashed files: {e}")
+        startup_report.mark("assets ready")
+    # Použijeme base_url z nastavení pro všechny odchozí požadavky.
+    # Pro http:// Moonraker se nenačítají CA certifikáty (TLS se nepoužije, šetří ~150 ms startu).
+    verify = settings.KLIPPER_API_URL.startswith("https://")
+    # Jediný sdílený pool spojení na Moonraker pro celou aplikaci
+    limits = httpx.Limits(max_connections=settings.HTTP_MAX_CONNECTIONS, max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE)
+    # Pro cíl "unix:" jde komunikace přes Unix socket Moonrakeru (bez TCP)
+    transport = None
+    uds_path = settings.moonraker_uds_path()
+    if uds_path:
+        transport = httpx.AsyncHTTPTransport(uds=uds_path, limits=limits)
+    async with httpx.AsyncClient(base_url=settings.moonraker_base_url(), timeout=10.0, verify=verify,
+                                 limits=limits, transport=transport) as client:
         app.state.http_client = client
-        yield
+        app.state.host_sampler = HostSampler(settings.HOST_SAMPLE_INTERVAL, settings.HOST_HISTORY_SIZE,
+                                             rss_budget_kb=settings.RSS_BUDGET_MB * 1024)
+        sampler_task = asyncio.create_task(app.state.host_sampler.run())
+        # Fronta úloh pece: další profil se spustí, jakmile předchozí doběhne
+        app.state.job_queue = JobQueue(Path(settings.JOB_QUEUE_FILE), Path(settings.GCODES_DIR), client,
+                                       poll_interval=settings.JOB_QUEUE_POLL_INTERVAL,
+                                       history_size=settings.JOB_QUEUE_HISTORY, overlap=settings.JOB_QUEUE_OVERLAP)
+        queue_task = asyncio.create_task(app.state.job_queue.run())
+        # Odložené routery (FAST_START) se načtou na pozadí chvíli po startu
+        lazy_routers = getattr(app.state, "lazy_routers", None)
+        warmup = None
+        if lazy_routers and settings.FAST_START_WARMUP_DELAY >= 0:
+            warmup = asyncio.get_running_loop().call_later(settings.FAST_START_WARMUP_DELAY, lazy_routers.load_all)
+        startup_report.mark("ready to serve")
+        try:
+            yield
+        finally:
+            sampler_task.cancel()
+            queue_task.cancel()
+            if warmup:
+                warmup.cancel()
+            if executor:
+                executor.shutdown(wait=False)
 
 def get_http_client(request: Request) -> httpx.AsyncClient:
     """
     Závislost (Dependency), která poskytuje sdílenou instanci httpx.AsyncClient.
     """
-    return request.app.state.http_client
\ No newline at end of file
+    return request.app.state.http_client
+
+def get_host_sampler(request: Request) -> Optional[HostSampler]:
+    """
+    Závislost, která vrací vzorkovač stavu hostitele (None, pokud neběží lifespan).
+    """
+    return getattr(request.app.state, "host_sampler", None)
+
+
+def get_job_queue(request: Request) -> Optional[JobQueue]:
+    """
+    Závislost, která vrací frontu úloh pece (None, pokud neběží lifespan).
+    """
+    return getattr(request.app.state, "job_queue", None)
+
+
+def get_gcode_admission(request: Request) -> Optional[GcodeAdmission]:
+    """
+    Závislost, která vrací řízení přístupu pro G-code příkazy (None = bez omezení).
+    """
+    return getattr(request.app.state, "gcode_admission", None)
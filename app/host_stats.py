@@ -0,0 +1,207 @@
+# app/host_stats.py
+import asyncio
+import logging
+import os
+import platform
+import socket
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .ringbuffer import RingBuffer
+
+_psutil = None
+
+# Raspberry Pi firmware exposes the same value as `vcgencmd get_throttled` here.
+THROTTLED_PATH = Path("/sys/devices/platform/soc/soc:firmware/get_throttled")
+THROTTLED_FLAGS = {
+    "under_voltage": 0,
+    "freq_capped": 1,
+    "throttled": 2,
+    "soft_temp_limit": 3,
+}
+THROTTLED_OCCURRED_SHIFT = 16
+
+HISTORY_FIELDS = ("t", "cpu_temp_c", "cpu_percent", "load_1m", "mem_used_kb", "disk_percent", "throttled", "process_rss_kb")
+
+
+def _get_psutil():
+    """Imports psutil on first use; it is optional and not needed to serve the first page."""
+    global _psutil
+    if _psutil is None:
+        try:
+            import psutil
+            _psutil = psutil
+        except ImportError:
+            _psutil = False
+    return _psutil or None
+
+
+def _get_network_info() -> List[Dict[str, str]]:
+    """Gets information about active network interfaces (safer version)."""
+    psutil = _get_psutil()
+    if not psutil:
+        return []
+
+    interfaces = []
+    try:
+        addrs = psutil.net_if_addrs()
+        stats = psutil.net_if_stats()
+
+        for name, snics in addrs.items():
+            if name == "lo" or name not in stats or not stats[name].isup:
+                continue
+
+            ip_address = None
+            for addr in snics:
+                if addr.family == socket.AF_INET:
+                    ip_address = addr.address
+                    break
+
+            if ip_address:
+                conn_type = "other"
+                if name.startswith("wlan"):
+                    conn_type = "wifi"
+                elif name.startswith(("eth", "enp")):
+                    conn_type = "lan"
+
+                interfaces.append({
+                    "name": name,
+                    "ip_address": ip_address,
+                    "type": conn_type
+                })
+    except Exception as e:
+        logging.error(f"Error getting network status using psutil: {e}", exc_info=True)
+        return []
+
+    return interfaces
+
+def disk_usage_json(path: str = "/") -> Dict[str, Any]:
+    psutil = _get_psutil()
+    if not psutil:
+        return {"total": None, "used": None, "free": None}
+    u = psutil.disk_usage(path)
+    return {"total": u.total, "used": u.used, "free": u.free, "percent": u.percent}
+
+def _get_cpu_temp() -> Optional[float]:
+    psutil = _get_psutil()
+    if not (psutil and hasattr(psutil, "sensors_temperatures")):
+        return None
+    temps = psutil.sensors_temperatures() or {}
+    preferred = ["cpu-thermal", "cpu_thermal", "soc_thermal", "coretemp", "k10temp"]
+    key = next((k for k in preferred if k in temps and temps[k]), None)
+    entries = temps.get(key) if key else next(iter(temps.values()), None)
+    if entries and getattr(entries[0], "current", None) is not None:
+        return float(entries[0].current)
+    return None
+
+def _get_throttled() -> Optional[int]:
+    try:
+        return int(THROTTLED_PATH.read_text().strip(), 16)
+    except (OSError, ValueError):
+        return None
+
+def process_rss_kb() -> Optional[int]:
+    """Resident memory of this process (Linux), without needing psutil."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def decode_throttled(value: Optional[int]) -> Optional[Dict[str, Any]]:
+    """Splits the firmware bit mask into current and "since boot" flags."""
+    if value is None:
+        return None
+    return {
+        "raw": hex(value),
+        "now": {name: bool(value & (1 << bit)) for name, bit in THROTTLED_FLAGS.items()},
+        "occurred": {name: bool(value & (1 << (bit + THROTTLED_OCCURRED_SHIFT))) for name, bit in THROTTLED_FLAGS.items()},
+    }
+
+def collect_host_info() -> Dict[str, Any]:
+    """Collects one snapshot of the host state. Blocking; call it from a worker thread."""
+    psutil = _get_psutil()
+    mem_total = mem_used = None
+    if psutil:
+        vm = psutil.virtual_memory()
+        mem_total = int(vm.total // 1024)
+        mem_used = int((vm.total - vm.available) // 1024)
+
+    load = None
+    try:
+        load = os.getloadavg()
+    except (AttributeError, OSError):
+        pass
+
+    return {
+        "os": platform.platform(),
+        "mem": {"total_kb": mem_total, "used_kb": mem_used, "free_kb": max(0, mem_total - mem_used) if mem_total and mem_used else 0},
+        "cpu_temp_c": _get_cpu_temp(),
+        "cpu_percent": psutil.cpu_percent(interval=None) if psutil else None,
+        "load": list(load) if load else None,
+        "disk": disk_usage_json("/"),
+        "network": _get_network_info(),
+        "throttled": decode_throttled(_get_throttled()),
+        "process_rss_kb": process_rss_kb(),
+        "sampled_at": time.time(),
+    }
+
+
+class HostSampler:
+    """
+    Samples host vitals in the background at a fixed interval.
+
+    The latest snapshot is served from memory by `/api/system/host`; a compact
+    history of the numeric values is kept in a ring buffer for trend charts
+    (SoC temperature, throttling, memory) during long oven runs.
+    """
+
+    def __init__(self, interval: float, history_size: int, rss_budget_kb: Optional[int] = None):
+        self.interval = interval
+        self.rss_budget_kb = rss_budget_kb
+        self._over_budget = False
+        self.latest: Optional[Dict[str, Any]] = None
+        self.history = RingBuffer(HISTORY_FIELDS, history_size,
+                                  typecodes={"t": "d", "mem_used_kb": "d", "throttled": "d", "process_rss_kb": "d"})
+
+    def sample(self) -> Dict[str, Any]:
+        info = collect_host_info()
+        throttled = info["throttled"]
+        self.history.append({
+            "t": info["sampled_at"],
+            "cpu_temp_c": info["cpu_temp_c"],
+            "cpu_percent": info["cpu_percent"],
+            "load_1m": info["load"][0] if info["load"] else None,
+            "mem_used_kb": info["mem"]["used_kb"],
+            "disk_percent": info["disk"].get("percent"),
+            # Unknown (no Raspberry Pi firmware) is stored as missing, not as "not throttled"
+            "throttled": int(throttled["raw"], 16) if throttled else None,
+            "process_rss_kb": info["process_rss_kb"],
+        })
+        self.latest = info
+        self._check_budget(info["process_rss_kb"])
+        return info
+
+    def _check_budget(self, rss_kb: Optional[int]) -> None:
+        """Logs once when the process grows over the memory budget (and once when it is back under)."""
+        if not (self.rss_budget_kb and rss_kb):
+            return
+        over = rss_kb > self.rss_budget_kb
+        if over != self._over_budget:
+            self._over_budget = over
+            if over:
+                logging.warning(f"Process memory {rss_kb // 1024} MB is over the budget of {self.rss_budget_kb // 1024} MB")
+            else:
+                logging.info(f"Process memory back under the budget ({rss_kb // 1024} MB)")
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                logging.error(f"Host stats sampling failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,256 @@
+# app/jobqueue.py
+"""
+Oven job queue: profiles that run back-to-back without an operator.
+
+The queue is kept in a JSON file, so it survives backend restarts. A
+background loop polls Klipper through Moonraker and starts the next queued
+profile once the previous job is finished: its G-code file is done and the
+oven program it started is no longer running. A job with `overlap` may start
+during the final cool-down ramp of the previous program, as soon as the oven
+has cooled to the first target of the new profile, so that the cooling time
+is not spent twice.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from .oven import load_oven_module
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_PRINT_STATES = ("printing", "paused")
+STATUS_QUERY = {
+    "webhooks": ["state"],
+    "print_stats": ["state", "filename", "message"],
+    "pizza_oven": ["program", "temperature"],
+}
+START_TIMEOUT = 60.  # Seconds for a started job to show up as printing or running
+
+
+def profile_shape(path: Path) -> Tuple[Optional[float], bool]:
+    """
+    First target temperature of a profile and whether it ends with a cool-down
+    ramp (last segment ramps down and has no hold); (None, False) if unreadable.
+    """
+    try:
+        segments = load_oven_module().parse_program(path.read_text(encoding="utf-8", errors="ignore"))
+    except (OSError, ValueError):
+        return None, False
+    if not segments:
+        return None, False
+    temp, ramp_time, _, hold_time = segments[-1]
+    previous = segments[-2][0] if len(segments) > 1 else None
+    cools_down = previous is not None and temp < previous and ramp_time > 0 and not hold_time
+    return segments[0][0], cools_down
+
+
+class JobQueue:
+    def __init__(self, path: Path, gcodes_dir: Path, client: httpx.AsyncClient, poll_interval: float = 5.,
+                 history_size: int = 50, overlap: bool = False):
+        self.path = path
+        self.gcodes_dir = gcodes_dir
+        self.client = client
+        self.poll_interval = poll_interval
+        self.history_size = history_size
+        self.overlap = overlap  # Default of new jobs
+        self.jobs: List[Dict[str, Any]] = []  # The running job (first) and the queued ones, in order
+        self.history: List[Dict[str, Any]] = []  # Finished jobs, oldest first
+        self.paused = False
+        self.version = 0
+        self._next_id = 1
+        self._changed = asyncio.Event()
+        self.load()
+
+    # --- persistence -----------------------------------------------------
+
+    def load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.error(f"Job queue file {self.path} not loaded: {e}")
+            return
+        self.jobs = data.get("jobs", [])
+        self.history = data.get("history", [])
+        self.paused = data.get("paused", False)
+        self._next_id = data.get("next_id", 1)
+
+    def save(self) -> None:
+        data = {"jobs": self.jobs, "history": self.history, "paused": self.paused, "next_id": self._next_id}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.error(f"Job queue file {self.path} not saved: {e}")
+
+    def _changed_now(self) -> None:
+        """Persists the queue and wakes up everyone waiting in `wait_changed`."""
+        self.version += 1
+        self.save()
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_changed(self, version: int) -> int:
+        """Waits until the queue differs from `version`; returns the new version."""
+        while self.version == version:
+            await self._changed.wait()
+        return self.version
+
+    # --- queue operations ------------------------------------------------
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        return self.jobs[0] if self.jobs and self.jobs[0]["state"] == RUNNING else None
+
+    def add(self, name: str, file: str, overlap: Optional[bool] = None) -> Dict[str, Any]:
+        job = {
+            "id": self._next_id, "name": name, "file": file,
+            "overlap": self.overlap if overlap is None else overlap,
+            "state": QUEUED, "added": time.time(), "started": None, "finished": None, "message": "",
+            "_active": False, "_program": False,
+        }
+        self._next_id += 1
+        self.jobs.append(job)
+        self._changed_now()
+        return job
+
+    def remove(self, job_id: int) -> Dict[str, Any]:
+        """Removes a queued job; raises KeyError if there is none, ValueError if it is running."""
+        for job in self.jobs:
+            if job["id"] == job_id:
+                if job["state"] == RUNNING:
+                    raise ValueError("Job is running. Cancel the program to stop it.")
+                self.jobs.remove(job)
+                self._changed_now()
+                return job
+        raise KeyError(job_id)
+
+    def set_paused(self, paused: bool) -> None:
+        if paused != self.paused:
+            self.paused = paused
+            self._changed_now()
+
+    def state(self) -> Dict[str, Any]:
+        current = self.current()
+        return {
+            "version": self.version,
+            "paused": self.paused,
+            "current": public_job(current) if current else None,
+            "queued": [public_job(job) for job in self.jobs if job["state"] == QUEUED],
+            "history": [public_job(job) for job in self.history],
+        }
+
+    def _finish(self, job: Dict[str, Any], state: str, message: str = "") -> None:
+        job["state"] = state
+        job["finished"] = time.time()
+        job["message"] = message
+        self.jobs.remove(job)
+        self.history.append(job)
+        del self.history[:-self.history_size]
+        if state == FAILED:
+            # A failed job may mean a faulty oven; the operator decides whether to go on
+            self.paused = True
+        logging.info(f"Oven job {job['id']} ({job['name']}) {state}{': ' + message if message else ''}")
+        self._changed_now()
+
+    # --- scheduler -------------------------------------------------------
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except (httpx.RequestError, httpx.HTTPStatusError) as e:
+                logging.debug(f"Job queue: Moonraker not reachable: {e}")
+            except Exception as e:
+                logging.error(f"Job queue poll failed: {e}", exc_info=True)
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll(self) -> None:
+        """One scheduling round: tracks the running job and starts the next one when the oven is free."""
+        if not self.jobs:
+            return
+        r = await self.client.post("/printer/objects/query", json={"objects": STATUS_QUERY})
+        r.raise_for_status()
+        status = (r.json().get("result", {}) or {}).get("status", {}) or {}
+        ready = (status.get("webhooks") or {}).get("state") == "ready"
+        print_stats = status.get("print_stats") or {}
+        oven = status.get("pizza_oven") or {}
+        program = oven.get("program") or {}
+        printing = print_stats.get("state") in ACTIVE_PRINT_STATES
+        program_running = program.get("state") == "running"
+
+        job = self.current()
+        if job is not None:
+            if not ready:
+                self._finish(job, FAILED, "Klipper is not ready")
+            elif printing or program_running:
+                if not job["_active"] or (program_running and not job["_program"]):
+                    job["_active"] = True
+                    job["_program"] = job["_program"] or program_running
+                    self.save()
+                if program_running and not printing and self._overlap_ready(job, program, oven.get("temperature")):
+                    r = await self.client.post("/printer/gcode/script", params={"script": "CANCEL_PROGRAM"})
+                    r.raise_for_status()
+                    self._finish(job, DONE, "Cool-down overlapped with the next job")
+                    program_running = False
+            elif job["_active"] or time.time() - (job["started"] or 0) > START_TIMEOUT:
+                self._finish(job, *self._outcome(job, print_stats, program))
+
+        if self.current() is None and ready and not printing and not program_running and not self.paused:
+            await self._start_next()
+
+    def _outcome(self, job: Dict[str, Any], print_stats: Dict[str, Any], program: Dict[str, Any]) -> Tuple[str, str]:
+        if print_stats.get("filename") != job["file"]:
+            return FAILED, "Profile did not start"
+        print_state = print_stats.get("state")
+        program_state = program.get("state") if job["_program"] else None
+        if print_state == "error" or program_state == "error":
+            return FAILED, print_stats.get("message") or "Oven program failed"
+        if print_state == "cancelled" or program_state == "cancelled":
+            return CANCELLED, ""
+        return DONE, ""
+
+    def _overlap_ready(self, job: Dict[str, Any], program: Dict[str, Any], temperature: Optional[float]) -> bool:
+        """True when the running program is in its final cool-down and the oven is cool enough for the next job."""
+        following = self.jobs[1] if len(self.jobs) > 1 else None
+        if following is None or not following["overlap"] or self.paused or temperature is None:
+            return False
+        if program.get("segment") != program.get("segment_count", 0) - 1 or program.get("phase") != "ramp":
+            return False
+        _, cools_down = profile_shape(self.gcodes_dir / job["file"])
+        first_target, _ = profile_shape(self.gcodes_dir / following["file"])
+        return cools_down and first_target is not None and temperature <= first_target
+
+    async def _start_next(self) -> None:
+        job = next((job for job in self.jobs if job["state"] == QUEUED), None)
+        if job is None:
+            return
+        if not (self.gcodes_dir / job["file"]).is_file():
+            self._finish(job, FAILED, f"Profile file '{job['file']}' not found")
+            return
+        script = f'SDCARD_PRINT_FILE FILENAME="{job["file"]}"'
+        try:
+            r = await self.client.post("/printer/gcode/script", params={"script": script})
+            r.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            self._finish(job, FAILED, f"Error from Klipper: {e.response.text}")
+            return
+        job["state"] = RUNNING
+        job["started"] = time.time()
+        logging.info(f"Oven job {job['id']} ({job['name']}) started")
+        self._changed_now()
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in job.items() if not k.startswith("_")}
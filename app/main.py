@@ -1,15 +1,32 @@
 # app/main.py
+from .startup import startup_report, LazyRouters, StartupMiddleware
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, RedirectResponse, PlainTextResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, RedirectResponse, PlainTextResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pathlib import Path
+import importlib
 import logging
 
+startup_report.mark("fastapi imported")
+
+from . import settings
 from .logging_config import setup_logging
 from .dependencies import lifespan
-from .routers import system, klipper, websocket, update, gcodes, config, installer, power
+from .assets import AssetPipeline, AssetStaticFiles
+from .pages import PageCache
+from .admission import GcodeAdmission
+from .routers import system, klipper, websocket, gcodes, config, profiling, jobs
+
+startup_report.mark("core routers imported")
+
+# Rarely used routers; with FAST_START they are imported on first use (URL prefix -> module)
+DEFERRED_ROUTERS = {
+    "/api/installer": "installer",
+    "/api/update": "update",
+    "/api/power": "power",
+}
 
 setup_logging()
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,6 +35,8 @@ STATIC_DIR = BASE_DIR / "static"
 
 app = FastAPI(title="Pizza Oven Controller", version="1.0.0", lifespan=lifespan)
 
+app.add_middleware(StartupMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -26,41 +45,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+# Negotiated gzip for larger API responses; pages and hashed assets are precompressed and passed through
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_SIZE, compresslevel=settings.GZIP_LEVEL)
+
+# Per-request profiling is opt-in; with the setting off the middleware is not installed at all.
+if settings.PROFILING_ENABLED:
+    from .profiling import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware)
+
+# Hashed asset names are resolved from the build manifest (built in the lifespan)
+app.state.assets = AssetPipeline(STATIC_DIR, Path(settings.ASSETS_BUILD_DIR))
+app.mount("/static", AssetStaticFiles(app.state.assets), name="static")
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+templates.env.globals["asset_url"] = app.state.assets.url
+# Pages are rendered once and re-rendered only when templates or asset hashes change
+pages = PageCache(templates.env, TEMPLATES_DIR, version=lambda: app.state.assets.version,
+                  max_pages=settings.PAGE_CACHE_SIZE)
+
+app.state.gcode_admission = GcodeAdmission(settings.GCODE_RATE, settings.GCODE_BURST, settings.GCODE_MAX_IN_FLIGHT,
+                                           max_clients=settings.GCODE_MAX_CLIENTS)
 
 app.include_router(system.router)
 app.include_router(klipper.router)
 app.include_router(websocket.router)
-app.include_router(update.router)
 app.include_router(gcodes.router)
 app.include_router(config.router)
-app.include_router(installer.router)
-app.include_router(power.router)
+app.include_router(profiling.router)
+app.include_router(jobs.router)
+
+if settings.FAST_START:
+    app.state.lazy_routers = LazyRouters(app, DEFERRED_ROUTERS, f"{__package__}.routers")
+else:
+    for module_name in DEFERRED_ROUTERS.values():
+        app.include_router(importlib.import_module(f".routers.{module_name}", __package__).router)
+
+startup_report.mark("app created")
 
 @app.get("/", include_in_schema=False)
 async def root() -> RedirectResponse:
     return RedirectResponse(url="/dashboard", status_code=307)
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def page_dashboard(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("dashboard.html", {"request": request, "page_id": "dashboard"})
+async def page_dashboard(request: Request) -> Response:
+    return pages.response(request, "dashboard.html", page_id="dashboard")
 
 @app.get("/console", response_class=HTMLResponse)
-async def page_console(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("console.html", {"request": request, "page_id": "console"})
+async def page_console(request: Request) -> Response:
+    return pages.response(request, "console.html", page_id="console")
 
 @app.get("/profiles", response_class=HTMLResponse)
-async def page_profiles(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("profiles.html", {"request": request, "page_id": "profiles"})
+async def page_profiles(request: Request) -> Response:
+    return pages.response(request, "profiles.html", page_id="profiles")
 
 @app.get("/machine", response_class=HTMLResponse)
-async def page_machine(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("machine.html", {"request": request, "page_id": "machine"})
+async def page_machine(request: Request) -> Response:
+    return pages.response(request, "machine.html", page_id="machine")
 
 @app.get("/display", response_class=HTMLResponse, include_in_schema=False)
-async def page_display(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("display.html", {"request": request})
+async def page_display(request: Request) -> Response:
+    return pages.response(request, "display.html")
 
 @app.get("/__routes", response_class=PlainTextResponse, include_in_schema=False)
 def list_routes() -> PlainTextResponse:
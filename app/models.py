@@ -28,10 +28,107 @@ class GenerateGcodePayload(BaseModel):
 class FileNamePayload(BaseModel):
     name: str
 
+class QueueJobPayload(BaseModel):
+    name: str
+    overlap: Optional[bool] = None
+
 class SaveConfigPayload(BaseModel):
     name: str
     content: str
 
 class DuplicateProfilePayload(BaseModel):
     originalName: str
-    newName: str
\ No newline at end of file
+    newName: str
+
+# --- Response models of the large (hot) endpoints ---
+
+class ProfileSummary(BaseModel):
+    name: str
+    filament_type: Optional[str] = None
+    size: int
+    mtime: int
+
+class ProfileList(BaseModel):
+    files: List[ProfileSummary]
+
+class ProfilePoint(BaseModel):
+    time: float
+    temp: float
+
+class ProfileDetails(BaseModel):
+    name: str
+    gcode: str
+    metadata: Dict[str, Any]
+    points: List[ProfilePoint]
+
+class ConfigFileEntry(BaseModel):
+    name: str
+    size: int
+    mtime: int
+
+class ConfigFileList(BaseModel):
+    files: List[ConfigFileEntry]
+
+class HostHistory(BaseModel):
+    interval_s: Optional[float] = None
+    now: Optional[float] = None
+    samples: Dict[str, List[Optional[float]]]
+
+class SimulationFailure(BaseModel):
+    time: float
+    segment: int
+    check: str
+    message: str
+    temperature: Optional[float] = None
+    setpoint: float
+
+class ProgramSimulation(BaseModel):
+    name: str
+    heat_rate: float
+    cool_rate: float
+    duration: float
+    steps: int
+    trajectory: Dict[str, List[float]]
+    failures: List[SimulationFailure]
+
+class PlanSegment(BaseModel):
+    temp: float
+    hold_time: int = 0
+
+class ThermalModel(BaseModel):
+    gain: float
+    time_constant: float
+    dead_time: float = 0.
+    ambient: float = 25.
+
+class ProfilePlanPayload(BaseModel):
+    name: Optional[str] = None  # Existing profile to take the targets and holds from
+    segments: Optional[List[PlanSegment]] = None
+    heat_rate: Optional[float] = None
+    cool_rate: Optional[float] = None
+    model: Optional[ThermalModel] = None
+    use_model: bool = True
+    margin: float = 0.1
+    save_as: Optional[str] = None
+    overwrite: bool = False
+
+class PlannedSegment(BaseModel):
+    temp: float
+    ramp_time: int
+    ramp_mode: str
+    hold_time: int
+    original_ramp_time: Optional[int] = None
+    original_ramp_mode: Optional[str] = None
+
+class ProfilePlan(BaseModel):
+    name: Optional[str] = None
+    heat_rate: float
+    cool_rate: float
+    model: Optional[ThermalModel] = None
+    margin: float
+    segments: List[PlannedSegment]
+    duration: int
+    original_duration: Optional[int] = None
+    saved: Optional[str] = None
+    gcode: str
+    failures: List[SimulationFailure]
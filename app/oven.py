@@ -0,0 +1,231 @@
+# app/oven.py
+"""
+Backend access to the Klipper module's program engine.
+
+`klipper_module/pizza_oven.py` is imported by path (it is the same file that
+the installer copies into Klipper's extras), so profiles can be simulated
+with the real `Program` code without a printer.
+"""
+import importlib.util
+import json
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+OVEN_MODULE_PATH = Path(__file__).resolve().parent.parent / "klipper_module" / "pizza_oven.py"
+OVEN_SECTION = "pizza_oven"
+RATE_OPTIONS = ("heat_rate", "cool_rate", "ramp_table_size", "rate_window", "rate_grace_period")
+MODEL_OPTIONS = ("model_gain", "model_time_constant", "model_dead_time", "model_ambient")
+PLAN_GRID = 200  # Points per ramp at which the planner checks the setpoint slope
+
+_SECTION_RE = re.compile(r"^\[([^\]]+)\]")
+_OPTION_RE = re.compile(r"^(\w+)\s*[:=]\s*(\S+)")
+
+
+@lru_cache(maxsize=1)
+def load_oven_module() -> ModuleType:
+    """Imports pizza_oven.py by path, once; the backend and the simulator share this module."""
+    spec = importlib.util.spec_from_file_location("pizza_oven", str(OVEN_MODULE_PATH))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def read_oven_rates(config_dir: Path) -> Dict[str, float]:
+    """
+    `heat_rate`/`cool_rate`, the options the simulation needs
+    (`ramp_table_size`, `rate_window`, `rate_grace_period`) and the `model_*`
+    options of the [pizza_oven] section from pizza_oven.cfg and printer.cfg; values saved by
+    CALIBRATE_OVEN (the `#*#` SAVE_CONFIG block at the end of printer.cfg)
+    take precedence.
+    """
+    rates: Dict[str, float] = {}
+    for name in ("pizza_oven.cfg", "printer.cfg"):
+        try:
+            lines = (config_dir / name).read_text(encoding="utf-8", errors="ignore").splitlines()
+        except OSError:
+            continue
+        section = None
+        for line in lines:
+            line = line.strip()
+            if line.startswith("#*#"):
+                line = line[3:].strip()
+            header = _SECTION_RE.match(line)
+            if header:
+                section = header.group(1).strip()
+                continue
+            option = _OPTION_RE.match(line)
+            if section == OVEN_SECTION and option and option.group(1) in RATE_OPTIONS + MODEL_OPTIONS:
+                try:
+                    rates[option.group(1)] = float(option.group(2))
+                except ValueError:
+                    pass
+    return rates
+
+
+def simulation_options(rates: Dict[str, float]) -> Dict[str, Any]:
+    """Keyword arguments of `simulate_profile`/`verify_plan` from `read_oven_rates` values, as the module sets them."""
+    options: Dict[str, Any] = {"model": oven_model(rates)}
+    if "ramp_table_size" in rates:
+        options["table_size"] = int(rates["ramp_table_size"])
+    for name in ("rate_window", "rate_grace_period"):
+        if name in rates:
+            options[name] = rates[name]
+    return options
+
+
+def simulate_profile(content: str, heat_rate: float, cool_rate: float,
+                     sample_interval: float = 60., start_temp: Optional[float] = None,
+                     table_size: Optional[int] = None, model: Optional[Dict[str, float]] = None,
+                     rate_window: float = 60., rate_grace_period: float = 60.) -> Dict[str, Any]:
+    """
+    Parses a profile and runs it through `simulate_program` with the module's
+    ramp tables (`ramp_table_size`, module default if None), rate checks and
+    thermal model, as SIMULATE_PROGRAM does; raises ValueError for an invalid
+    profile.
+    """
+    oven = load_oven_module()
+    segments = oven.parse_program(content)
+    if not segments:
+        raise ValueError("no ADD_SEGMENT lines")
+    program = oven.Program(table_size=oven.RAMP_TABLE_SIZE if table_size is None else table_size)
+    for temp, ramp_time, ramp_mode, hold_time in segments:
+        program.add_segment(temp, ramp_time, ramp_mode, hold_time)
+    return oven.simulate_program(program, heat_rate, cool_rate,
+                                 oven.AMBIENT_TEMP if start_temp is None else start_temp,
+                                 sample_interval=sample_interval, rate_window=rate_window,
+                                 rate_grace_period=rate_grace_period, model=model)
+
+
+def oven_model(rates: Dict[str, float]) -> Optional[Dict[str, float]]:
+    """Thermal model in the module's form from `read_oven_rates` values; None when not calibrated."""
+    if not rates.get("model_time_constant"):
+        return None
+    return {
+        "gain": rates.get("model_gain", 0.),
+        "time_constant": rates["model_time_constant"],
+        "dead_time": rates.get("model_dead_time", 0.),
+        "ambient": rates.get("model_ambient", load_oven_module().AMBIENT_TEMP),
+    }
+
+
+def _heat_limit(temp: float, heat_rate: float, model: Optional[Dict[str, float]]) -> float:
+    """Fastest the oven heats at `temp`: the calibrated rate, lower near the model's top temperature."""
+    if model is None:
+        return heat_rate
+    return min(heat_rate, (model["ambient"] + model["gain"] - temp) / model["time_constant"])
+
+
+def _heating_time(mode: int, start: float, target: float, heat_rate: float,
+                  model: Optional[Dict[str, float]], margin: float) -> float:
+    """
+    Shortest duration of an eased heating ramp whose setpoint never rises
+    faster than (1 - margin) of what the oven manages at that temperature.
+    Each step of the ramp is checked against the rate at its upper end.
+    """
+    shortest = 0.
+    for _, rise, temp in _ramp_steps(mode, start, target):
+        rate = _heat_limit(temp, heat_rate, model) * (1. - margin)
+        if rate <= 0.:
+            return math.inf
+        shortest = max(shortest, rise * PLAN_GRID / rate)
+    return shortest
+
+
+def _ramp_steps(mode: int, start: float, target: float):
+    """(fraction of the ramp time, setpoint rise, upper temperature) of each of the PLAN_GRID steps of a ramp."""
+    calc_temp_ramp = load_oven_module().calc_temp_ramp
+    span = target - start
+    prev = 0.
+    for i in range(1, PLAN_GRID + 1):
+        frac = calc_temp_ramp(mode, i / PLAN_GRID)
+        yield (i - 1) / PLAN_GRID, span * (frac - prev), start + span * max(frac, prev)
+        prev = frac
+
+
+def _cooling_time(start: float, target: float, cool_rate: float,
+                  model: Optional[Dict[str, float]], margin: float) -> float:
+    """
+    Time the oven needs to cool from `start` to `target` on its own (the
+    module drops the setpoint at once), with the margin added; never longer
+    than `check_segment` allows for the calibrated `cool_rate`.
+    """
+    drop = start - target
+    longest = drop / cool_rate
+    if model is None:
+        return longest
+    ambient = model["ambient"]
+    if target - ambient <= 0.:
+        return longest
+    natural = model["time_constant"] * math.log((start - ambient) / (target - ambient))
+    return min(longest, natural / (1. - margin))
+
+
+def plan_program(segments: Sequence[Tuple[float, int]], heat_rate: float, cool_rate: float,
+                 model: Optional[Dict[str, float]] = None, margin: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Shortest ramp times for (temp, hold_time) segments. Heating ramps get the
+    ramp mode with the shortest feasible duration (with a thermal model an
+    eased-out ramp slows down where the oven does); cooling ramps last as long
+    as the oven takes to cool. Ramp times are whole seconds that pass
+    `check_segment`. Raises ValueError for a target the oven cannot reach.
+    """
+    oven = load_oven_module()
+    modes = [mode for mode in oven.RAMP_MODES.values() if mode != oven.NONE]
+    names = {mode: name for name, mode in oven.RAMP_MODES.items()}
+    plan = []
+    prev_target = 0  # As in the module's checks
+    start = oven.AMBIENT_TEMP
+    for i, (temp, hold_time) in enumerate(segments, 1):
+        mode = oven.LINEAR
+        if temp > start:
+            best = math.inf
+            for candidate in modes:
+                duration = _heating_time(candidate, start, temp, heat_rate, model, margin)
+                if duration < best:
+                    best, mode = duration, candidate
+            if math.isinf(best):
+                raise ValueError("segment %d: %g C is above what the oven can reach" % (i, temp))
+            ramp_time = math.ceil(best - 1e-6)
+        elif temp < start:
+            ramp_time = math.floor(_cooling_time(start, temp, cool_rate, model, margin) + 1e-6)
+        else:
+            ramp_time = 0
+        if temp > prev_target:
+            ramp_time = max(ramp_time, math.ceil((temp - prev_target) / heat_rate - 1e-6))
+        else:
+            ramp_time = min(ramp_time, math.floor((prev_target - temp) / cool_rate + 1e-6))
+        error = oven.check_segment(prev_target, temp, ramp_time, heat_rate, cool_rate)
+        if error:
+            raise ValueError("segment %d: %s" % (i, error))
+        plan.append({"temp": temp, "ramp_time": ramp_time, "ramp_mode": names[mode], "hold_time": hold_time})
+        prev_target = start = temp
+    return plan
+
+
+def plan_gcode(plan: Sequence[Dict[str, Any]], metadata: Dict[str, Any]) -> str:
+    """Profile G-code for a plan, in the layout the profile editor saves."""
+    lines = [f"; METADATA: {json.dumps(metadata)}", "CLEAR_PROGRAM"]
+    for seg in plan:
+        lines.append(f"ADD_SEGMENT TEMP={seg['temp']:g} RAMP_TIME={seg['ramp_time']} "
+                     f"HOLD_TIME={seg['hold_time']} RAMP_MODE={seg['ramp_mode']}")
+    lines.append("EXECUTE_PROGRAM")
+    return "\n".join(lines) + "\n"
+
+
+def verify_plan(plan: Sequence[Dict[str, Any]], heat_rate: float, cool_rate: float,
+                model: Optional[Dict[str, float]] = None, table_size: Optional[int] = None,
+                rate_window: float = 60., rate_grace_period: float = 60.) -> List[Dict[str, Any]]:
+    """
+    Failed checks of a plan run through `simulate_program`, with the thermal
+    model limiting the simulated oven; empty for a feasible plan.
+    """
+    oven = load_oven_module()
+    program = oven.Program(table_size=oven.RAMP_TABLE_SIZE if table_size is None else table_size)
+    for seg in plan:
+        program.add_segment(seg["temp"], seg["ramp_time"], seg["ramp_mode"], seg["hold_time"])
+    return oven.simulate_program(program, heat_rate, cool_rate, rate_window=rate_window,
+                                 rate_grace_period=rate_grace_period, model=model)["failures"]
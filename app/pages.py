@@ -0,0 +1,101 @@
+# app/pages.py
+import gzip
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from jinja2 import Environment
+
+# Pages may be cached by the browser but must be revalidated (cheap 304 thanks to the ETag)
+PAGE_CACHE_CONTROL = "no-cache"
+MIN_GZIP_SIZE = 1024
+
+
+class RenderedPage:
+    __slots__ = ("body", "gzip_body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        compressed = gzip.compress(body, compresslevel=9, mtime=0) if len(body) >= MIN_GZIP_SIZE else None
+        self.gzip_body = compressed if compressed and len(compressed) < len(body) else None
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+
+
+class PageCache:
+    """
+    Renders each page template once and serves the stored result.
+
+    The page context is static (just `page_id`), so rendering per request is
+    wasted work. The cache is dropped when a file in the templates directory
+    changes (checked at most every `check_interval` seconds) or when `version()`
+    changes, e.g. after the static assets were rebuilt under new hashed names.
+    At most `max_pages` rendered pages are kept (least recently used go first).
+    """
+
+    def __init__(self, env: Environment, templates_dir: Path,
+                 version: Optional[Callable[[], Any]] = None, check_interval: float = 1.0,
+                 max_pages: int = 32):
+        self.env = env
+        self.templates_dir = Path(templates_dir)
+        self.version = version or (lambda: None)
+        self.check_interval = check_interval
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[Tuple, RenderedPage]" = OrderedDict()
+        self._signature: Optional[Tuple] = None
+        self._checked_at = 0.
+
+    def _templates_signature(self) -> Tuple:
+        entries = []
+        for root, _, files in os.walk(self.templates_dir):
+            for name in files:
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((root, name, st.st_mtime_ns, st.st_size))
+        return tuple(sorted(entries))
+
+    def _validate(self) -> None:
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        signature = (self.version(), self._templates_signature())
+        if signature != self._signature:
+            self._signature = signature
+            self._pages.clear()
+            if self.env.cache is not None:
+                self.env.cache.clear()
+
+    def get(self, name: str, **context: Any) -> RenderedPage:
+        self._validate()
+        key = (name, tuple(sorted(context.items())))
+        page = self._pages.get(key)
+        if page is None:
+            body = self.env.get_template(name).render(**context).encode("utf-8")
+            page = self._pages[key] = RenderedPage(body)
+            if len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(key)
+        return page
+
+    def response(self, request: Request, name: str, **context: Any) -> Response:
+        """Serves a cached page with an ETag; answers 304 when the client already has it."""
+        page = self.get(name, **context)
+        headers = {"ETag": page.etag, "Cache-Control": PAGE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if page.etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        body = page.body
+        if page.gzip_body and "gzip" in request.headers.get("accept-encoding", "").lower():
+            body = page.gzip_body
+            headers["Content-Encoding"] = "gzip"
+        return Response(body, media_type="text/html; charset=utf-8", headers=headers)
@@ -0,0 +1,110 @@
+# app/profiling.py
+import asyncio
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from . import settings
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "__profile"
+PROFILE_SUFFIX = ".prof"
+
+_UNSAFE_CHARS_RE = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _wants_profile(scope: Dict[str, Any]) -> bool:
+    """A request is profiled when it carries the X-Profile header or the ?__profile=1 flag."""
+    for key, value in scope.get("headers", []):
+        if key == PROFILE_HEADER and value not in (b"", b"0"):
+            return True
+    query = scope.get("query_string", b"")
+    if query and PROFILE_QUERY_PARAM.encode() in query:
+        values = parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_PARAM, [])
+        return any(v not in ("", "0") for v in values)
+    return False
+
+
+def get_profiles_dir() -> Path:
+    return Path(settings.PROFILING_DIR)
+
+
+def list_saved_profiles(directory: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Returns the stored profiles, newest first."""
+    directory = directory or get_profiles_dir()
+    if not directory.is_dir():
+        return []
+    out: List[Dict[str, Any]] = []
+    for p in sorted(directory.glob(f"*{PROFILE_SUFFIX}"), reverse=True):
+        try:
+            st = p.stat()
+            out.append({"name": p.name, "size": st.st_size, "mtime": int(st.st_mtime)})
+        except OSError:
+            continue
+    return out
+
+
+def _prune(directory: Path, max_files: int) -> None:
+    """Keeps only the newest `max_files` profiles (file names start with a timestamp)."""
+    files = sorted(directory.glob(f"*{PROFILE_SUFFIX}"))
+    for p in files[:max(0, len(files) - max_files)]:
+        p.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that runs cProfile around a single flagged request and stores
+    the result as a pstats file in a bounded on-disk ring.
+
+    Only one request is profiled at a time; while a profile is running, other
+    flagged requests are served normally. Because the event loop is shared,
+    coroutines of concurrent requests may show up in the profile as well.
+    """
+
+    def __init__(self, app, directory: Optional[Path] = None, max_files: Optional[int] = None):
+        self.app = app
+        self.directory = directory
+        self.max_files = max_files
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._busy or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        import cProfile  # Only needed once a request is actually profiled
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this interpreter.
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        started = time.time()
+        try:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                profiler.disable()
+            # Writing the profile blocks on the disk; keep it off the event loop
+            await asyncio.to_thread(self._save, profiler, scope, started)
+        finally:
+            self._busy = False
+
+    def _save(self, profiler: "cProfile.Profile", scope: Dict[str, Any], started: float) -> None:
+        directory = self.directory or get_profiles_dir()
+        max_files = self.max_files if self.max_files is not None else settings.PROFILING_MAX_FILES
+        slug = _UNSAFE_CHARS_RE.sub("_", scope.get("path", "")).strip("_") or "root"
+        name = f"{int(started * 1000)}_{scope.get('method', 'GET')}_{slug[:80]}{PROFILE_SUFFIX}"
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(directory / name))
+            _prune(directory, max_files)
+            logging.info(f"Request profile saved: {name}")
+        except Exception as e:
+            logging.error(f"Failed to save request profile {name}: {e}", exc_info=True)
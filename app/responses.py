@@ -0,0 +1,32 @@
+# app/responses.py
+"""
+Fast JSON responses for the large payloads (profile and config lists, chart
+points, history series).
+
+Returning `FastJSONResponse` from an endpoint skips FastAPI's
+`jsonable_encoder` pass and response validation; the typed model is still
+declared with `response_model=` so the OpenAPI schema stays accurate. orjson
+is used when installed, otherwise the standard library `json`.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response serialized with orjson (content must be plain JSON types)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,59 @@
+# app/ringbuffer.py
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+
+class RingBuffer:
+    """
+    Fixed-size, column-oriented ring buffer of numeric samples.
+
+    Every field is stored in its own `array` (4-byte floats by default), so a day
+    of samples costs a few hundred kilobytes instead of a list of dicts.
+    Fields that need more precision (timestamps) can use another typecode via
+    `typecodes`. Missing values are stored as NaN and returned as None.
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int, typecode: str = "f",
+                 typecodes: Optional[Dict[str, str]] = None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        typecodes = typecodes or {}
+        self._columns = {f: array(typecodes.get(f, typecode), [float("nan")]) * capacity for f in self.fields}
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, values: Dict[str, Optional[float]]) -> None:
+        for field, column in self._columns.items():
+            value = values.get(field)
+            column[self._next] = float("nan") if value is None else value
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def clear(self) -> None:
+        self._next = 0
+        self._size = 0
+
+    def _indices(self, last: Optional[int], step: int) -> List[int]:
+        count = self._size if last is None else max(0, min(last, self._size))
+        start = (self._next - count) % self.capacity
+        return [(start + i) % self.capacity for i in range(0, count, max(1, step))]
+
+    def columns(self, last: Optional[int] = None, step: int = 1) -> Dict[str, List[Optional[float]]]:
+        """Returns the `last` samples (oldest first), keeping every `step`-th one."""
+        idx = self._indices(last, step)
+        out: Dict[str, List[Optional[float]]] = {}
+        for field, column in self._columns.items():
+            values = [column[i] for i in idx]
+            out[field] = [None if v != v else v for v in values]
+        return out
+
+    def latest(self) -> Optional[Dict[str, Optional[float]]]:
+        if not self._size:
+            return None
+        i = (self._next - 1) % self.capacity
+        return {f: (None if c[i] != c[i] else c[i]) for f, c in self._columns.items()}
@@ -5,7 +5,8 @@ from fastapi import APIRouter, HTTPException, Query
 from typing import Any, Dict, List, Union
 
 from .. import settings
-from ..models import FileNamePayload, SaveConfigPayload
+from ..models import FileNamePayload, SaveConfigPayload, ConfigFileList
+from ..responses import FastJSONResponse
 from ..utils import is_safe_child
 
 router = APIRouter(
@@ -33,9 +34,9 @@ def _iter_config_files(base: Path) -> List[Dict[str, Any]]:
             continue
     return out
 
-@router.get("/files")
-async def config_files() -> Dict[str, List[Dict[str, Any]]]:
-    return {"files": _iter_config_files(CONFIG_DIR)}
+@router.get("/files", response_model=ConfigFileList)
+async def config_files() -> FastJSONResponse:
+    return FastJSONResponse({"files": _iter_config_files(CONFIG_DIR)})
 
 @router.get("/file")
 async def get_config_file(name: str = Query(..., description="Relative path in config dir")) -> Dict[str, str]:
@@ -1,16 +1,22 @@
 # app/routers/gcodes.py
+import asyncio
 import logging
 import json
 import re
 from pathlib import Path
 import httpx
-from fastapi import APIRouter, HTTPException, Query, Depends, Path as FastApiPath
-from typing import Any, Dict, List
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Path as FastApiPath
+from typing import Any, Dict, List, Optional
 
 from .. import settings
 from ..utils import is_safe_child, make_safe_filename
-from ..dependencies import get_http_client
-from ..models import GcodeSavePayload, FileNamePayload, DuplicateProfilePayload
+from ..admission import GcodeAdmission, admitted, client_key
+from ..dependencies import get_http_client, get_gcode_admission
+from ..models import (GcodeSavePayload, FileNamePayload, DuplicateProfilePayload, ProfileList, ProfileDetails, ProgramSimulation,
+                      ProfilePlanPayload, ProfilePlan)
+from ..oven import (read_oven_rates, simulate_profile, simulation_options, oven_model, load_oven_module,
+                    plan_program, plan_gcode, verify_plan)
+from ..responses import FastJSONResponse
 
 GCODES_DIR = Path(settings.GCODES_DIR).resolve()
 PROFILE_PREFIX = "oven_"
@@ -31,13 +37,13 @@ def _parse_metadata(content: str) -> Dict[str, Any]:
         pass
     return {}
 
-@router.get("/")
-async def list_profiles() -> Dict[str, List[Dict[str, Any]]]:
+@router.get("/", response_model=ProfileList)
+async def list_profiles() -> FastJSONResponse:
     """Lists saved profiles (oven_*.gcode files from the gcodes directory)."""
     files: List[Dict[str, Any]] = []
     if not GCODES_DIR.exists():
         logging.warning(f"G-codes directory not found: {GCODES_DIR}")
-        return {"files": []}
+        return FastJSONResponse({"files": []})
     
     for p in sorted(GCODES_DIR.glob(f"{PROFILE_PREFIX}*.gcode")):
         try:
@@ -54,10 +60,10 @@ async def list_profiles() -> Dict[str, List[Dict[str, Any]]]:
         except Exception as e:
             logging.error(f"Failed to process profile file {p.name}: {e}", exc_info=True)
             continue
-    return {"files": files}
+    return FastJSONResponse({"files": files})
 
-@router.get("/{name}")
-async def get_profile_details(name: str = FastApiPath(..., description="Name of the profile to load")):
+@router.get("/{name}", response_model=ProfileDetails)
+async def get_profile_details(name: str = FastApiPath(..., description="Name of the profile to load")) -> FastJSONResponse:
     """Loads raw G-code, metadata, and chart points for a single profile."""
     safe_name = make_safe_filename(name)
     file_name = f"{PROFILE_PREFIX}{safe_name}.gcode"
@@ -111,17 +117,136 @@ async def get_profile_details(name: str = FastApiPath(..., description="Name of
                 
                 last_temp = temp
 
-        return {
+        return FastJSONResponse({
             "name": safe_name,
             "gcode": content,
             "metadata": metadata,
             "points": points
-        }
+        })
 
     except Exception as e:
         logging.error(f"Error processing profile {safe_name}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error reading or parsing profile file: {e}")
 
+@router.get("/{name}/simulation", response_model=ProgramSimulation)
+async def simulate_profile_run(
+    name: str = FastApiPath(..., description="Name of the profile to simulate"),
+    heat_rate: Optional[float] = Query(None, gt=0, description="Degrees C per second; default from the Klipper config"),
+    cool_rate: Optional[float] = Query(None, gt=0, description="Degrees C per second; default from the Klipper config"),
+    sample_interval: float = Query(60., gt=0, description="Seconds between trajectory points"),
+) -> FastJSONResponse:
+    """
+    Runs the profile through the Klipper module's program engine on a fake
+    clock and reports the predicted trajectory and every failed check.
+    """
+    safe_name = make_safe_filename(name)
+    path = GCODES_DIR / f"{PROFILE_PREFIX}{safe_name}.gcode"
+    if not (is_safe_child(path, GCODES_DIR) and path.is_file()):
+        raise HTTPException(status_code=404, detail=f"Profile '{safe_name}' not found.")
+
+    rates = read_oven_rates(Path(settings.CONFIG_DIR))
+    heat_rate = heat_rate or rates.get("heat_rate")
+    cool_rate = cool_rate or rates.get("cool_rate")
+    if not heat_rate or not cool_rate:
+        raise HTTPException(status_code=400, detail="Oven is not calibrated. Run CALIBRATE_OVEN or pass heat_rate and cool_rate.")
+    options = simulation_options(rates)
+
+    content = path.read_text(encoding="utf-8", errors="ignore")
+    try:
+        result = await asyncio.to_thread(simulate_profile, content, heat_rate, cool_rate, sample_interval, **options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid profile '{safe_name}': {e}")
+    return FastJSONResponse({"name": safe_name, "heat_rate": heat_rate, "cool_rate": cool_rate, **result})
+
+@router.post("/plan", response_model=ProfilePlan)
+async def plan_profile(payload: ProfilePlanPayload) -> FastJSONResponse:
+    """
+    Plans the shortest ramp times and ramp modes for a profile's targets and
+    holds that the calibrated oven can follow with `margin` to spare, and
+    compares them with the profile's own ramps. With `save_as` the plan is
+    saved as a new profile.
+    """
+    if not 0 <= payload.margin < 1:
+        raise HTTPException(status_code=400, detail="Margin must be at least 0 and less than 1.")
+
+    oven = load_oven_module()
+    name = None
+    original = None
+    metadata: Dict[str, Any] = {"filament_type": None, "type": "annealing", "version": 1.0}
+    if payload.name:
+        name = make_safe_filename(payload.name)
+        path = GCODES_DIR / f"{PROFILE_PREFIX}{name}.gcode"
+        if not (is_safe_child(path, GCODES_DIR) and path.is_file()):
+            raise HTTPException(status_code=404, detail=f"Profile '{name}' not found.")
+        content = path.read_text(encoding="utf-8", errors="ignore")
+        try:
+            original = oven.parse_program(content)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid profile '{name}': {e}")
+        metadata.update(_parse_metadata(content))
+        metadata["planned_from"] = name
+        segments = [(temp, hold_time) for temp, _, _, hold_time in original]
+    else:
+        segments = [(seg.temp, seg.hold_time) for seg in payload.segments or []]
+    if not segments:
+        raise HTTPException(status_code=400, detail="Pass a profile name or at least one segment.")
+
+    rates = read_oven_rates(Path(settings.CONFIG_DIR))
+    heat_rate = payload.heat_rate or rates.get("heat_rate")
+    cool_rate = payload.cool_rate or rates.get("cool_rate")
+    if not heat_rate or not cool_rate or min(heat_rate, cool_rate) < 0:
+        raise HTTPException(status_code=400, detail="Oven is not calibrated. Run CALIBRATE_OVEN or pass heat_rate and cool_rate.")
+    model = None
+    if payload.use_model:
+        model = payload.model.model_dump() if payload.model else oven_model(rates)
+
+    options = dict(simulation_options(rates), model=model)
+
+    try:
+        plan = await asyncio.to_thread(plan_program, segments, heat_rate, cool_rate, model, payload.margin)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"No feasible plan: {e}")
+    failures = await asyncio.to_thread(verify_plan, plan, heat_rate, cool_rate, **options)
+
+    names = {mode: mode_name for mode_name, mode in oven.RAMP_MODES.items()}
+    for seg, (_, ramp_time, ramp_mode, _) in zip(plan, original or []):
+        seg["original_ramp_time"] = ramp_time
+        seg["original_ramp_mode"] = names[ramp_mode]
+
+    saved = None
+    if payload.save_as:
+        saved = make_safe_filename(payload.save_as)
+        new_path = GCODES_DIR / f"{PROFILE_PREFIX}{saved}.gcode"
+        if not (saved and is_safe_child(new_path, GCODES_DIR)):
+            raise HTTPException(status_code=400, detail="Invalid program name.")
+        if new_path.exists() and not payload.overwrite:
+            raise HTTPException(status_code=400, detail=f"A profile with the name '{saved}' already exists.")
+        if failures:
+            raise HTTPException(status_code=400, detail=f"Planned profile fails its checks: {failures[0]['message']}")
+    metadata["name"] = saved or name or "planned"
+    gcode = plan_gcode(plan, metadata)
+    if saved:
+        try:
+            new_path.write_text(gcode, encoding="utf-8")
+            logging.info(f"Planned profile saved to file: {new_path}")
+        except Exception as e:
+            logging.error(f"Failed to save planned profile {saved}: {e}")
+            raise HTTPException(status_code=500, detail=f"Error while saving file: {e}")
+
+    return FastJSONResponse({
+        "name": name,
+        "heat_rate": heat_rate,
+        "cool_rate": cool_rate,
+        "model": model,
+        "margin": payload.margin,
+        "segments": plan,
+        "duration": sum(seg["ramp_time"] + seg["hold_time"] for seg in plan),
+        "original_duration": sum(ramp_time + hold_time for _, ramp_time, _, hold_time in original) if original else None,
+        "saved": saved,
+        "gcode": gcode,
+        "failures": failures,
+    })
+
 @router.post("/save")
 async def save_profile_gcode(payload: GcodeSavePayload):
     safe_name = make_safe_filename(payload.name)
@@ -159,7 +284,12 @@ async def save_profile_gcode(payload: GcodeSavePayload):
 
 
 @router.post("/start")
-async def start_profile(payload: FileNamePayload, client: httpx.AsyncClient = Depends(get_http_client)):
+async def start_profile(
+    payload: FileNamePayload,
+    request: Request,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    admission: Optional[GcodeAdmission] = Depends(get_gcode_admission),
+):
     safe_name = make_safe_filename(payload.name)
     file_to_print = f"{PROFILE_PREFIX}{safe_name}.gcode"
     
@@ -170,7 +300,8 @@ async def start_profile(payload: FileNamePayload, client: httpx.AsyncClient = De
     script = f'SDCARD_PRINT_FILE FILENAME="{file_to_print}"'
     
     try:
-        r = await client.post("/printer/gcode/script", params={"script": script})
+        with admitted(admission, client_key(request.client), script, "start"):
+            r = await client.post("/printer/gcode/script", params={"script": script})
         r.raise_for_status()
         return {"ok": True, "response": r.json()}
     except httpx.RequestError as e:
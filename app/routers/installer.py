@@ -3,13 +3,14 @@ import logging
 from fastapi import APIRouter, HTTPException
 from pathlib import Path
 from .. import settings
+from ..oven import OVEN_MODULE_PATH
 
 router = APIRouter(
     prefix="/api/installer",
     tags=["installer"],
 )
 
-APP_MODULE_PATH = Path(__file__).resolve().parent.parent.parent / "klipper_module" / "pizza_oven.py"
+APP_MODULE_PATH = OVEN_MODULE_PATH
 
 def get_module_paths():
     """Helper function to get all relevant paths."""
@@ -84,6 +85,39 @@ async def install_pizza_oven_module():
             "pid_Kd: 114\n"
             "min_temp: 0\n"
             "max_temp: 280\n"
+            "# Optional: points of the precomputed setpoint table of eased ramps (0 = off)\n"
+            "#ramp_table_size: 256\n"
+            "# Optional: adaptive step timer (setpoint step in C, shortest/longest wake-up in s)\n"
+            "#setpoint_resolution: 0.5\n"
+            "#min_step_interval: 0.5\n"
+            "#safety_check_interval: 10\n"
+            "# Optional: program telemetry samples kept, and every n-th reported by GET_TELEMETRY\n"
+            "#telemetry_size: 3600\n"
+            "#telemetry_decimation: 10\n"
+            "# Optional: heating/cooling check window and grace period in s\n"
+            "#rate_window: 60\n"
+            "#rate_grace_period: 60\n"
+            "# Optional: seconds between CALIBRATE_OVEN samples\n"
+            "#calibrate_sample_interval: 0.5\n"
+            "# Optional: program checkpoints for RESUME_PROGRAM after a restart (0 = off),\n"
+            "# resumed only within resume_max_gap seconds; default dir is printer_data\n"
+            "#checkpoint_interval: 60\n"
+            "#resume_max_gap: 900\n"
+            "#checkpoint_dir: ~/printer_data\n"
+            "\n"
+            "# Optional: further heating zones (e.g. a bottom heater), each with its own\n"
+            "# heater, program and calibration. Select a zone with ZONE=bottom in the oven\n"
+            "# commands; EXECUTE_PROGRAM ZONE=ALL starts the programs of all zones together.\n"
+            "#[pizza_oven bottom]\n"
+            "#heater_pin: heater_pin_placeholder\n"
+            "#sensor_pin: sensor_pin_placeholder\n"
+            "#sensor_type: EPCOS 100K B57560G104F\n"
+            "#control: pid\n"
+            "#pid_Kp: 22.2\n"
+            "#pid_Ki: 1.08\n"
+            "#pid_Kd: 114\n"
+            "#min_temp: 0\n"
+            "#max_temp: 280\n"
         )
         target_cfg_path.write_text(pizza_oven_cfg_content)
         logging.info(f"Configuration file pizza_oven.cfg created in {target_cfg_path}")
@@ -0,0 +1,64 @@
+# app/routers/jobs.py
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..dependencies import get_job_queue
+from ..jobqueue import JobQueue, public_job
+from ..models import QueueJobPayload
+from ..utils import make_safe_filename, is_safe_child
+from . import gcodes
+
+router = APIRouter(
+    prefix="/api/queue",
+    tags=["queue"],
+)
+
+
+def _require_queue(job_queue: Optional[JobQueue]) -> JobQueue:
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not running.")
+    return job_queue
+
+
+@router.get("")
+async def get_queue(job_queue: Optional[JobQueue] = Depends(get_job_queue)) -> Dict[str, Any]:
+    """Running job, queued jobs in order and finished jobs (also sent as `notify_oven_queue_changed` over /websocket)."""
+    return _require_queue(job_queue).state()
+
+
+@router.post("")
+async def add_job(payload: QueueJobPayload, job_queue: Optional[JobQueue] = Depends(get_job_queue)) -> Dict[str, Any]:
+    """Queues a profile; it starts as soon as the oven is free."""
+    job_queue = _require_queue(job_queue)
+    safe_name = make_safe_filename(payload.name)
+    file_name = f"{gcodes.PROFILE_PREFIX}{safe_name}.gcode"
+    path = gcodes.GCODES_DIR / file_name
+    if not (safe_name and is_safe_child(path, gcodes.GCODES_DIR) and path.is_file()):
+        raise HTTPException(status_code=404, detail=f"Profile file '{file_name}' not found.")
+    job = job_queue.add(safe_name, file_name, payload.overlap)
+    return {"ok": True, "job": public_job(job)}
+
+
+@router.delete("/{job_id}")
+async def remove_job(job_id: int, job_queue: Optional[JobQueue] = Depends(get_job_queue)) -> Dict[str, bool]:
+    try:
+        _require_queue(job_queue).remove(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} is not in the queue.")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"ok": True}
+
+
+@router.post("/pause")
+async def pause_queue(job_queue: Optional[JobQueue] = Depends(get_job_queue)) -> Dict[str, bool]:
+    """Stops starting new jobs; the running job is not affected."""
+    _require_queue(job_queue).set_paused(True)
+    return {"ok": True}
+
+
+@router.post("/resume")
+async def resume_queue(job_queue: Optional[JobQueue] = Depends(get_job_queue)) -> Dict[str, bool]:
+    _require_queue(job_queue).set_paused(False)
+    return {"ok": True}
@@ -4,7 +4,8 @@ from fastapi import APIRouter, Depends, HTTPException, Body, Request
 from typing import List, Dict, Optional, Any
 import logging
 
-from ..dependencies import get_http_client
+from ..admission import GcodeAdmission, admitted, client_key
+from ..dependencies import get_http_client, get_gcode_admission
 from ..models import GcodeScriptPayload
 
 router = APIRouter(
@@ -34,6 +35,7 @@ async def status_ext(client: httpx.AsyncClient = Depends(get_http_client)) -> Di
             "print_stats": ["state", "filename", "print_duration"],
             "toolhead": ["position"],
             "gcode_move": ["speed_factor", "extrude_factor"],
+            "pizza_oven": ["program", "zones"],
         }
         r = await client.post("/printer/objects/query", json={"objects": q})
         r.raise_for_status()
@@ -48,20 +50,38 @@ async def status_ext(client: httpx.AsyncClient = Depends(get_http_client)) -> Di
         if progress > 0.001 and print_duration > 0:
             eta_s = max(0, int(print_duration * (1.0 / progress - 1.0)))
 
+        # An oven program keeps running after its G-code file is done; its own
+        # progress (from the module's segment times) replaces the file progress.
+        oven = st.get("pizza_oven") or {}
+        program = oven.get("program")
+        if program and program.get("state") in ("running", "complete", "cancelled"):
+            progress = program["progress"]
+            print_duration = program["elapsed"]
+            eta_s = int(program["remaining"]) if program["state"] == "running" else None
+
         return {
             "state": state, "progress": progress, "elapsed_s": int(print_duration),
             "eta_s": eta_s, "file": {"name": filename} if filename else None,
+            "program": program,
+            # Multi-zone ovens ([pizza_oven <zone>] sections): temperature and program per zone
+            "zones": oven.get("zones"),
         }
     except (httpx.RequestError, httpx.HTTPStatusError) as e:
         return {"error": str(e)}
 
 @router.post("/console/send")
-async def console_send(payload: GcodeScriptPayload, client: httpx.AsyncClient = Depends(get_http_client)) -> Dict[str, Any]:
-    """Sends a G-code script to Klipper."""
+async def console_send(
+    payload: GcodeScriptPayload,
+    request: Request,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    admission: Optional[GcodeAdmission] = Depends(get_gcode_admission),
+) -> Dict[str, Any]:
+    """Sends a G-code script to Klipper (subject to G-code admission control)."""
     if not payload.script:
         raise HTTPException(status_code=400, detail="Script cannot be empty.")
     try:
-        r = await client.post("/printer/gcode/script", params={"script": payload.script})
+        with admitted(admission, client_key(request.client), payload.script, "console"):
+            r = await client.post("/printer/gcode/script", params={"script": payload.script})
         r.raise_for_status()
         return r.json()
     except httpx.RequestError as e:
@@ -69,6 +89,11 @@ async def console_send(payload: GcodeScriptPayload, client: httpx.AsyncClient =
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=f"Error from Klipper: {e.response.text}")
 
+@router.get("/console/admission")
+async def console_admission(admission: Optional[GcodeAdmission] = Depends(get_gcode_admission)) -> Dict[str, Any]:
+    """Metrics of the G-code admission control (accepted/rejected commands, in-flight scripts)."""
+    return admission.metrics() if admission else {}
+
 @router.get("/temps")
 async def temps_api(client: httpx.AsyncClient = Depends(get_http_client)) -> Dict[str, Dict[str, Optional[float]]]:
     """Unified temperatures from all available objects."""
@@ -79,7 +104,8 @@ async def temps_api(client: httpx.AsyncClient = Depends(get_http_client)) -> Dic
 
         wanted = [
             obj for obj in obj_list 
-            if obj in ("extruder", "heater_bed", "pizza_oven") or obj.startswith(("heater_generic ", "temperature_sensor "))
+            if obj in ("extruder", "heater_bed", "pizza_oven")
+            or obj.startswith(("pizza_oven ", "heater_generic ", "temperature_sensor "))
         ]
         
         if not wanted:
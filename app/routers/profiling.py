@@ -0,0 +1,28 @@
+# app/routers/profiling.py
+from fastapi import APIRouter, HTTPException, Path as FastApiPath
+from fastapi.responses import FileResponse
+from typing import Any, Dict, List
+
+from .. import settings
+from ..profiling import PROFILE_SUFFIX, get_profiles_dir, list_saved_profiles
+from ..utils import is_safe_child
+
+router = APIRouter(
+    prefix="/api/profiling",
+    tags=["profiling"],
+)
+
+@router.get("/")
+async def list_request_profiles() -> Dict[str, Any]:
+    """Lists stored request profiles (newest first)."""
+    files: List[Dict[str, Any]] = list_saved_profiles()
+    return {"enabled": settings.PROFILING_ENABLED, "files": files}
+
+@router.get("/{name}")
+async def download_request_profile(name: str = FastApiPath(..., description="Name of the .prof file")) -> FileResponse:
+    """Downloads a stored profile, readable with `python -m pstats` or snakeviz."""
+    base = get_profiles_dir()
+    path = base / name
+    if not (name.endswith(PROFILE_SUFFIX) and is_safe_child(path, base) and path.is_file()):
+        raise HTTPException(status_code=404, detail=f"Profile '{name}' not found.")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
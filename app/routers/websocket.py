@@ -1,8 +1,12 @@
 # app/routers/websocket.py
 import asyncio
-import websockets
+import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from .. import settings
+from ..admission import AdmissionRejected, client_key
+
+# JSON-RPC metody, které zařazují G-code do fronty Klipperu (podléhají řízení přístupu)
+GCODE_METHODS = {"printer.gcode.script": "script", "printer.print.start": "filename"}
 
 router = APIRouter()
 
@@ -11,24 +15,87 @@ async def websocket_proxy(client_ws: WebSocket):
     """
     Proxy pro WebSocket spojení, přeposílá komunikaci na Moonraker.
     """
+    # websockets se importuje až při prvním spojení (rychlejší start aplikace)
+    import websockets
+
     await client_ws.accept()
-    # Sestavení URI pro Moonraker WebSocket z URL v nastavení
-    moonraker_host = settings.KLIPPER_API_URL.split('//')[-1]
+    # Sestavení URI pro Moonraker WebSocket z URL v nastavení (TCP nebo Unix socket)
+    uds_path = settings.moonraker_uds_path()
+    moonraker_host = settings.moonraker_base_url().split('//')[-1]
     moonraker_uri = f"ws://{moonraker_host}/websocket"
+    admission = getattr(client_ws.app.state, "gcode_admission", None)
+    job_queue = getattr(client_ws.app.state, "job_queue", None)
+    notifier = None
+    client = client_key(client_ws.client)
+    pending = set()  # id G-code požadavků, na které Moonraker ještě neodpověděl
+
+    def admit(message: str):
+        """Vrací chybovou JSON-RPC odpověď, pokud je G-code požadavek odmítnut."""
+        if admission is None or not any(method in message for method in GCODE_METHODS):
+            return None
+        try:
+            request = json.loads(message)
+        except ValueError:
+            return None
+        param = GCODE_METHODS.get(request.get("method"))
+        if param is None:
+            return None
+        try:
+            admission.acquire(client, str((request.get("params") or {}).get(param, "")), "websocket")
+        except AdmissionRejected as e:
+            return json.dumps({
+                "jsonrpc": "2.0",
+                "error": {"code": 429, "message": str(e), "data": {"reason": e.reason, "retry_after": e.retry_after}},
+                "id": request.get("id"),
+            })
+        request_id = request.get("id")
+        if request_id is None or request_id in pending:
+            admission.release()  # Bez (unikátního) id nelze odpověď spárovat
+        else:
+            pending.add(request_id)
+        return None
+
+    def completed(message: str) -> None:
+        try:
+            response_id = json.loads(message).get("id")
+        except (ValueError, AttributeError):
+            return
+        if response_id in pending:
+            pending.discard(response_id)
+            admission.release()
 
     try:
-        async with websockets.connect(moonraker_uri) as server_ws:
+        connect = websockets.unix_connect(uds_path, moonraker_uri) if uds_path else websockets.connect(moonraker_uri)
+        async with connect as server_ws:
             
             async def client_to_server():
                 while True:
                     message = await client_ws.receive_text()
+                    rejection = admit(message)
+                    if rejection:
+                        await client_ws.send_text(rejection)
+                        continue
                     await server_ws.send(message)
 
             async def server_to_client():
                 while True:
                     message = await server_ws.recv()
+                    # Notifikace nemají "id", odpovědi se parsují jen při čekajících G-code požadavcích
+                    if pending and '"id"' in message:
+                        completed(message)
                     await client_ws.send_text(message)
 
+            async def queue_to_client():
+                # Změny fronty úloh pece jako notifikace ve stylu Moonrakeru
+                version = job_queue.version
+                while True:
+                    version = await job_queue.wait_changed(version)
+                    await client_ws.send_text(json.dumps({
+                        "jsonrpc": "2.0", "method": "notify_oven_queue_changed", "params": [job_queue.state()],
+                    }))
+
+            if job_queue is not None:
+                notifier = asyncio.create_task(queue_to_client())
             # Spustíme obě korutiny souběžně
             await asyncio.gather(client_to_server(), server_to_client())
 
@@ -38,3 +105,10 @@ async def websocket_proxy(client_ws: WebSocket):
         print(f"INFO: Moonraker WebSocket connection closed: {e.code} {e.reason}")
     except Exception as e:
         print(f"ERROR: An unexpected WebSocket proxy error occurred: {e}")
+    finally:
+        if notifier:
+            notifier.cancel()
+        # Neodpovězené požadavky uvolní svá místa při odpojení
+        for _ in range(len(pending)):
+            admission.release()
+        pending.clear()
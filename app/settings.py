@@ -1,11 +1,15 @@
 # app/settings.py
+import logging
 import os
 from pathlib import Path
+from typing import Optional
 
 # User's home directory (e.g., /home/pi)
 HOME_DIR = Path.home()
 
-# Base URL for Moonraker/Klipper API
+# Base URL for Moonraker/Klipper API.
+# A "unix:" target talks to Moonraker over its Unix domain socket instead of TCP, e.g.
+# KLIPPER_API_URL=unix:/home/pi/printer_data/comms/moonraker.sock
 KLIPPER_API_URL = os.getenv("KLIPPER_API_URL", "http://127.0.0.1")
 
 # Path to the directory for Klipper configuration files
@@ -18,9 +22,82 @@ GCODES_DIR = os.getenv("GCODES_DIR", str(HOME_DIR / "printer_data" / "gcodes"))
 # Ambient temperature constant
 AMBIENT_TEMP = 25 # Degrees C
 
-# The application will ensure that the profile directory exists.
-os.makedirs(GCODES_DIR, exist_ok=True)
+# Low-memory mode for 512 MB boards (Pi Zero 2 and similar), where the app shares RAM
+# with Klipper and the Chromium kiosk. It only changes the defaults below: smaller
+# caches and histories, fewer worker threads and pooled connections, and routers
+# that are imported on first use. Every value can still be overridden on its own.
+LOW_MEMORY = os.getenv("LOW_MEMORY", "0").lower() in ("1", "true", "yes")
 
-# Print paths to the console on startup for easy verification
-print(f"INFO:     Config directory is set to: {CONFIG_DIR}")
-print(f"INFO:     G-codes directory is set to: {GCODES_DIR}")
\ No newline at end of file
+def _default(normal: str, low_memory: str) -> str:
+    return low_memory if LOW_MEMORY else normal
+
+# Opt-in per-request profiling. When disabled, the middleware is not installed at all.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+# Where the .prof files are written and how many of them are kept (oldest are removed first)
+PROFILING_DIR = os.getenv("PROFILING_DIR", str(HOME_DIR / "printer_data" / "logs" / "pizza_oven_profiles"))
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "20"))
+
+# Background host stats sampler (/api/system/host and its history)
+HOST_SAMPLE_INTERVAL = float(os.getenv("HOST_SAMPLE_INTERVAL", "10")) # Seconds
+HOST_HISTORY_SIZE = int(os.getenv("HOST_HISTORY_SIZE", _default("8640", "1440"))) # Samples, 24 h (4 h in low-memory mode) at the default interval
+
+# Fast start for the kiosk: rarely used routers (installer, update, power) are imported
+# on their first request or after the warm-up delay instead of at import time.
+FAST_START = os.getenv("FAST_START", _default("0", "1")).lower() in ("1", "true", "yes")
+# Seconds after start-up; negative = never (low-memory default, routers are loaded only when used)
+FAST_START_WARMUP_DELAY = float(os.getenv("FAST_START_WARMUP_DELAY", _default("10", "-1")))
+
+# Fingerprinted and precompressed copies of static/ (see app/assets.py)
+ASSETS_BUILD_DIR = os.getenv("ASSETS_BUILD_DIR", str(Path(__file__).resolve().parent.parent / "build" / "static"))
+
+# Responses larger than this are gzip-compressed for clients that accept it
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024")) # Bytes
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5")) # 1-9, lower is cheaper on the Pi CPU
+
+# Admission control for G-code scripts (console, profile start, WebSocket proxy).
+# Per client: GCODE_RATE scripts/s with bursts of GCODE_BURST; globally at most
+# GCODE_MAX_IN_FLIGHT scripts waiting for Klipper. Excess requests get 429.
+GCODE_RATE = float(os.getenv("GCODE_RATE", "5"))
+GCODE_BURST = float(os.getenv("GCODE_BURST", "20"))
+GCODE_MAX_IN_FLIGHT = int(os.getenv("GCODE_MAX_IN_FLIGHT", "4"))
+GCODE_MAX_CLIENTS = int(os.getenv("GCODE_MAX_CLIENTS", _default("256", "32"))) # Tracked token buckets (LRU)
+
+# The single shared connection pool to Moonraker
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", _default("10", "6")))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", _default("5", "2")))
+# Threads for blocking work (host sampling, asset build); 0 = asyncio default
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", _default("0", "2")))
+# Rendered pages kept by the page cache (LRU)
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", _default("32", "8")))
+# Resident memory budget of the app process; exceeding it is logged (and fails tests/test_memory.py)
+RSS_BUDGET_MB = int(os.getenv("RSS_BUDGET_MB", _default("160", "96")))
+
+# Oven job queue (app/jobqueue.py): profiles started back-to-back, persisted across restarts
+JOB_QUEUE_FILE = os.getenv("JOB_QUEUE_FILE", str(HOME_DIR / "printer_data" / "pizza_oven_queue.json"))
+JOB_QUEUE_POLL_INTERVAL = float(os.getenv("JOB_QUEUE_POLL_INTERVAL", "5")) # Seconds
+JOB_QUEUE_HISTORY = int(os.getenv("JOB_QUEUE_HISTORY", _default("50", "20"))) # Finished jobs kept
+# Default for new jobs: start during the previous program's final cool-down once the
+# oven has cooled to the first target of the next profile
+JOB_QUEUE_OVERLAP = os.getenv("JOB_QUEUE_OVERLAP", "0").lower() in ("1", "true", "yes")
+
+def moonraker_uds_path() -> Optional[str]:
+    """Socket path when KLIPPER_API_URL is a "unix:" target, otherwise None."""
+    if not KLIPPER_API_URL.startswith("unix:"):
+        return None
+    path = KLIPPER_API_URL[len("unix:"):]
+    if path.startswith("//"):
+        path = path[2:]  # unix:///abs/path
+    return os.path.expanduser(path)
+
+def moonraker_base_url() -> str:
+    """HTTP base URL for Moonraker; over a socket the host part only fills the Host header."""
+    return "http://moonraker" if moonraker_uds_path() else KLIPPER_API_URL.rstrip("/")
+
+def prepare_directories() -> None:
+    """
+    Ensures that the profile directory exists and logs the configured paths.
+    Called from the app lifespan, so importing the settings has no side effects.
+    """
+    os.makedirs(GCODES_DIR, exist_ok=True)
+    logging.info(f"Config directory is set to: {CONFIG_DIR}")
+    logging.info(f"G-codes directory is set to: {GCODES_DIR}")
@@ -0,0 +1,129 @@
+# app/startup.py
+import importlib
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_T0 = time.perf_counter()
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process was started (Linux only), so interpreter start-up is counted too."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])  # Field 22 of /proc/<pid>/stat
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0., uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupReport:
+    """Ordered timestamps of start-up milestones, relative to process start when known."""
+
+    def __init__(self) -> None:
+        age = _process_age()
+        self.process_start_known = age is not None
+        self._origin = _T0 - (age or 0.)
+        self.marks: List[Tuple[str, float]] = [("app package imported", _T0 - self._origin)]
+        self._seen = set()
+
+    def mark(self, name: str) -> None:
+        """Records a milestone; repeated marks with the same name are ignored."""
+        if name in self._seen:
+            return
+        self._seen.add(name)
+        self.marks.append((name, time.perf_counter() - self._origin))
+
+    def as_dict(self) -> Dict[str, Any]:
+        phases = []
+        prev = 0.
+        for name, at in self.marks:
+            phases.append({"name": name, "at_ms": round(at * 1e3, 1), "delta_ms": round((at - prev) * 1e3, 1)})
+            prev = at
+        return {"relative_to": "process start" if self.process_start_known else "app import", "phases": phases}
+
+    def log(self) -> None:
+        summary = ", ".join(f"{p['name']} +{p['delta_ms']} ms" for p in self.as_dict()["phases"])
+        logging.info(f"Startup timing: {summary}")
+
+
+startup_report = StartupReport()
+
+
+class LazyRouters:
+    """
+    Routers that are imported and included only when a request hits their
+    prefix (or when `load_all` is called, e.g. shortly after start-up).
+    """
+
+    def __init__(self, app, routers: Dict[str, str], package: str):
+        self.app = app
+        self.package = package
+        self.pending = dict(routers)  # URL prefix -> module name
+
+    def load(self, prefix: str) -> None:
+        module_name = self.pending.pop(prefix, None)
+        if module_name is None:
+            return
+        module = importlib.import_module(f".{module_name}", self.package)
+        self.app.include_router(module.router)
+        self.app.openapi_schema = None
+        logging.info(f"Deferred router loaded: {module_name}")
+
+    def load_for_path(self, path: str) -> None:
+        for prefix in list(self.pending):
+            if path.startswith(prefix):
+                self.load(prefix)
+
+    def load_all(self) -> None:
+        for prefix in list(self.pending):
+            self.load(prefix)
+
+
+class StartupMiddleware:
+    """
+    Records the first served request and the first served /display page in the
+    start-up report and loads deferred routers on demand.
+    """
+
+    LOAD_ALL_PATHS = ("/openapi.json", "/docs", "/redoc", "/__routes")
+
+    def __init__(self, app):
+        self.app = app
+        self._first_request_seen = False
+        self._display_seen = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        lazy: Optional[LazyRouters] = getattr(scope["app"].state, "lazy_routers", None)
+        if lazy and lazy.pending:
+            if scope["path"] in self.LOAD_ALL_PATHS:
+                lazy.load_all()
+            else:
+                lazy.load_for_path(scope["path"])
+
+        if self._display_seen or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                if not self._first_request_seen:
+                    self._first_request_seen = True
+                    startup_report.mark(f"first request served ({path})")
+                if path == "/display" and not self._display_seen:
+                    self._display_seen = True
+                    startup_report.mark("/display served")
+                    startup_report.log()
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,237 @@
+# benchmarks/bench_backend.py
+"""
+Micro-benchmarks for the backend hot paths.
+
+Generates synthetic profile libraries and config trees in temporary directories,
+times the functions the API spends most of its time in and writes the results
+as JSON. Every case is compared against the committed baseline
+(benchmarks/baseline.json) and cases that got slower than the threshold are
+reported as regressions. Timings depend on the machine: refresh the baseline
+with --save-baseline on the machine the comparison runs on. Without a
+baseline the run says so, and --fail-on-regression exits with code 2.
+
+Usage:
+    python -m benchmarks.bench_backend                   # run and compare with the baseline
+    python -m benchmarks.bench_backend --quick           # skip the 10k-profile library
+    python -m benchmarks.bench_backend --save-baseline   # store the results as the new baseline
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import ConfigFileList, ProfileDetails, ProfileList
+from app.responses import FastJSONResponse
+from app.routers import config, gcodes
+from app.utils import make_safe_filename
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results.json"
+DEFAULT_THRESHOLD = 1.25  # Slower than 125 % of the baseline counts as a regression
+
+SEGMENT_LINE = "ADD_SEGMENT TEMP={temp} RAMP_TIME={ramp} HOLD_TIME={hold} RAMP_MODE=LINEAR"
+
+
+def make_profile_content(index: int, segments: int = 6) -> str:
+    """Builds a profile file body the same way the profile editor saves it."""
+    metadata = {"name": f"Profile {index}", "filament_type": "PETG", "type": "annealing", "version": 1.0}
+    lines = [f"; METADATA: {json.dumps(metadata)}", "CLEAR_PROGRAM"]
+    for s in range(segments):
+        lines.append(SEGMENT_LINE.format(temp=60 + s * 10, ramp=600 + s * 30, hold=1800))
+    lines.append("EXECUTE_PROGRAM")
+    return "\n".join(lines) + "\n"
+
+
+def make_profile_library(base: Path, count: int, segments: int = 6) -> Path:
+    base.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        (base / f"{gcodes.PROFILE_PREFIX}profile_{i:05d}.gcode").write_text(make_profile_content(i, segments), encoding="utf-8")
+    return base
+
+
+def make_config_tree(base: Path, depth: int, fanout: int, files_per_dir: int) -> Path:
+    """Creates a directory tree with `fanout` sub-directories per level."""
+    base.mkdir(parents=True, exist_ok=True)
+    for f in range(files_per_dir):
+        (base / f"macros_{f}.cfg").write_text(f"[gcode_macro M{f}]\ngcode:\n  G28\n", encoding="utf-8")
+    if depth > 0:
+        for d in range(fanout):
+            make_config_tree(base / f"dir_{d}", depth - 1, fanout, files_per_dir)
+    return base
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, min_time: float = 0.2) -> Dict[str, Any]:
+    """
+    Calls `fn` in batches sized so that one batch takes at least `min_time`
+    and returns per-call timings over `repeat` batches.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def serializers(model: Any) -> Dict[str, Callable[[Any], bytes]]:
+    """
+    The ways a payload can be turned into a response body: FastAPI's default for
+    untyped dicts, validation + dump through the typed response model, and
+    the fast response class the hot endpoints return.
+    """
+    adapter = TypeAdapter(model)
+    return {
+        "default": lambda payload: json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        "model": lambda payload: adapter.dump_json(adapter.validate_python(payload)),
+        "fast": lambda payload: FastJSONResponse(payload).body,
+    }
+
+
+def run_benchmarks(work_dir: Path, sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    loop = asyncio.new_event_loop()
+    original_gcodes_dir = gcodes.GCODES_DIR
+    payloads: Dict[str, Any] = {}
+
+    def record(name: str, fn: Callable[[], Any]) -> None:
+        results[name] = measure(fn, repeat=repeat)
+        print(f"{name:<45} {results[name]['median_s'] * 1e3:>10.3f} ms")
+
+    try:
+        for size in sizes:
+            library = make_profile_library(work_dir / f"gcodes_{size}", size)
+            gcodes.GCODES_DIR = library.resolve()
+            record(f"list_profiles[{size}]", lambda: loop.run_until_complete(gcodes.list_profiles()))
+            payloads[f"profiles {size}"] = (ProfileList, json.loads(loop.run_until_complete(gcodes.list_profiles()).body))
+
+        library = make_profile_library(work_dir / "gcodes_details", 1, segments=200)
+        gcodes.GCODES_DIR = library.resolve()
+        record("get_profile_details[200 segments]",
+               lambda: loop.run_until_complete(gcodes.get_profile_details("profile_00000")))
+        payloads["details 200 segments"] = (ProfileDetails, json.loads(loop.run_until_complete(gcodes.get_profile_details("profile_00000")).body))
+
+        small = make_profile_content(0)
+        large = "\n".join(SEGMENT_LINE.format(temp=100, ramp=60, hold=0) for _ in range(5000))
+        record("_parse_metadata[header]", lambda: gcodes._parse_metadata(small))
+        record("_parse_metadata[5k lines, no header]", lambda: gcodes._parse_metadata(large))
+
+        names = ["My PETG profile (v2).gcode", "nebezpečný/../název", "  a" * 40, "x" * 255]
+        record("make_safe_filename[4 names]", lambda: [make_safe_filename(n) for n in names])
+
+        wide = make_config_tree(work_dir / "config_wide", depth=1, fanout=10, files_per_dir=50)
+        deep = make_config_tree(work_dir / "config_deep", depth=6, fanout=3, files_per_dir=2)
+        record("_iter_config_files[wide 550 files]", lambda: config._iter_config_files(wide))
+        record("_iter_config_files[deep 2186 files]", lambda: config._iter_config_files(deep))
+        payloads["config 2186 files"] = (ConfigFileList, {"files": config._iter_config_files(deep)})
+
+        # Response encoding of the largest payloads (see app/responses.py)
+        for label, (model, payload) in payloads.items():
+            if label.startswith("profiles") and label != f"profiles {max(sizes)}":
+                continue
+            for kind, encode in serializers(model).items():
+                record(f"encode_{kind}[{label}]", lambda encode=encode, payload=payload: encode(payload))
+            saved = results[f"encode_default[{label}]"]["median_s"] - results[f"encode_fast[{label}]"]["median_s"]
+            print(f"{'  saved by the fast response':<45} {saved * 1e3:>10.3f} ms")
+    finally:
+        gcodes.GCODES_DIR = original_gcodes_dir
+        loop.close()
+
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Returns one row per case present in both runs, with the slowdown ratio of the medians."""
+    rows = []
+    for name, res in results.items():
+        base = (baseline.get("results") or {}).get(name)
+        if not base or not base.get("median_s"):
+            continue
+        ratio = res["median_s"] / base["median_s"]
+        rows.append({"name": name, "baseline_s": base["median_s"], "current_s": res["median_s"],
+                     "ratio": round(ratio, 3), "regression": ratio > threshold})
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark backend hot paths.")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Slowdown ratio reported as regression")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="Skip the 10k-profile library")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with code 1 on regressions")
+    args = parser.parse_args(argv)
+
+    sizes = [10, 1000] if args.quick else [10, 1000, 10000]
+    with tempfile.TemporaryDirectory(prefix="pizza_bench_") as tmp:
+        results = run_benchmarks(Path(tmp), sizes, args.repeat)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+    regressions: List[Dict[str, Any]] = []
+    missing_baseline = not args.save_baseline and not args.baseline.is_file()
+    if missing_baseline:
+        print(f"\nNo baseline at {args.baseline}; nothing to compare against.\n"
+              "Create one on the reference machine with: python -m benchmarks.bench_backend --save-baseline",
+              file=sys.stderr)
+    elif not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        report["comparison"] = compare(results, baseline, args.threshold)
+        print("\nComparison with baseline:")
+        for row in report["comparison"]:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['name']:<45} x{row['ratio']:<7}{flag}")
+        regressions = [row for row in report["comparison"] if row["regression"]]
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Baseline saved to {args.baseline}")
+
+    if missing_baseline and args.fail_on_regression:
+        return 2
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
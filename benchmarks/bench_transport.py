@@ -0,0 +1,156 @@
+# benchmarks/bench_transport.py
+"""
+Compares the TCP and Unix domain socket transports to Moonraker.
+
+Starts the Moonraker simulator twice as a local stand-in (once on a TCP port,
+once on a socket like moonraker.sock), then times the same requests the app
+makes through both: HTTP status queries over one keep-alive connection (the
+shared httpx client) and JSON-RPC round trips over the WebSocket. Reports
+latency percentiles and the client CPU time per request.
+
+Usage:
+    python -m benchmarks.bench_transport
+    python -m benchmarks.bench_transport --requests 5000 --output transport.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import websockets
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "transport_results.json"
+QUERY = {"objects": {"pizza_oven": None, "print_stats": None}}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 30.) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.get("/server/info")
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Simulator did not come up")
+            await asyncio.sleep(0.1)
+
+
+async def _timed(fn: Callable[[], Awaitable[Any]], count: int) -> Dict[str, Any]:
+    for _ in range(min(50, count)):  # Warm-up: connection set-up, caches
+        await fn()
+    latencies: List[float] = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(count):
+        start = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - start)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    latencies.sort()
+    return {
+        "requests": count,
+        "p50_us": round(statistics.median(latencies) * 1e6, 1),
+        "p95_us": round(latencies[int(0.95 * (count - 1))] * 1e6, 1),
+        "mean_us": round(wall / count * 1e6, 1),
+        "client_cpu_us": round(cpu / count * 1e6, 1),
+        "throughput_rps": round(count / wall, 1),
+    }
+
+
+async def bench_transport(name: str, base_url: str, uds: Optional[str], count: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    transport = httpx.AsyncHTTPTransport(uds=uds) if uds else None
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, timeout=10) as client:
+        await _wait_ready(client)
+        results["http_query"] = await _timed(lambda: client.post("/printer/objects/query", json=QUERY), count)
+        results["http_gcode"] = await _timed(
+            lambda: client.post("/printer/gcode/script", params={"script": "M105"}), count)
+
+    ws_uri = base_url.replace("http://", "ws://") + "/websocket"
+    connect = websockets.unix_connect(uds, ws_uri) if uds else websockets.connect(ws_uri)
+    async with connect as ws:
+        request_id = 0
+
+        async def rpc():
+            nonlocal request_id
+            request_id += 1
+            await ws.send(json.dumps({"jsonrpc": "2.0", "method": "printer.objects.query",
+                                      "params": QUERY, "id": request_id}))
+            while json.loads(await ws.recv()).get("id") != request_id:
+                pass  # Skip notifications
+
+        results["ws_rpc"] = await _timed(rpc, count)
+
+    for case, res in results.items():
+        print(f"{name:<5} {case:<11} p50 {res['p50_us']:>8.1f} us  p95 {res['p95_us']:>8.1f} us"
+              f"  client CPU {res['client_cpu_us']:>7.1f} us/req")
+    return results
+
+
+async def run(count: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="pizza_uds_") as tmp:
+        gcodes_dir = Path(tmp) / "gcodes"
+        gcodes_dir.mkdir()
+        sock = f"{tmp}/moonraker.sock"
+        port = _free_port()
+        common = [sys.executable, "-m", "sim", "--gcodes-dir", str(gcodes_dir), "--speed", "0"]
+        procs = [
+            subprocess.Popen(common + ["--port", str(port)], cwd=ROOT_DIR),
+            subprocess.Popen(common + ["--uds", sock], cwd=ROOT_DIR),
+        ]
+        try:
+            tcp = await bench_transport("tcp", f"http://127.0.0.1:{port}", None, count)
+            unix = await bench_transport("unix", "http://moonraker", sock, count)
+        finally:
+            for proc in procs:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+    comparison = {}
+    for case in tcp:
+        comparison[case] = {
+            "p50_speedup": round(tcp[case]["p50_us"] / unix[case]["p50_us"], 3),
+            "client_cpu_saving_us": round(tcp[case]["client_cpu_us"] - unix[case]["client_cpu_us"], 1),
+        }
+        print(f"{case:<11} p50 tcp/unix x{comparison[case]['p50_speedup']:<6}"
+              f" client CPU saved over the socket: {comparison[case]['client_cpu_saving_us']} us/req")
+    return {"tcp": tcp, "unix": unix, "comparison": comparison}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare TCP and Unix socket transports to Moonraker.")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per case")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args.requests))
+    report = {
+        "meta": {"timestamp": int(time.time()), "python": platform.python_version(),
+                 "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
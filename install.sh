@@ -44,6 +44,9 @@ source venv/bin/activate
 echo "Installing Python dependencies from requirements.txt..."
 pip install -r requirements.txt
 
+echo "Building fingerprinted static assets..."
+python -m app.assets
+
 echo -e "${GREEN}Python environment is ready.${NC}"
 
 # --- Step 3: Set up the systemd Service ---
@@ -1,16 +1,48 @@
+import array
+import bisect
+import collections
+import hashlib
+import json
 import logging
+import os
 import pathlib
 import math
-from gcode import CommandError
+import time
+try:
+    from gcode import CommandError
+except ImportError:
+    # Loaded outside of Klipper (simulator, backend tools)
+    class CommandError(Exception):
+        pass
 
-CALIBRATE_OVEN_HELP = "Calibrate heat/cool rate of the oven"
-PROGRAM_EXECUTE_HELP = "Execute the current program"
-PROGRAM_CANCEL_HELP = "Cancel execution of the current program"
+CALIBRATE_OVEN_HELP = "Calibrate heat/cool rate and thermal model of the oven"
+PROGRAM_EXECUTE_HELP = "Execute the current program (ZONE=ALL starts all zones together)"
+PROGRAM_CANCEL_HELP = "Cancel execution of the current program (ZONE=ALL in all zones)"
 PROGRAM_CLEAR_HELP = "Clear the current program"
 ADD_SEGMENT_HELP = "Add a program segment"
+LOAD_PROGRAM_HELP = "Load a program from an oven_*.gcode profile"
+SIMULATE_PROGRAM_HELP = "Simulate the program (or FILE) without heating the oven"
+RESUME_PROGRAM_HELP = "Resume the program interrupted by a Klipper restart"
+GET_TELEMETRY_HELP = "Report the recorded program telemetry as JSON"
 
 TEMP_RANGE_TOLERANCE = 2 # Degrees C
 AMBIENT_TEMP = 25 # Degrees C
+SLOPE_PROBE_TIME = 1. # Seconds; window of the setpoint slope estimate
+RAMP_TABLE_SIZE = 256 # Default ramp_table_size: precomputed setpoints per eased ramp
+TIME_EPSILON = 1e-6 # Seconds; a wake-up at a segment end belongs to the next one
+LATE_TIMER_WARNING = 1. # Seconds; step timer delay that gets logged
+PROGRAM_CACHE_SIZE = 16 # Parsed profiles kept by LOAD_PROGRAM
+SIMULATION_REPORTED_FAILURES = 5 # Failures listed by SIMULATE_PROGRAM
+RATE_CHECK_FRACTION = 0.5 # Share of the expected heat/cool rate the oven has to reach
+CHECKPOINT_FILE = "%s_checkpoint.json" # Per section: pizza_oven, pizza_oven_<zone>
+CHECKPOINT_PROGRAM_FILE = "%s_program.json"
+OVEN_ZONES_OBJECT = "pizza_oven_zones"
+ZONE_ALL = "ALL" # ZONE= value of the commands that act on every zone
+CALIBRATION_SETTLE_TIME = 20. # Seconds at the calibration temperature before cooling
+CALIBRATION_HEAT_TIMEOUT = 4 * 3600. # Seconds to reach the calibration temperature
+CALIBRATION_MAX_DEAD_TIME = 120. # Seconds; longest dead time tried by the model fit
+CALIBRATION_FIT_SAMPLES = 2000 # Samples the model fit goes through per timer wake-up
+CALIBRATION_FIT_PAUSE = 0.05 # Seconds between the model fit's timer wake-ups
 
 NONE                = 0x00
 LINEAR              = 0x01
@@ -45,78 +77,190 @@ def powinout(a, b):
         return 0.5 * math.pow(a, b)
     return 1 - 0.5 * math.fabs(math.pow(2-a, b))
 
+def linear(k):
+    return k
+
+# Easing functions, indexed by ramp mode: k in <0, 1> -> fraction of the ramp
+EASINGS = {
+    NONE:               linear,
+    LINEAR:             linear,
+    QUADRATIC_IN:       lambda k: powin(k, 2),
+    QUADRATIC_OUT:      lambda k: powout(k, 2),
+    QUADRATIC_INOUT:    lambda k: powinout(k, 2),
+    CUBIC_IN:           lambda k: powin(k, 3),
+    CUBIC_OUT:          lambda k: powout(k, 3),
+    CUBIC_INOUT:        lambda k: powinout(k, 3),
+    QUARTIC_IN:         lambda k: powin(k, 4),
+    QUARTIC_OUT:        lambda k: powout(k, 4),
+    QUARTIC_INOUT:      lambda k: powinout(k, 4),
+    QUINTIC_IN:         lambda k: powin(k, 5),
+    QUINTIC_OUT:        lambda k: powout(k, 5),
+    QUINTIC_INOUT:      lambda k: powinout(k, 5),
+    SINUSOIDAL_IN:      lambda k: 1-math.cos(k*(math.pi/2)),
+    SINUSOIDAL_OUT:     lambda k: math.sin(k*(math.pi/2)),
+    SINUSOIDAL_INOUT:   lambda k: -0.5*(math.cos(math.pi*k)-1),
+}
+
+RAMP_MODES = {
+    "NONE": NONE, "LINEAR": LINEAR,
+    "QUADRATIC_IN": QUADRATIC_IN, "QUADRATIC_OUT": QUADRATIC_OUT, "QUADRATIC_INOUT": QUADRATIC_INOUT,
+    "CUBIC_IN": CUBIC_IN, "CUBIC_OUT": CUBIC_OUT, "CUBIC_INOUT": CUBIC_INOUT,
+    "QUARTIC_IN": QUARTIC_IN, "QUARTIC_OUT": QUARTIC_OUT, "QUARTIC_INOUT": QUARTIC_INOUT,
+    "QUINTIC_IN": QUINTIC_IN, "QUINTIC_OUT": QUINTIC_OUT, "QUINTIC_INOUT": QUINTIC_INOUT,
+    "SINUSOIDAL_IN": SINUSOIDAL_IN, "SINUSOIDAL_OUT": SINUSOIDAL_OUT, "SINUSOIDAL_INOUT": SINUSOIDAL_INOUT,
+}
+
 def calc_temp_ramp(mode, k):
     if k == 0 or k == 1:
         return k
-    if mode == QUADRATIC_IN:
-        return powin(k,2)
-    if mode == QUADRATIC_OUT:
-        return powout(k,2)
-    if mode == QUADRATIC_INOUT:
-        return powinout(k,2)
-    if mode == CUBIC_IN:
-        return powin(k,3)
-    if mode == CUBIC_OUT:
-        return powout(k,3)
-    if mode == CUBIC_INOUT:
-        return powinout(k,3)
-    if mode == QUARTIC_IN:
-        return powin(k,4)
-    if mode == QUARTIC_OUT:
-        return powout(k,4)
-    if mode == QUARTIC_INOUT:
-        return powinout(k,4)
-    if mode == QUINTIC_IN:
-        return powin(k,5)
-    if mode == QUINTIC_OUT:
-        return powout(k,5)
-    if mode == QUINTIC_INOUT:
-        return powinout(k,5)
-    if mode == SINUSOIDAL_IN:
-        return 1-math.cos(k*(math.pi/2))
-    if mode == SINUSOIDAL_OUT:
-        return math.sin(k*(math.pi/2))
-    if mode == SINUSOIDAL_INOUT:
-        return -0.5*(math.cos(math.pi*k)-1)
-    return k
+    return EASINGS.get(mode, linear)(k)
+
+def parse_ramp_mode(method):
+    if isinstance(method, int):
+        if method not in EASINGS:
+            raise ValueError("Invalid method value")
+        return method
+    try:
+        return RAMP_MODES[str(method).upper()]
+    except KeyError:
+        raise ValueError("Invalid method name")
+
+def parse_program(text):
+    """
+    Parses the ADD_SEGMENT lines of a profile into (temp, ramp_time,
+    ramp_mode, hold_time) tuples; other commands are skipped. Raises
+    ValueError naming the first invalid line.
+    """
+    segments = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.split(";", 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        if parts[0].upper() != "ADD_SEGMENT":
+            continue
+        try:
+            params = {}
+            for part in parts[1:]:
+                key, sep, value = part.partition("=")
+                if not sep:
+                    raise ValueError("malformed parameter '%s'" % part)
+                params[key.upper()] = value
+            temp = float(params["TEMP"])
+            ramp_time = int(params["RAMP_TIME"])
+            ramp_mode = parse_ramp_mode(params.get("RAMP_MODE", "LINEAR"))
+            hold_time = int(params.get("HOLD_TIME", 0))
+            if ramp_time < 0 or hold_time < 0:
+                raise ValueError("negative time")
+        except KeyError as e:
+            raise ValueError("line %d: missing %s" % (lineno, e.args[0]))
+        except ValueError as e:
+            raise ValueError("line %d: %s" % (lineno, e))
+        segments.append((temp, ramp_time, ramp_mode, hold_time))
+    return segments
 
 class ProgramSegment:
-    def __init__(self, target, duration, method):
+    __slots__ = ("target", "duration", "method", "start_temp", "_span", "_table")
+
+    def __init__(self, target, duration, method, start_temp=AMBIENT_TEMP,
+                 table_size=0):
         self.target = target
         self.duration = duration
-        if isinstance(method, int):
-            if method < NONE or method > SINUSOIDAL_INOUT:
-                raise ValueError("Invalid method value")
-        else:
-            try:
-                method = eval(f"{method.upper()}")
-            except ValueError:
-                raise ValueError("Invalid method name")
-        self.method = method
-        self.position = 0
-        self._start_time = 0
+        self.method = parse_ramp_mode(method)
+        self.start_temp = start_temp
+        # Holds and cooling ramps (the oven cools on its own) keep the target
+        self._span = None
+        self._table = None
+        if self.method != NONE and duration > 0 and target >= start_temp:
+            self._span = target - start_temp
+            if table_size > 0 and self.method != LINEAR:
+                self._table = self._build_table(table_size)
+
+    def _build_table(self, size):
+        """Setpoints at `size` + 1 evenly spaced points of the ramp."""
+        return array.array("d", [self.start_temp + self._span * calc_temp_ramp(self.method, i / size)
+                                 for i in range(size + 1)])
 
-    def start(self, eventtime):
-        self._start_time = eventtime
+    def setpoint(self, t):
+        """Setpoint `t` seconds into the segment."""
+        if self._span is None or t >= self.duration:
+            return self.target
+        if t <= 0:
+            return self.start_temp
+        k = t / self.duration
+        table = self._table
+        if table is None:
+            return self.start_temp + self._span * calc_temp_ramp(self.method, k)
+        x = k * (len(table) - 1)
+        i = int(x)
+        return table[i] + (table[i + 1] - table[i]) * (x - i)
 
-    def runtime(self, eventtime):
-        return round(eventtime - self._start_time)
+    def slope(self, t):
+        """Setpoint change in degrees/s `t` seconds into the segment; 0 when it stays constant."""
+        if self._span is None or t >= self.duration:
+            return 0.
+        return (self.setpoint(t + SLOPE_PROBE_TIME) - self.setpoint(t)) / SLOPE_PROBE_TIME
 
-    def is_done(self, eventtime):
-        return self.runtime(eventtime) == self.duration
+    def time_to_change(self, t, resolution):
+        """
+        Seconds after `t` until the setpoint moves by `resolution` degrees,
+        estimated from the current slope; None when it stays constant.
+        """
+        if self._span is None or t >= self.duration:
+            return None
+        slope = abs(self.slope(t))
+        if slope <= 0.:
+            # Flat start of an eased ramp; look again after the probe window
+            return SLOPE_PROBE_TIME
+        return resolution / slope
 
 class Program:
-    def __init__(self):
+    """
+    Temperature program evaluated from the absolute time since its start.
+
+    Segment boundaries are kept as prefix sums of the durations (`_ends`), so
+    the current segment is a bisect lookup and the setpoint does not depend
+    on how often or how late the step timer runs.
+    """
+    def __init__(self, table_size=0):
         self._segments = []
+        self._ends = []
         self._iter = 0
-        self._prev_time = 0
-        self._prev_temp = AMBIENT_TEMP
+        self._start_time = 0.
+        self._table_size = table_size
 
     def add_segment(self,  target, ramp_time, ramp_method, hold_time):
-        segment = ProgramSegment(target, ramp_time, ramp_method)
-        self._segments.append(segment)
+        start_temp = self._segments[-1].target if self._segments else AMBIENT_TEMP
+        self._append(ProgramSegment(target, ramp_time, ramp_method, start_temp,
+                                    self._table_size))
         if hold_time:
-            self._segments.append(ProgramSegment(target, hold_time, "NONE"))
+            self._append(ProgramSegment(target, hold_time, NONE, target))
+
+    @property
+    def start_temp(self):
+        """Temperature the first ramp starts from."""
+        return self._segments[0].start_temp if self._segments else AMBIENT_TEMP
+
+    def set_start_temp(self, temp):
+        """Starts the first ramp from `temp`, e.g. an oven still warm from the last program."""
+        if self._segments and self._segments[0].start_temp != temp:
+            first = self._segments[0]
+            self._segments[0] = ProgramSegment(first.target, first.duration, first.method, temp,
+                                               self._table_size)
+
+    def _append(self, segment):
+        self._segments.append(segment)
+        self._ends.append(self.duration() + segment.duration)
+
+    def duration(self):
+        return self._ends[-1] if self._ends else 0
+
+    def copy(self):
+        """New program over the same (immutable) segments, not started."""
+        program = Program(self._table_size)
+        program._segments = list(self._segments)
+        program._ends = list(self._ends)
+        return program
 
     def is_empty(self):
         return len(self._segments) == 0
@@ -124,42 +268,79 @@ class Program:
     def is_done(self):
         return self._iter == len(self._segments)
 
-    def start(self, eventtime):
-        self._prev_time = eventtime
-        self._segments[self._iter].start(eventtime)
+    @property
+    def segment_index(self):
+        """Index of the segment found by the last get_step/start/seek."""
+        return self._iter
+
+    def start(self, eventtime, elapsed=0.):
+        """Starts (or continues) the program as if it had run `elapsed` seconds already."""
+        self._start_time = eventtime - elapsed
+        self._iter = self._index(elapsed)
+
+    def seek(self, eventtime, elapsed):
+        self.start(eventtime, min(max(elapsed, 0.), self.duration()))
 
     def reset(self):
         self._iter = 0
+        self._start_time = 0.
 
-    def _ramp(self, start_temp, step, delta):
-        if step.method == NONE:
-            return step.target
-        if step.position + delta < step.duration:
-            step.position += delta
-        else:
-            step.position = step.duration
-        k = step.position / step.duration
-        if step.target >= start_temp:
-            val = (start_temp + (step.target - start_temp) * calc_temp_ramp(step.method, k))
-        else:
-            return step.target
-        return val
+    def elapsed(self, eventtime):
+        return eventtime - self._start_time
+
+    def _index(self, elapsed):
+        return bisect.bisect_right(self._ends, elapsed + TIME_EPSILON)
+
+    def _segment_start(self, index):
+        return self._ends[index - 1] if index else 0
+
+    def segment_count(self):
+        return len(self._segments)
+
+    def current_segment(self):
+        """(index, segment, start, end) of the segment being run; segment is None once done."""
+        i = self._iter
+        if i >= len(self._segments):
+            return i, None, self.duration(), self.duration()
+        return i, self._segments[i], self._segment_start(i), self._ends[i]
+
+    def setpoint_at(self, elapsed):
+        """Setpoint `elapsed` seconds into the program (0 once it is over)."""
+        i = self._index(elapsed)
+        if i == len(self._segments):
+            return 0
+        return self._segments[i].setpoint(elapsed - self._segment_start(i))
+
+    def setpoint_rate(self, eventtime):
+        """Slope of the setpoint in degrees/s at `eventtime`; 0 during holds and once done."""
+        elapsed = self.elapsed(eventtime)
+        i = self._index(elapsed)
+        if i == len(self._segments):
+            return 0.
+        return self._segments[i].slope(elapsed - self._segment_start(i))
 
     def get_step(self, eventtime):
+        elapsed = self.elapsed(eventtime)
+        self._iter = self._index(elapsed)
+        if self.is_done():
+            return 0
+        return self._segments[self._iter].setpoint(elapsed - self._segment_start(self._iter))
+
+    def next_wake(self, eventtime, resolution):
+        """
+        Time the step timer has to run next: the end of the current segment,
+        or earlier on a ramp once the setpoint moved by `resolution` degrees.
+        """
+        if self.is_done():
+            return eventtime
         step = self._segments[self._iter]
-        if step.is_done(eventtime):
-            self._iter += 1
-            if self.is_done():
-                return 0
-            
-            self._prev_temp = step.target
-            step = self._segments[self._iter]
-            step.start(eventtime)
-        
-        dt = eventtime - self._prev_time
-        self._prev_time = eventtime
-        return self._ramp(self._prev_temp, step, dt)
-    
+        wake = self._start_time + self._ends[self._iter]
+        t = self.elapsed(eventtime) - self._segment_start(self._iter)
+        change = step.time_to_change(t, resolution)
+        if change is not None:
+            wake = min(wake, eventtime + change)
+        return wake
+
     def get_current_target(self):
         if not self.is_done():
             return self._segments[self._iter].target
@@ -183,147 +364,1088 @@ class Program:
             i += 1
 
 
+def check_segment(prev_target, temp, ramp_time, heat_rate, cool_rate):
+    """Error message when the oven cannot follow the segment, else None."""
+    if heat_rate and temp > prev_target:
+        if ramp_time * heat_rate < temp - prev_target:
+            return "Ramp rate too fast for heater's heat rate."
+    elif cool_rate:
+        if ramp_time * cool_rate > prev_target - temp:
+            return "Cool rate too slow to meat ramp time."
+    return None
+
+class SlopeEstimator:
+    """
+    Least-squares slope (degrees/s) of the samples from the last `window`
+    seconds. Samples live in a fixed-size ring and the regression sums are
+    updated on insert and evict, so each sample costs O(1). The sums are
+    recomputed from the ring once per `capacity` samples to keep rounding
+    errors from accumulating.
+    """
+    def __init__(self, window, capacity):
+        self.window = window
+        self.capacity = max(capacity, 2)
+        self._t = array.array("d", bytes(8 * self.capacity))
+        self._v = array.array("d", bytes(8 * self.capacity))
+        self.reset()
+
+    def reset(self):
+        self._head = 0
+        self.count = 0
+        self._origin = 0.
+        self._updates = 0
+        self._st = self._sv = self._stt = self._stv = 0.
+
+    def add(self, t, value):
+        while self.count and (self.count == self.capacity
+                              or t - self._t[self._head] > self.window):
+            self._evict()
+        if not self.count:
+            self._origin = t
+        i = (self._head + self.count) % self.capacity
+        self._t[i] = t
+        self._v[i] = value
+        self.count += 1
+        x = t - self._origin
+        self._st += x
+        self._sv += value
+        self._stt += x * x
+        self._stv += x * value
+        self._updates += 1
+        if self._updates >= self.capacity:
+            self._rebase()
+
+    def _evict(self):
+        x = self._t[self._head] - self._origin
+        value = self._v[self._head]
+        self._st -= x
+        self._sv -= value
+        self._stt -= x * x
+        self._stv -= x * value
+        self._head = (self._head + 1) % self.capacity
+        self.count -= 1
+
+    def _rebase(self):
+        self._origin = self._t[self._head]
+        self._st = self._sv = self._stt = self._stv = 0.
+        for j in range(self.count):
+            i = (self._head + j) % self.capacity
+            x = self._t[i] - self._origin
+            self._st += x
+            self._sv += self._v[i]
+            self._stt += x * x
+            self._stv += x * self._v[i]
+        self._updates = 0
+
+    def span(self):
+        if not self.count:
+            return 0.
+        return self._t[(self._head + self.count - 1) % self.capacity] - self._t[self._head]
+
+    def slope(self):
+        n = self.count
+        denominator = n * self._stt - self._st * self._st
+        if n < 2 or denominator <= 1e-9:
+            return None
+        return (n * self._stv - self._st * self._sv) / denominator
+
+class RateMonitor:
+    """
+    Heating/cooling safety check. While the oven is more than
+    TEMP_RANGE_TOLERANCE below (above) its setpoint, the slope estimated over
+    `window` seconds must reach RATE_CHECK_FRACTION of the rate the oven is
+    expected to heat (cool) at. The failure is reported only once it has
+    lasted `grace_period` seconds, so a single bad sample or the dead time
+    after a setpoint change never trips it.
+
+    The expected rates come from the thermal model fitted by CALIBRATE_OVEN.
+    Without a model, heating is expected at `heat_rate`, and cooling only
+    means the temperature must not rise. On a heating ramp the oven is never
+    expected to heat faster than the setpoint rises.
+    """
+    def __init__(self, window, grace_period, capacity, heat_rate, cool_rate, model=None):
+        self.estimator = SlopeEstimator(window, capacity)
+        self.grace_period = grace_period
+        self.heat_rate = heat_rate
+        self.cool_rate = cool_rate
+        self.model = model
+        self._since = None
+        self._direction = None
+
+    def reset(self):
+        self.estimator.reset()
+        self._since = None
+        self._direction = None
+
+    def rate(self):
+        return self.estimator.slope()
+
+    def expected_rate(self, direction, temp):
+        model = self.model
+        if direction == "heating":
+            if model:
+                return max(0., (model["ambient"] + model["gain"] - temp) / model["time_constant"])
+            return self.heat_rate
+        if model:
+            return max(0., (temp - model["ambient"]) / model["time_constant"])
+        return 0.
+
+    def update(self, eventtime, temp, setpoint, setpoint_rate=0.):
+        """
+        Feeds one sample with the setpoint's slope (degrees/s); returns
+        "heating"/"cooling" for a failed check, else None.
+        """
+        self.estimator.add(eventtime, temp)
+        ambient = self.model["ambient"] if self.model else AMBIENT_TEMP
+        direction = None
+        if setpoint - temp > TEMP_RANGE_TOLERANCE:
+            direction = "heating"
+        elif setpoint > 0 and temp - setpoint > TEMP_RANGE_TOLERANCE \
+                and temp - ambient > TEMP_RANGE_TOLERANCE:
+            direction = "cooling"
+        slope = self.estimator.slope()
+        failing = False
+        if direction and slope is not None \
+                and self.estimator.span() >= self.estimator.window / 2:
+            expected = self.expected_rate(direction, temp)
+            if direction == "heating" and setpoint_rate > 0.:
+                # A slow ramp is followed slowly, even when the oven lags it
+                expected = min(expected, setpoint_rate)
+            expected *= RATE_CHECK_FRACTION
+            if direction == "heating":
+                failing = slope < expected
+            else:
+                failing = -slope < expected
+        if not failing:
+            self._since = None
+            return None
+        if self._since is None or self._direction != direction:
+            self._since = eventtime
+            self._direction = direction
+        if eventtime - self._since >= self.grace_period:
+            return direction
+        return None
+
+def simulate_program(program, heat_rate, cool_rate, start_temp=AMBIENT_TEMP,
+                     resolution=0.5, min_interval=0.5, max_interval=10.,
+                     sample_interval=60., rate_window=60., rate_grace_period=60.,
+                     model=None):
+    """
+    Runs `program` on a fake clock against an oven that heats at most
+    `heat_rate` and cools at most `cool_rate` degrees per second, with the
+    same step-timer cadence and checks as PizzaOven. Returns the total
+    duration, the trajectory sampled every `sample_interval` seconds (and at
+    segment changes) and every failed segment or rate check. The first ramp
+    starts from `start_temp`, as EXECUTE_PROGRAM starts it from the measured
+    temperature.
+
+    With a thermal `model` the simulated oven is also limited by the model's
+    rates at its temperature. A heating ramp the oven lags by more than
+    TEMP_RANGE_TOLERANCE for `rate_grace_period` seconds is then reported as
+    a "tracking" failure: the oven cannot follow it.
+    """
+    failures = []
+    elapsed = 0.
+    prev_target = 0
+    index = 0
+    for i, (target, ramp_time, hold_time, method) in enumerate(program, 1):
+        error = check_segment(prev_target, target, ramp_time, heat_rate, cool_rate)
+        if error:
+            failures.append({"time": elapsed, "segment": index, "check": "segment",
+                             "message": "segment %d: %s" % (i, error),
+                             "temperature": None, "setpoint": target})
+        elapsed += ramp_time + hold_time
+        index += 2 if hold_time else 1
+        prev_target = target
+
+    trajectory = {"time": [], "temperature": [], "setpoint": [], "segment": []}
+    monitor = RateMonitor(rate_window, rate_grace_period, int(rate_window / min_interval) + 2,
+                          heat_rate, cool_rate, model)
+    sim = program.copy()
+    sim.set_start_temp(start_temp)
+    sim.start(0.)
+    now = 0.
+    wake = 1.
+    temp = start_temp
+    setpoint = 0.
+    last_sample = -sample_interval
+    last_segment = -1
+    lagging_since = None
+    steps = 0
+    while True:
+        # The heater holds the last setpoint until the next wake-up
+        goal = max(setpoint, start_temp)
+        heat, cool = heat_rate, cool_rate
+        if model:
+            heat = min(heat, max(0., (model["ambient"] + model["gain"] - temp) / model["time_constant"]))
+            cool = min(cool, max(0., (temp - model["ambient"]) / model["time_constant"]))
+        temp += min(max(goal - temp, -cool * (wake - now)), heat * (wake - now))
+        now = wake
+        if sim.is_done():
+            break
+        steps += 1
+        check = monitor.update(now, temp, setpoint, sim.setpoint_rate(now))
+        if check:
+            failures.append({"time": round(now, 2), "segment": sim.segment_index, "check": check,
+                             "message": "Oven not %s at expected rate." % check,
+                             "temperature": round(temp, 2), "setpoint": round(setpoint, 2)})
+        if model and sim.setpoint_rate(now) > 0. and setpoint - temp > TEMP_RANGE_TOLERANCE:
+            if lagging_since is None:
+                lagging_since = now
+            elif lagging_since is not False and now - lagging_since >= rate_grace_period:
+                failures.append({"time": round(now, 2), "segment": sim.segment_index, "check": "tracking",
+                                 "message": "Oven cannot follow the ramp.",
+                                 "temperature": round(temp, 2), "setpoint": round(setpoint, 2)})
+                lagging_since = False  # Reported once until the oven catches up
+        else:
+            lagging_since = None
+        setpoint = sim.get_step(now)
+        if now - last_sample >= sample_interval or sim.segment_index != last_segment:
+            trajectory["time"].append(round(now, 2))
+            trajectory["temperature"].append(round(temp, 2))
+            trajectory["setpoint"].append(round(setpoint, 2))
+            trajectory["segment"].append(sim.segment_index)
+            last_sample = now
+            last_segment = sim.segment_index
+        wake = min(max(sim.next_wake(now, resolution), now + min_interval),
+                   now + max_interval)
+    return {"duration": program.duration(), "steps": steps,
+            "trajectory": trajectory, "failures": failures}
+
+def solve3(m, v):
+    """Solves the 3x3 linear system m * x = v (Gaussian elimination); None when singular."""
+    a = [list(m[i]) + [v[i]] for i in range(3)]
+    for col in range(3):
+        pivot = max(range(col, 3), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-12:
+            return None
+        a[col], a[pivot] = a[pivot], a[col]
+        for r in range(col + 1, 3):
+            f = a[r][col] / a[col][col]
+            for c in range(col, 4):
+                a[r][c] -= f * a[col][c]
+    x = [0., 0., 0.]
+    for r in (2, 1, 0):
+        x[r] = (a[r][3] - sum(a[r][c] * x[c] for c in range(r + 1, 3))) / a[r][r]
+    return x
+
+class OvenCalibration:
+    """
+    CALIBRATE_OVEN as a state machine driven by a reactor timer:
+
+        heating -> settling -> cooling -> fitting -> done (or failed)
+
+    Every sample (time, temperature, heater power) is kept in flat arrays. The
+    heat/cool rates come from the unrounded samples. The samples are also
+    fitted by least squares to a first-order-plus-dead-time model
+
+        tau * dT/dt = ambient + gain * power(t - dead_time) - T
+
+    The fit rewrites the model as dT/dt = a*T + b*power + c. The sums of the
+    normal equations that do not involve the power are prefix sums built once,
+    so each dead-time candidate only adds up its power terms. The work is
+    split into at most CALIBRATION_FIT_SAMPLES samples per timer wake-up, and
+    the candidate with the smallest residual wins.
+    """
+    HEATING = "heating"
+    SETTLING = "settling"
+    COOLING = "cooling"
+    FITTING = "fitting"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, target, cool_time, interval):
+        self.target = target
+        self.cool_time = cool_time
+        self.interval = interval
+        self.state = self.HEATING
+        self.message = ""
+        self.times = array.array("d")
+        self.temps = array.array("d")
+        self.powers = array.array("d")
+        self.heat_rate = self.cool_rate = 0.
+        self.model = None
+        self._phase_start = 0
+        self._cool_start = 0
+        self._delay = 0
+        self._best = None
+        self._k = 0  # Next sample of the prefix sums or of the current candidate
+        self._slopes = array.array("d")
+        self._prefix = [array.array("d", [0.]) for _ in range(self._PREFIX_SUMS)]
+        self._prefix_done = False
+        self._power_sums = [0., 0., 0., 0.]
+
+    def is_active(self):
+        return self.state not in (self.DONE, self.FAILED)
+
+    def sample(self, eventtime, temp, power):
+        """
+        Records one sample and advances the state; returns the new heater
+        target when it has to change, else None.
+        """
+        self.times.append(eventtime)
+        self.temps.append(temp)
+        self.powers.append(power)
+        n = len(self.times) - 1
+        elapsed = eventtime - self.times[self._phase_start]
+        if self.state == self.HEATING:
+            # A heater without overshoot only approaches the target
+            if temp >= self.target - TEMP_RANGE_TOLERANCE:
+                self.heat_rate = (temp - self.temps[0]) / max(elapsed, self.interval)
+                self.state = self.SETTLING
+                self._phase_start = n
+            elif elapsed > CALIBRATION_HEAT_TIMEOUT:
+                self.state = self.FAILED
+                self.message = "Oven did not reach %.1f in %.0f min" % (
+                    self.target, CALIBRATION_HEAT_TIMEOUT / 60.)
+                return 0.
+        elif self.state == self.SETTLING:
+            if elapsed >= CALIBRATION_SETTLE_TIME:
+                # The heater is switched off from the next sample on
+                self.state = self.COOLING
+                self._phase_start = self._cool_start = n
+                return 0.
+        elif self.state == self.COOLING:
+            if elapsed >= self.cool_time:
+                self.cool_rate = (self.temps[self._cool_start] - temp) / elapsed
+                self.state = self.FITTING
+        return None
+
+    # Prefix sums over the samples k < index of T, T*T, dT/dt, T*dT/dt,
+    # (dT/dt)^2 and of the count; samples with dt <= 0 are left out
+    _PREFIX_SUMS = 6
+
+    def fit_step(self, budget=CALIBRATION_FIT_SAMPLES):
+        """Goes through at most `budget` samples of the fit; False once it is finished."""
+        n = len(self.times) - 1
+        if not self._prefix_done:
+            budget = self._build_prefix(n, budget)
+            if not self._prefix_done:
+                return True
+        max_delay = min(int(CALIBRATION_MAX_DEAD_TIME / self.interval), len(self.times) // 4)
+        while budget > 0:
+            if self._delay > max_delay:
+                self._finish_fit()
+                return False
+            stop = min(self._k + budget, n)
+            budget -= stop - self._k
+            self._add_power_sums(self._delay, stop)
+            if self._k == n:
+                result = self._fit(self._delay)
+                if result is not None and (self._best is None or result[0] < self._best[0]):
+                    self._best = result
+                self._delay += 1
+                self._k = self._delay
+                self._power_sums = [0., 0., 0., 0.]
+        return True
+
+    def _build_prefix(self, n, budget):
+        """Extends the prefix sums by up to `budget` samples; returns the budget left."""
+        t, temps = self.times, self.temps
+        stop = min(self._k + budget, n)
+        for k in range(self._k, stop):
+            dt = t[k + 1] - t[k]
+            if dt > 0.:
+                temp = temps[k]
+                y = (temps[k + 1] - temp) / dt
+                values = (temp, temp * temp, y, temp * y, y * y, 1.)
+            else:
+                y = 0.
+                values = (0.,) * self._PREFIX_SUMS
+            self._slopes.append(y)
+            for prefix, value in zip(self._prefix, values):
+                prefix.append(prefix[-1] + value)
+        budget -= stop - self._k
+        self._k = stop
+        if stop == n:
+            self._prefix_done = True
+            self._k = self._delay
+        return budget
+
+    def _add_power_sums(self, delay, stop):
+        """Adds samples self._k..stop of the power terms of candidate `delay`."""
+        t, temps, powers, slopes = self.times, self.temps, self.powers, self._slopes
+        s_tu, s_uu, s_u, s_uy = self._power_sums
+        for k in range(self._k, stop):
+            if t[k + 1] - t[k] <= 0.:
+                continue
+            u = powers[k - delay]
+            s_tu += temps[k] * u
+            s_uu += u * u
+            s_u += u
+            s_uy += u * slopes[k]
+        self._power_sums = [s_tu, s_uu, s_u, s_uy]
+        self._k = stop
+
+    def _fit(self, delay):
+        """(residual, a, b, c, delay) of the fit with the power delayed by `delay` samples."""
+        n = len(self.times) - 1
+        s_t, s_tt, s_y, s_ty, s_yy, count = [prefix[n] - prefix[delay] for prefix in self._prefix]
+        s_tu, s_uu, s_u, s_uy = self._power_sums
+        x = solve3([[s_tt, s_tu, s_t], [s_tu, s_uu, s_u], [s_t, s_u, count]], [s_ty, s_uy, s_y])
+        if x is None:
+            return None
+        residual = s_yy - (x[0] * s_ty + x[1] * s_uy + x[2] * s_y)
+        return (residual, x[0], x[1], x[2], delay)
+
+    def _finish_fit(self):
+        self.state = self.DONE
+        if self._best is None or self._best[1] >= 0. or self._best[2] <= 0.:
+            self.message = "Thermal model fit failed; only the rates were measured"
+            return
+        residual, a, b, c, delay = self._best
+        tau = -1. / a
+        self.model = {
+            "gain": b * tau,
+            "time_constant": tau,
+            "dead_time": delay * self.interval,
+            "ambient": c * tau,
+        }
+
+    def status(self):
+        status = {"state": self.state, "samples": len(self.times), "message": self.message}
+        if self.state == self.DONE:
+            status.update({"heat_rate": self.heat_rate, "cool_rate": self.cool_rate,
+                           "model": self.model})
+        return status
+
+def write_json_atomic(path, data):
+    """Writes via a temporary file and rename, so a restart never leaves half a file."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, separators=(",", ":")))
+    os.replace(str(tmp), str(path))
+
+class ProgramCheckpoint:
+    """
+    Progress of the running program in `directory`: the program itself
+    (segments and their hash) is written once when it starts, then only the
+    small checkpoint file with the hash, elapsed time, segment and state.
+    """
+    def __init__(self, directory, name="pizza_oven"):
+        self.directory = pathlib.Path(directory).expanduser()
+        self.path = self.directory / (CHECKPOINT_FILE % name)
+        self.program_path = self.directory / (CHECKPOINT_PROGRAM_FILE % name)
+        self.program_hash = None
+
+    def start(self, program):
+        segments = [list(spec) for spec in program]
+        self.program_hash = hashlib.sha1(json.dumps(segments).encode()).hexdigest()
+        write_json_atomic(self.program_path, {"hash": self.program_hash, "segments": segments,
+                                              "start_temp": program.start_temp})
+
+    def save(self, elapsed, segment, state, wall_time):
+        if self.program_hash is None:
+            return
+        write_json_atomic(self.path, {"hash": self.program_hash, "elapsed": round(elapsed, 3),
+                                      "segment": segment, "state": state, "time": wall_time})
+
+    def load(self, table_size=0):
+        """(checkpoint, Program) of the last run; raises ValueError when there is none."""
+        try:
+            checkpoint = json.loads(self.path.read_text())
+            saved = json.loads(self.program_path.read_text())
+        except (OSError, ValueError):
+            raise ValueError("No program checkpoint found")
+        if checkpoint.get("hash") != saved.get("hash"):
+            raise ValueError("Program checkpoint does not match the saved program")
+        program = Program(table_size)
+        for target, ramp_time, hold_time, method in saved["segments"]:
+            program.add_segment(target, ramp_time, method, hold_time)
+        program.set_start_temp(saved.get("start_temp", AMBIENT_TEMP))
+        self.program_hash = saved["hash"]
+        return checkpoint, program
+
+class TelemetryBuffer:
+    """
+    Fixed-size ring buffer of program samples (time, temperature, setpoint,
+    segment index, heater power), stored in flat arrays so that a long
+    program neither grows memory nor writes to klippy.log.
+    """
+    FIELDS = ("time", "temperature", "setpoint", "segment", "power")
+
+    def __init__(self, size):
+        self.size = size
+        self._time = array.array("d", bytes(8 * size))
+        self._temp = array.array("d", bytes(8 * size))
+        self._setpoint = array.array("d", bytes(8 * size))
+        self._segment = array.array("i", bytes(4 * size))
+        self._power = array.array("d", bytes(8 * size))
+        self._next = 0
+        self.count = 0  # Samples appended since the last clear()
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
+
+    def append(self, eventtime, temp, setpoint, segment, power):
+        if not self.size:
+            return
+        i = self._next
+        self._time[i] = eventtime
+        self._temp[i] = temp
+        self._setpoint[i] = setpoint
+        self._segment[i] = segment
+        self._power[i] = power
+        self._next = (i + 1) % self.size
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def latest(self):
+        """The newest sample as a dict; None when the buffer is empty."""
+        if not len(self):
+            return None
+        i = (self._next - 1) % self.size
+        return {"time": round(self._time[i], 2), "temperature": round(self._temp[i], 2),
+                "setpoint": round(self._setpoint[i], 2), "segment": self._segment[i],
+                "power": round(self._power[i], 3)}
+
+    def snapshot(self, decimation=1):
+        """Every `decimation`-th sample, oldest first, as columns (the newest is always included)."""
+        n = len(self)
+        first = (self._next - n) % self.size if n else 0
+        indexes = [(first + j) % self.size for j in range((n - 1) % decimation, n, decimation)]
+        return {
+            "time": [round(self._time[i], 2) for i in indexes],
+            "temperature": [round(self._temp[i], 2) for i in indexes],
+            "setpoint": [round(self._setpoint[i], 2) for i in indexes],
+            "segment": [self._segment[i] for i in indexes],
+            "power": [round(self._power[i], 3) for i in indexes],
+        }
+
+
+class OvenZones:
+    """
+    All oven zones: [pizza_oven] and any [pizza_oven <zone>] sections, each
+    with its own heater, program, calibration and checks. One reactor timer
+    steps the programs of every zone in a single pass; EXECUTE_PROGRAM ZONE=ALL
+    starts them with the same start time so they run in lockstep.
+
+    The zone commands are dispatched here rather than by Klipper's mux
+    commands, so that ZONE= is case-insensitive like the other parameters.
+    """
+    def __init__(self, printer):
+        self.printer = printer
+        self.reactor = printer.get_reactor()
+        self.gcode = printer.lookup_object("gcode")
+        self.zones = collections.OrderedDict()
+        self.timer = None
+        self._commands = {}  # Command -> {ZONE= value in upper case, None for no ZONE: handler}
+        self.register_command("EXECUTE_PROGRAM", ZONE_ALL, self.program_execute,
+                              PROGRAM_EXECUTE_HELP)
+        self.register_command("CANCEL_PROGRAM", ZONE_ALL, self.program_cancel,
+                              PROGRAM_CANCEL_HELP)
+        printer.register_event_handler("klippy:ready", self._klipper_ready)
+        printer.register_event_handler("klippy:shutdown", self._klipper_shutdown)
+
+    def register_command(self, cmd, zone, func, desc):
+        """Registers `func` for `cmd` with ZONE=`zone`; `zone` None is the default when ZONE is missing."""
+        handlers = self._commands.get(cmd)
+        if handlers is None:
+            handlers = self._commands[cmd] = {}
+            self.gcode.register_command(cmd, lambda gcmd: self._dispatch(cmd, gcmd), desc=desc)
+        handlers[None if zone is None else zone.upper()] = func
+
+    def _dispatch(self, cmd, gcmd):
+        zone = gcmd.get("ZONE", None)
+        func = self._commands[cmd].get(None if zone is None else zone.upper())
+        if func is None:
+            raise gcmd.error("The value '%s' is not valid for ZONE" % zone)
+        func(gcmd)
+
+    def add_zone(self, oven):
+        self.zones[oven.zone] = oven
+
+    def _klipper_ready(self):
+        self.timer = self.reactor.register_timer(self._step_timer)
+
+    def _klipper_shutdown(self):
+        if self.timer is not None:
+            self.reactor.unregister_timer(self.timer)
+
+    def schedule(self, oven, waketime):
+        oven._next_wake = waketime
+        self.reactor.update_timer(self.timer, min(z._next_wake for z in self.zones.values()))
+
+    def _step_timer(self, eventtime):
+        next_wake = self.reactor.NEVER
+        for oven in self.zones.values():
+            if oven._next_wake <= eventtime:
+                oven._next_wake = oven._step(eventtime)
+            next_wake = min(next_wake, oven._next_wake)
+        return next_wake
+
+    def program_execute(self, gcmd):
+        ovens = [oven for oven in self.zones.values()
+                 if oven.program and not oven.program.is_empty()]
+        if not ovens:
+            raise gcmd.error("No zone has a program")
+        for oven in ovens:
+            error = oven._start_error()
+            if error:
+                raise gcmd.error("Zone %s: %s" % (oven.zone, error))
+        eventtime = self.reactor.monotonic()
+        for oven in ovens:
+            oven._start_program(eventtime=eventtime)
+        gcmd.respond_info("Programs started in zones: %s"
+                          % ", ".join(oven.zone for oven in ovens))
+
+    def program_cancel(self, gcmd):
+        for oven in self.zones.values():
+            oven.program_cancel(gcmd)
+
+    def status(self, eventtime):
+        return {name: oven.zone_status(eventtime) for name, oven in self.zones.items()}
+
+def lookup_zones(printer):
+    zones = printer.lookup_object(OVEN_ZONES_OBJECT, None)
+    if zones is None:
+        zones = OvenZones(printer)
+        printer.add_object(OVEN_ZONES_OBJECT, zones)
+    return zones
+
+
 class PizzaOven:
     def __init__(self, config):
         self.printer = config.get_printer()
         self.reactor = self.printer.get_reactor()
+        # [pizza_oven] is the default zone (commands without ZONE=),
+        # [pizza_oven <zone>] sections are selected with ZONE=<zone>
+        self.section = config.get_name()
+        self.zone = self.section.split()[-1]
+        self.default_zone = " " not in self.section
+        self.label = "oven" if self.default_zone else "oven zone %s" % self.zone
+        if self.zone.upper() == ZONE_ALL:
+            raise config.error("Oven zone name '%s' is reserved" % self.zone)
         vsd = self.printer.load_object(config, "virtual_sdcard")
         self.config_path = pathlib.Path(vsd.sdcard_dirname)
-        gcode = self.printer.lookup_object("gcode")
+        self.gcode = gcode = self.printer.lookup_object("gcode")
         self.pheaters = self.printer.load_object(config, "heaters")
         self.heater = self.pheaters.setup_heater(config)
+        self.zones = lookup_zones(self.printer)
+        if any(zone.upper() == self.zone.upper() for zone in self.zones.zones):
+            raise config.error("Oven zone '%s' is defined twice (zone names ignore case)" % self.zone)
         self.program = None
         self._prev_target = 0.
-        self._prev_temp =  0.
         self._running = False
+        # Program progress reported by get_status: idle, running, complete or cancelled
+        self._program_state = "idle"
+        self._stopped_elapsed = 0.
+        self._status_cache = None  # (eventtime, status)
+        # Checkpoints of the running program for RESUME_PROGRAM after a restart
+        # (every checkpoint_interval seconds, 0 = off), next to the gcodes dir
+        self.checkpoint_interval = config.getfloat("checkpoint_interval", 60., minval=0.)
+        self.resume_max_gap = config.getfloat("resume_max_gap", 900., minval=0.)
+        self.checkpoint = ProgramCheckpoint(config.get("checkpoint_dir", str(self.config_path.parent)),
+                                            self.section.replace(" ", "_"))
+        self._next_checkpoint = 0.
+        self._resumable = False
+        self.wall_clock = time.time
         self.heat_rate = config.getfloat("heat_rate", 0.)
         self.cool_rate = config.getfloat("cool_rate", 0.)
+        # First-order-plus-dead-time model fitted by CALIBRATE_OVEN (None until calibrated)
+        self.thermal_model = None
+        if config.getfloat("model_time_constant", None) is not None:
+            self.thermal_model = {
+                "gain": config.getfloat("model_gain", 0.),
+                "time_constant": config.getfloat("model_time_constant"),
+                "dead_time": config.getfloat("model_dead_time", 0.),
+                "ambient": config.getfloat("model_ambient", AMBIENT_TEMP),
+            }
+        self.calibrate_sample_interval = config.getfloat("calibrate_sample_interval", 0.5, above=0.)
+        self.calibration = None
+        # Points of the precomputed setpoint table of eased ramps (0 = evaluate directly)
+        self.ramp_table_size = config.getint("ramp_table_size", RAMP_TABLE_SIZE, minval=0)
+        # Adaptive step timer: the setpoint is updated whenever it moves by
+        # setpoint_resolution degrees, but at most every min_step_interval and
+        # at least every safety_check_interval seconds (holds only wake for the
+        # safety check and the end of the segment).
+        self.setpoint_resolution = config.getfloat("setpoint_resolution", 0.5, above=0.)
+        self.min_step_interval = config.getfloat("min_step_interval", 0.5, above=0.)
+        self.safety_check_interval = config.getfloat("safety_check_interval", 10., above=0.)
+        # Heating/cooling checks: slope over rate_window seconds, failures
+        # tolerated for rate_grace_period seconds
+        self.rate_window = config.getfloat("rate_window", 60., above=0.)
+        self.rate_grace_period = config.getfloat("rate_grace_period", 60., minval=0.)
+        self.rate_monitor = None
+        self._next_wake = self.reactor.NEVER  # Set by the OvenZones step timer
+        self._segment = -1
+        # Program telemetry: the last telemetry_size samples; get_status has
+        # only the newest, GET_TELEMETRY reports every telemetry_decimation-th
+        self.telemetry = TelemetryBuffer(config.getint("telemetry_size", 3600, minval=0))
+        self.telemetry_decimation = config.getint("telemetry_decimation", 10, minval=1)
+        # LOAD_PROGRAM: path -> (mtime_ns, size, Program), least recently used first
+        self._program_cache = collections.OrderedDict()
+        self.zones.add_zone(self)
 
-        gcode.register_command("CALIBRATE_OVEN", self.calibrate, False,
-                               desc=CALIBRATE_OVEN_HELP)
-        gcode.register_command("EXECUTE_PROGRAM", self.program_execute, False,
-                               desc=PROGRAM_EXECUTE_HELP)
-        gcode.register_command("CANCEL_PROGRAM", self.program_cancel, False,
-                               desc=PROGRAM_CANCEL_HELP)
-        gcode.register_command("CLEAR_PROGRAM", self.program_clear, False,
-                               desc=PROGRAM_CLEAR_HELP)
-        gcode.register_command("ADD_SEGMENT", self.segment_add, False,
-                               desc=ADD_SEGMENT_HELP)
+        for cmd, func, desc in (
+                ("CALIBRATE_OVEN", self.calibrate, CALIBRATE_OVEN_HELP),
+                ("EXECUTE_PROGRAM", self.program_execute, PROGRAM_EXECUTE_HELP),
+                ("CANCEL_PROGRAM", self.program_cancel, PROGRAM_CANCEL_HELP),
+                ("CLEAR_PROGRAM", self.program_clear, PROGRAM_CLEAR_HELP),
+                ("ADD_SEGMENT", self.segment_add, ADD_SEGMENT_HELP),
+                ("LOAD_PROGRAM", self.program_load, LOAD_PROGRAM_HELP),
+                ("SIMULATE_PROGRAM", self.program_simulate, SIMULATE_PROGRAM_HELP),
+                ("RESUME_PROGRAM", self.program_resume, RESUME_PROGRAM_HELP),
+                ("GET_TELEMETRY", self.get_telemetry, GET_TELEMETRY_HELP)):
+            self.zones.register_command(cmd, None if self.default_zone else self.zone,
+                                        func, desc)
         self.printer.register_event_handler("klippy:ready",
                                             self._klipper_ready)
         self.printer.register_event_handler("klippy:shutdown",
                                             self._klipper_shutdown)
+        self.printer.register_event_handler("klippy:disconnect",
+                                            self._klipper_disconnect)
 
     def _klipper_ready(self):
-        self.timer = self.reactor.register_timer(self._step_timer)
+        self.calibration_timer = self.reactor.register_timer(self._calibration_timer)
+        if self.checkpoint_interval:
+            try:
+                checkpoint, _ = self.checkpoint.load()
+            except ValueError:
+                return
+            self._resumable = checkpoint["state"] == "running"
+            if self._resumable:
+                logging.info("Program interrupted at %.0fs, run RESUME_PROGRAM to continue",
+                             checkpoint["elapsed"])
 
     def _klipper_shutdown(self):
+        self._save_checkpoint(self.reactor.monotonic())
         self.heater.set_temp(0.)
-        self.reactor.unregister_timer(self.timer)
+        self.reactor.unregister_timer(self.calibration_timer)
 
-    def _step_timer(self, eventtime):
+    def _klipper_disconnect(self):
+        # Klipper is restarting; the program can continue with RESUME_PROGRAM
+        self._save_checkpoint(self.reactor.monotonic())
+
+    def _save_checkpoint(self, eventtime):
+        if not self.checkpoint_interval or self._program_state == "idle" or not self.program:
+            return
+        elapsed = self._program_elapsed(eventtime) if self._running else self._stopped_elapsed
+        try:
+            self.checkpoint.save(elapsed, self.program.segment_index, self._program_state, self.wall_clock())
+        except OSError as e:
+            logging.warning("Pizza oven checkpoint not saved: %s", e)
+        self._next_checkpoint = eventtime + self.checkpoint_interval
+
+    def _step(self, eventtime):
+        """One step of the running program; returns the next wake time (OvenZones timer)."""
+        self._status_cache = None
         current_temp, target_temp = self.heater.get_temp(eventtime)
         if self.program.is_done():
             self.pheaters.set_temperature(self.heater, 0.)
+            self._running = False
+            self._program_state = "complete"
+            self._stopped_elapsed = self.program.duration()
+            self._save_checkpoint(eventtime)
+            logging.info("Pizza %s program finished", self.label)
             return self.reactor.NEVER
 
-        logging.info(f"Current temp: {round(current_temp, 4)}, target temp: {round(target_temp, 4)}"
-              f" eventtime: {eventtime}, prev target: {round(self._prev_target, 4)}, "
-              f"diff: {round(self._prev_target - current_temp, 4)}, new target:")
-        if self._prev_target:
-            if self.program.get_current_target() > self._prev_target and \
-                not in_range(current_temp, self._prev_target, self.heat_rate):
-                raise CommandError("Oven not heating at expected rate.")
-            elif self.program.get_current_target() < self._prev_target and \
-                not in_range(current_temp, self._prev_temp, self.cool_rate):
-                raise CommandError("Oven not cooling at expected rate.")
-
-        self._prev_temp = current_temp
+        if eventtime - self._next_wake > LATE_TIMER_WARNING:
+            logging.warning("Pizza %s step timer %.1fs late", self.label,
+                            eventtime - self._next_wake)
+        check = self.rate_monitor.update(eventtime, current_temp, self._prev_target,
+                                         self.program.setpoint_rate(eventtime))
+        if check:
+            self._log_anomaly("not " + check, current_temp)
+            # A failed safety check must not be resumed
+            self._running = False
+            self._program_state = "error"
+            self._stopped_elapsed = self._program_elapsed(eventtime)
+            self._save_checkpoint(eventtime)
+            raise CommandError("%s not %s at expected rate." % (self.label.capitalize(), check))
+
         temp = self.program.get_step(eventtime)
         if temp != self._prev_target:
             self.pheaters.set_temperature(self.heater, temp)
             self._prev_target = temp
 
-        return eventtime + 1
+        segment = self.program.segment_index
+        if segment != self._segment:
+            logging.info("Pizza %s program: segment %d started at %.0fs, target %.1f, temp %.1f",
+                         self.label, segment, self.program.elapsed(eventtime),
+                         self.program.get_current_target(), current_temp)
+            self._segment = segment
+        self.telemetry.append(eventtime, current_temp, temp, segment,
+                              self.heater.get_status(eventtime)["power"])
+        if self.checkpoint_interval and eventtime >= self._next_checkpoint:
+            self._save_checkpoint(eventtime)
+
+        wake = self.program.next_wake(eventtime, self.setpoint_resolution)
+        return min(max(wake, eventtime + self.min_step_interval),
+                   eventtime + self.safety_check_interval)
+
+    def _log_anomaly(self, what, current_temp):
+        logging.warning("Pizza %s %s at expected rate for %.0fs: temp %.1f, setpoint %.1f, "
+                        "rate %.3f C/s", self.label, what, self.rate_grace_period, current_temp,
+                        self._prev_target, self.rate_monitor.rate())
 
     def calibrate(self, gcmd):
         calibration_temp = gcmd.get_float("TEMP", self.heater.max_temp - 20)
         cool_wait = gcmd.get_int("COOL_RATE_TIME", 300)
-        toolhead = self.printer.lookup_object("toolhead")
-        heat_rate = 0.
-        cool_rate = 0.
+        if self._running:
+            raise gcmd.error("Program is running. Run CANCEL_PROGRAM first.")
+        if self.calibration and self.calibration.is_active():
+            raise gcmd.error("Calibration is already running.")
 
-        start_temp = current_temp = list(map(int, self.heater.get_temp(0)))[0]
-        start_time = eventtime = self.reactor.monotonic()
+        eventtime = self.reactor.monotonic()
+        self.calibration = OvenCalibration(calibration_temp, cool_wait,
+                                           self.calibrate_sample_interval)
+        self._status_cache = None
         self.pheaters.set_temperature(self.heater, calibration_temp)
-        
-        while current_temp <= calibration_temp and not self.printer.is_shutdown():
-            print_time = toolhead.get_last_move_time()
-            eventtime = self.reactor.pause(eventtime + 1.)
-            current_temp, _ = self.heater.get_temp(eventtime)
-        
-        heat_rate = (round(current_temp) - round(start_temp)) / (eventtime - start_time)
-
-        # Wait for a few seconds for the temperature to settle
-        eventtime = self.reactor.pause(eventtime + 20.)
-
-        # target would be a step higher than upper from the loop
-        # below
-        start_temp, _ = self.heater.get_temp(eventtime)
-        self.pheaters.set_temperature(self.heater, 0.)
-        start_time = eventtime = self.reactor.monotonic()
-        while not self.printer.is_shutdown():
-            print_time = toolhead.get_last_move_time()
-            eventtime = self.reactor.pause(eventtime + 1.)
-            if eventtime - start_time >= cool_wait:
-                break
-
-        end_temp, _ = self.heater.get_temp(eventtime)
-        cool_rate = (round(start_temp) - round(end_temp)) / (eventtime - start_time)
-            
+        self.reactor.update_timer(self.calibration_timer, eventtime)
+        gcmd.respond_info("Oven calibration started: heating to %.1f, then cooling for %ds"
+                          % (calibration_temp, cool_wait))
+
+    def _calibration_timer(self, eventtime):
+        self._status_cache = None
+        calibration = self.calibration
+        if calibration.state == calibration.FITTING:
+            if calibration.fit_step():
+                # Leave the reactor to the heater and MCU timers in between
+                return eventtime + CALIBRATION_FIT_PAUSE
+            self._calibration_done()
+            return self.reactor.NEVER
+
+        current_temp, _ = self.heater.get_temp(eventtime)
+        power = self.heater.get_status(eventtime)["power"]
+        target = calibration.sample(eventtime, current_temp, power)
+        if target is not None:
+            self.pheaters.set_temperature(self.heater, target)
+        if calibration.state == calibration.FAILED:
+            logging.warning("Pizza %s calibration failed: %s", self.label, calibration.message)
+            self.gcode.respond_info("Oven calibration failed: %s" % calibration.message)
+            return self.reactor.NEVER
+        if calibration.state == calibration.FITTING:
+            return eventtime + CALIBRATION_FIT_PAUSE
+        return eventtime + calibration.interval
 
+    def _calibration_done(self):
+        calibration = self.calibration
+        self.heat_rate = calibration.heat_rate
+        self.cool_rate = calibration.cool_rate
         config = self.printer.lookup_object("configfile")
-        config.set("pizza_oven", "heat_rate", heat_rate)
-        config.set("pizza_oven", "cool_rate", cool_rate)
+        config.set(self.section, "heat_rate", "%.5f" % calibration.heat_rate)
+        config.set(self.section, "cool_rate", "%.5f" % calibration.cool_rate)
+        lines = ["Oven calibration done: heat_rate=%.4f cool_rate=%.4f"
+                 % (calibration.heat_rate, calibration.cool_rate)]
+        model = calibration.model
+        if model is not None:
+            self.thermal_model = model
+            for name, value in sorted(model.items()):
+                config.set(self.section, "model_" + name, "%.4f" % value)
+            lines.append("Thermal model: gain=%.1f time_constant=%.1fs dead_time=%.1fs ambient=%.1f"
+                         % (model["gain"], model["time_constant"], model["dead_time"], model["ambient"]))
+        else:
+            lines.append(calibration.message)
+        lines.append("Run SAVE_CONFIG to store the results.")
+        logging.info("Pizza %s calibration: %s", self.label, "; ".join(lines[:2]))
+        self.gcode.respond_info("\n".join(lines))
+
+    def _start_error(self):
+        if not self.heat_rate or not self.cool_rate:
+            return "Oven is not calibrated. Run CALIBRATE_OVEN first."
+        if self.calibration and self.calibration.is_active():
+            return "Calibration is running. Run CANCEL_PROGRAM first."
+        if not self.program or self.program.is_empty():
+            return "Program is empty"
+        return None
 
     def program_execute(self, gcmd):
+        error = self._start_error()
+        if error:
+            raise gcmd.error(error)
+        self._start_program(start_temp=gcmd.get_float("START_TEMP", None, minval=0.))
+        logging.info("Pizza %s program started...", self.label)
+
+    def _start_program(self, elapsed=0., eventtime=None, start_temp=None):
+        if eventtime is None:
+            eventtime = self.reactor.monotonic()
+        if not elapsed:
+            # The first ramp starts where the oven is, so a warm oven (e.g. a
+            # job started during the last one's cool-down) is not cooled first
+            if start_temp is None:
+                start_temp = max(self.heater.get_temp(eventtime)[0], AMBIENT_TEMP)
+            self.program.set_start_temp(start_temp)
+        self.program.reset()
+        self.program.start(eventtime, elapsed)
+        self._prev_target = 0.
+        self.rate_monitor = self._make_rate_monitor()
+        self._segment = -1
+        self.telemetry.clear()
+        self._running = True
+        self._program_state = "running"
+        self._status_cache = None
+        if self.checkpoint_interval:
+            try:
+                self.checkpoint.start(self.program)
+            except OSError as e:
+                logging.warning("Pizza oven checkpoint not saved: %s", e)
+            self._save_checkpoint(eventtime)
+        self.zones.schedule(self, eventtime + 1)
+
+    def program_resume(self, gcmd):
+        max_gap = gcmd.get_float("MAX_GAP", self.resume_max_gap, minval=0.)
         if not self.heat_rate or not self.cool_rate:
             raise gcmd.error("Oven is not calibrated. Run CALIBRATE_OVEN first.")
+        if self._running or (self.calibration and self.calibration.is_active()):
+            raise gcmd.error("Oven is busy. Run CANCEL_PROGRAM first.")
+        try:
+            checkpoint, program = self.checkpoint.load(self.ramp_table_size)
+        except ValueError as e:
+            raise gcmd.error(str(e))
+        if checkpoint["state"] != "running":
+            raise gcmd.error("Last program was not interrupted (%s)" % checkpoint["state"])
+        gap = self.wall_clock() - checkpoint["time"]
+        if gap > max_gap:
+            raise gcmd.error("Program was interrupted %.0f min ago, longer than MAX_GAP=%.0fs"
+                             % (gap / 60., max_gap))
 
-        if not self.program or self.program.is_empty():
-            raise gcmd.error("Program is empty")
+        # Time the oven spent off is not counted; the trajectory continues
+        # from the last checkpoint
+        self.program = program
+        self._resumable = False
+        self._start_program(checkpoint["elapsed"])
+        gcmd.respond_info("Program resumed at %.0f min (segment %d of %d), %.0f min left"
+                          % (checkpoint["elapsed"] / 60., self.program.segment_index + 1,
+                             self.program.segment_count(),
+                             (self.program.duration() - checkpoint["elapsed"]) / 60.))
 
-        self.program.reset()
-        self.program.start(self.reactor.monotonic())
-        self.reactor.update_timer(self.timer, self.reactor.monotonic() + 1)
-        logging.info("Program started...")
+    def _make_rate_monitor(self):
+        capacity = int(self.rate_window / self.min_step_interval) + 2
+        return RateMonitor(self.rate_window, self.rate_grace_period, capacity,
+                           self.heat_rate, self.cool_rate, self.thermal_model)
 
     def program_cancel(self, gcmd):
         if self.program:
-            self.reactor.update_timer(self.timer, self.reactor.NEVER)
+            self.zones.schedule(self, self.reactor.NEVER)
+        if self.calibration and self.calibration.is_active():
+            self.reactor.update_timer(self.calibration_timer, self.reactor.NEVER)
+            self.calibration.state = self.calibration.FAILED
+            self.calibration.message = "Cancelled"
+        if self._running:
+            self._program_state = "cancelled"
+            self._stopped_elapsed = self._program_elapsed(self.reactor.monotonic())
+            self._save_checkpoint(self.reactor.monotonic())
+        self._running = False
+        self._status_cache = None
         self.pheaters.set_temperature(self.heater, 0)
 
     def program_clear(self, gcmd):
-        self.reactor.update_timer(self.timer, self.reactor.NEVER)
+        self.zones.schedule(self, self.reactor.NEVER)
+        self._running = False
+        self._program_state = "idle"
+        self._status_cache = None
         self.program = None
 
+    def _check_segment(self, prev_target, temp, ramp_time):
+        return check_segment(prev_target, temp, ramp_time, self.heat_rate, self.cool_rate)
+
+    def _read_program(self, path):
+        """Parsed (not validated) program of a profile file, cached by mtime and size."""
+        stat = path.stat()
+        cached = self._program_cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            self._program_cache.move_to_end(path)
+            return cached[2]
+
+        segments = parse_program(path.read_text(encoding="utf-8", errors="ignore"))
+        if not segments:
+            raise ValueError("no ADD_SEGMENT lines")
+        program = Program(self.ramp_table_size)
+        for temp, ramp_time, ramp_mode, hold_time in segments:
+            program.add_segment(temp, ramp_time, ramp_mode, hold_time)
+
+        self._program_cache[path] = (stat.st_mtime_ns, stat.st_size, program)
+        if len(self._program_cache) > PROGRAM_CACHE_SIZE:
+            self._program_cache.popitem(last=False)
+        return program
+
+    def _validate_program(self, program):
+        prev_target = 0
+        for i, (temp, ramp_time, hold_time, method) in enumerate(program, 1):
+            error = self._check_segment(prev_target, temp, ramp_time)
+            if error:
+                raise ValueError("segment %d: %s" % (i, error))
+            if temp < self.heater.min_temp or temp > self.heater.max_temp:
+                raise ValueError("segment %d: temperature %.1f out of range" % (i, temp))
+            prev_target = temp
+
+    def _program_file(self, gcmd):
+        filename = gcmd.get("FILE")
+        root = self.config_path.resolve()
+        path = (root / filename).resolve()
+        if root not in path.parents or not path.is_file():
+            raise gcmd.error("Program file '%s' not found" % filename)
+        try:
+            return self._read_program(path)
+        except (OSError, ValueError) as e:
+            raise gcmd.error("Invalid program '%s': %s" % (filename, e))
+
+    def program_load(self, gcmd):
+        filename = gcmd.get("FILE")
+        if self._running:
+            raise gcmd.error("Program is running. Run CANCEL_PROGRAM first.")
+        program = self._program_file(gcmd)
+        try:
+            self._validate_program(program)
+        except ValueError as e:
+            raise gcmd.error("Invalid program '%s': %s" % (filename, e))
+
+        # The cached program stays a template; ADD_SEGMENT may extend the copy
+        self.program = program.copy()
+        self._program_state = "idle"
+        self._status_cache = None
+        gcmd.respond_info("Program '%s' loaded: %d segments, %.0f min"
+                          % (filename, self.program.segment_count(), self.program.duration() / 60.))
+
+    def program_simulate(self, gcmd):
+        if not self.heat_rate or not self.cool_rate:
+            raise gcmd.error("Oven is not calibrated. Run CALIBRATE_OVEN first.")
+        if gcmd.get("FILE", None) is not None:
+            program = self._program_file(gcmd)
+        elif self.program and not self.program.is_empty():
+            program = self.program
+        else:
+            raise gcmd.error("Program is empty")
+
+        current_temp, _ = self.heater.get_temp(self.reactor.monotonic())
+        result = simulate_program(program, self.heat_rate, self.cool_rate,
+                                  max(current_temp, AMBIENT_TEMP),
+                                  self.setpoint_resolution, self.min_step_interval,
+                                  self.safety_check_interval,
+                                  rate_window=self.rate_window,
+                                  rate_grace_period=self.rate_grace_period,
+                                  model=self.thermal_model)
+        failures = result["failures"]
+        lines = ["Simulated program: %.0f min, %d timer steps, %d failed checks"
+                 % (result["duration"] / 60., result["steps"], len(failures))]
+        for failure in failures[:SIMULATION_REPORTED_FAILURES]:
+            lines.append("  %.0fs: %s" % (failure["time"], failure["message"]))
+        if len(failures) > SIMULATION_REPORTED_FAILURES:
+            lines.append("  ... and %d more" % (len(failures) - SIMULATION_REPORTED_FAILURES))
+        gcmd.respond_info("\n".join(lines))
+
     def segment_add(self, gcmd):
         temp = gcmd.get_float("TEMP")
         ramp_time = gcmd.get_int("RAMP_TIME")
         ramp_mode = gcmd.get("RAMP_MODE", "LINEAR")
         hold_time = gcmd.get_int("HOLD_TIME", 0)
 
-        if not self.program:
-            self.program = Program()
+        program = self.program
+        if not program or self._program_state in ("complete", "cancelled", "error"):
+            # A finished program is not extended; the next profile starts a new one
+            program = Program(self.ramp_table_size)
 
-        prev_target = self.program.get_last_target()
-        if self.heat_rate and temp > prev_target:
-            if ramp_time * self.heat_rate < temp - prev_target:
-                raise gcmd.error("Ramp rate too fast for heater's heat rate.")
-        elif self.cool_rate:
-            if ramp_time * self.cool_rate > prev_target - temp:
-                raise gcmd.error("Cool rate too slow to meat ramp time.")
+        error = self._check_segment(program.get_last_target(), temp, ramp_time)
+        if error:
+            raise gcmd.error(error)
 
+        self.program = program
+        self._status_cache = None
+        if not self._running:
+            self._program_state = "idle"
         try:
             self.program.add_segment(temp, ramp_time, ramp_mode, hold_time)
             logging.info("Program segment added: temp=%s, ramp=%s, hold=%s",
@@ -335,11 +1457,80 @@ class PizzaOven:
         return self.heater.stats(eventtime)
     
     def get_status(self, eventtime):
+        # Moonraker polls the status for every subscriber; build it once per eventtime
+        cached = self._status_cache
+        if cached is None or cached[0] != eventtime:
+            cached = self._status_cache = (eventtime, self._build_status(eventtime))
+        if self.default_zone and len(self.zones.zones) > 1:
+            # The other zones do not invalidate this cache; a new dict keeps
+            # Klipper's status diff working
+            return dict(cached[1], zones=self.zones.status(eventtime))
+        return cached[1]
+
+    def _build_status(self, eventtime):
         status = self.heater.get_status(eventtime)
         if self.program:
             status.update({"segment_target" : self.program.get_current_target(),
+                           "program": self._program_status(eventtime),
             })
+        # The whole buffer changes on every step; it is sent by GET_TELEMETRY
+        # on request, not pushed to every status subscriber
+        status["telemetry"] = self.telemetry.latest()
+        status["resumable"] = self._resumable and not self._running
+        if self.calibration:
+            status["calibration"] = self.calibration.status()
+        return status
+
+    def zone_status(self, eventtime):
+        """Summary of this zone for the zone overview in the [pizza_oven] status."""
+        current_temp, target_temp = self.heater.get_temp(eventtime)
+        status = {"temperature": round(current_temp, 2), "target": target_temp,
+                  "state": self._program_state, "progress": 0.}
+        if self.program and self._program_state != "idle":
+            elapsed = self._program_elapsed(eventtime) if self._running else self._stopped_elapsed
+            duration = self.program.duration()
+            status["progress"] = round(elapsed / duration, 4) if duration else 0.
         return status
 
+    def _program_elapsed(self, eventtime):
+        return min(max(self.program.elapsed(eventtime), 0.), self.program.duration())
+
+    def _program_status(self, eventtime):
+        """Progress from the cached segment index and the segment end times, O(1)."""
+        program = self.program
+        duration = program.duration()
+        if self._running:
+            elapsed = self._program_elapsed(eventtime)
+        elif self._program_state == "idle":
+            elapsed = 0.
+        else:
+            elapsed = self._stopped_elapsed
+        index, segment, start, end = program.current_segment()
+        if self._program_state == "idle" and not program.is_empty():
+            index, segment, start, end = 0, program._segments[0], 0., program._ends[0]
+        phase = None
+        if segment is not None:
+            phase = "hold" if segment.method == NONE else "ramp"
+        return {
+            "state": self._program_state,
+            "segment": index,
+            "segment_count": program.segment_count(),
+            "phase": phase,
+            "setpoint": self._prev_target if self._running else 0.,
+            "segment_remaining": round(max(end - max(elapsed, start), 0.), 1),
+            "elapsed": round(elapsed, 1),
+            "remaining": round(duration - elapsed, 1),
+            "duration": duration,
+            "progress": round(elapsed / duration, 4) if duration else 0.,
+        }
+
+    def get_telemetry(self, gcmd):
+        decimation = gcmd.get_int("DECIMATION", self.telemetry_decimation, minval=1)
+        gcmd.respond_info("telemetry: %s" % json.dumps(self.telemetry.snapshot(decimation),
+                                                     separators=(",", ":")), log=False)
+
 def load_config(config):
+    return PizzaOven(config)
+
+def load_config_prefix(config):
     return PizzaOven(config)
\ No newline at end of file
@@ -0,0 +1,2 @@
+# loadtest/__init__.py
+"""Load-generation harness for the web app (see `python -m loadtest --help`)."""
@@ -0,0 +1,6 @@
+# loadtest/__main__.py
+import sys
+
+from .harness import main
+
+sys.exit(main())
@@ -0,0 +1,392 @@
+# loadtest/harness.py
+"""
+Concurrent load generator for the web app.
+
+Simulates dashboard, kiosk and console clients against a running app (or spawns
+the app and the Moonraker simulator itself) and reports latency percentiles,
+throughput, the server's event-loop lag and RSS. Scenarios are JSON files, see
+`loadtest/scenarios/`.
+
+    python -m loadtest loadtest/scenarios/default.json
+    python -m loadtest loadtest/scenarios/default.json --target http://pizza.local --output report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import websockets
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_SCENARIO: Dict[str, Any] = {
+    "duration": 30,
+    "warmup": 2,
+    "stats_interval": 1.0,
+    "spawn": {"sim_speed": 60, "profiles": 50},
+    "clients": {
+        "dashboard": {"count": 5, "poll_interval": 2.5, "websocket": True},
+        "kiosk": {"count": 1, "host_interval": 30, "websocket": True},
+        "console": {"count": 1, "interval": 2.0, "script": "M105", "transport": "websocket"},
+    },
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+class Recorder:
+    """Collects per-operation latencies and error counts."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.events: Dict[str, int] = defaultdict(int)
+        self.active = False
+
+    def ok(self, op: str, seconds: float) -> None:
+        if self.active:
+            self.latencies[op].append(seconds)
+
+    def fail(self, op: str) -> None:
+        if self.active:
+            self.errors[op] += 1
+
+    def event(self, name: str) -> None:
+        if self.active:
+            self.events[name] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        ops = {}
+        for op in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies.get(op, []))
+            ops[op] = {
+                "count": len(values),
+                "errors": self.errors.get(op, 0),
+                "throughput_rps": len(values) / elapsed if elapsed else 0.,
+                "p50_ms": _ms(percentile(values, 0.50)),
+                "p95_ms": _ms(percentile(values, 0.95)),
+                "p99_ms": _ms(percentile(values, 0.99)),
+                "max_ms": _ms(values[-1] if values else None),
+            }
+        total = sum(o["count"] for o in ops.values())
+        return {"operations": ops, "events": dict(self.events),
+                "total_requests": total, "throughput_rps": total / elapsed if elapsed else 0.}
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1e3, 2)
+
+
+async def timed_get(http: httpx.AsyncClient, rec: Recorder, op: str, url: str, **kwargs) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        r = await http.get(url, **kwargs)
+        if r.status_code >= 500:
+            rec.fail(op)
+            return r
+        rec.ok(op, time.perf_counter() - start)
+        return r
+    except httpx.HTTPError:
+        rec.fail(op)
+        return None
+
+
+async def sleep_until_stop(stop: asyncio.Event, seconds: float) -> bool:
+    """Sleeps up to `seconds`; returns True when the run is over."""
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+class StatusSocket:
+    """A frontend-like WebSocket: query + subscribe, then counts notifications and times RPCs."""
+
+    def __init__(self, ws_url: str, rec: Recorder, op_prefix: str):
+        self.ws_url = ws_url
+        self.rec = rec
+        self.op_prefix = op_prefix
+        self.ws = None
+        self._next_id = 1
+        self._pending: Dict[int, float] = {}
+
+    async def run(self, stop: asyncio.Event) -> None:
+        start = time.perf_counter()
+        try:
+            async with websockets.connect(self.ws_url, max_size=None) as ws:
+                self.ws = ws
+                self.rec.ok(f"{self.op_prefix}.ws_connect", time.perf_counter() - start)
+                await self.call("printer.objects.query", {"objects": {"print_stats": None, "display_status": None, "pizza_oven": None}})
+                await self.call("printer.objects.subscribe", {"objects": {"print_stats": None, "display_status": None, "pizza_oven": None}})
+                while not stop.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    msg = json.loads(raw)
+                    sent = self._pending.pop(msg.get("id"), None)
+                    if sent is not None:
+                        op = f"{self.op_prefix}.rpc"
+                        if (msg.get("error") or {}).get("code") == 429:
+                            self.rec.event(f"{self.op_prefix}.gcode_rejected")
+                        elif "error" in msg:
+                            self.rec.fail(op)
+                        else:
+                            self.rec.ok(op, time.perf_counter() - sent)
+                    elif msg.get("method"):
+                        self.rec.event(msg["method"])
+        except (OSError, websockets.exceptions.WebSocketException):
+            self.rec.fail(f"{self.op_prefix}.ws_connect")
+        finally:
+            self.ws = None
+
+    async def call(self, method: str, params: Dict[str, Any]) -> bool:
+        if self.ws is None:
+            return False
+        req_id = self._next_id
+        self._next_id += 1
+        self._pending[req_id] = time.perf_counter()
+        await self.ws.send(json.dumps({"jsonrpc": "2.0", "method": method, "params": params, "id": req_id}))
+        return True
+
+
+async def dashboard_client(base_url: str, cfg: Dict[str, Any], rec: Recorder, stop: asyncio.Event) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as http:
+        tasks = []
+        if cfg.get("websocket", True):
+            sock = StatusSocket(_ws_url(base_url), rec, "dashboard")
+            tasks.append(asyncio.create_task(sock.run(stop)))
+        await timed_get(http, rec, "dashboard.page", "/dashboard")
+        await timed_get(http, rec, "dashboard.profiles", "/api/gcodes/")
+        while True:
+            await timed_get(http, rec, "dashboard.temps", "/api/temps")
+            if await sleep_until_stop(stop, cfg.get("poll_interval", 2.5)):
+                break
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def kiosk_client(base_url: str, cfg: Dict[str, Any], rec: Recorder, stop: asyncio.Event) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as http:
+        tasks = []
+        if cfg.get("websocket", True):
+            sock = StatusSocket(_ws_url(base_url), rec, "kiosk")
+            tasks.append(asyncio.create_task(sock.run(stop)))
+        await timed_get(http, rec, "kiosk.page", "/display")
+        await timed_get(http, rec, "kiosk.profiles", "/api/gcodes")
+        while True:
+            await timed_get(http, rec, "kiosk.host", "/api/system/host")
+            if await sleep_until_stop(stop, cfg.get("host_interval", 30)):
+                break
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def console_client(base_url: str, cfg: Dict[str, Any], rec: Recorder, stop: asyncio.Event) -> None:
+    script = cfg.get("script", "M105")
+    interval = cfg.get("interval", 1.0)
+    if cfg.get("transport", "websocket") == "http":
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as http:
+            while True:
+                start = time.perf_counter()
+                try:
+                    r = await http.post("/api/console/send", json={"script": script})
+                    if r.status_code < 300:
+                        rec.ok("console.send_http", time.perf_counter() - start)
+                    elif r.status_code == 429:
+                        rec.event("console.gcode_rejected")  # G-code admission control
+                    else:
+                        rec.fail("console.send_http")
+                except httpx.HTTPError:
+                    rec.fail("console.send_http")
+                if await sleep_until_stop(stop, interval):
+                    return
+
+    sock = StatusSocket(_ws_url(base_url), rec, "console")
+    reader = asyncio.create_task(sock.run(stop))
+    while not await sleep_until_stop(stop, interval):
+        await sock.call("printer.gcode.script", {"script": script})
+    await asyncio.gather(reader, return_exceptions=True)
+
+
+CLIENT_TYPES = {"dashboard": dashboard_client, "kiosk": kiosk_client, "console": console_client}
+
+
+def _ws_url(base_url: str) -> str:
+    return base_url.replace("https://", "wss://").replace("http://", "ws://").rstrip("/") + "/websocket"
+
+
+def free_port() -> int:
+    """A TCP port on 127.0.0.1 that is free right now (for the app or simulator under test)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_http(url: str, timeout: float = 30.) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2) as http:
+        while time.monotonic() < deadline:
+            try:
+                await http.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Service at {url} did not come up within {timeout} s")
+
+
+@asynccontextmanager
+async def spawned_stack(spawn: Dict[str, Any]) -> AsyncIterator[str]:
+    """Starts the Moonraker simulator and the instrumented app as subprocesses."""
+    with tempfile.TemporaryDirectory(prefix="pizza_loadtest_") as tmp:
+        gcodes_dir = Path(tmp) / "gcodes"
+        config_dir = Path(tmp) / "config"
+        gcodes_dir.mkdir()
+        config_dir.mkdir()
+        for i in range(int(spawn.get("profiles", 0))):
+            (gcodes_dir / f"oven_load_{i:04d}.gcode").write_text(
+                '; METADATA: {"name": "load", "type": "annealing"}\n'
+                "ADD_SEGMENT TEMP=80 RAMP_TIME=600 HOLD_TIME=3600\nEXECUTE_PROGRAM\n")
+
+        sim_port, app_port = free_port(), free_port()
+        env = dict(os.environ, KLIPPER_API_URL=f"http://127.0.0.1:{sim_port}",
+                   GCODES_DIR=str(gcodes_dir), CONFIG_DIR=str(config_dir))
+        procs = [
+            subprocess.Popen([sys.executable, "-m", "sim", "--port", str(sim_port), "--gcodes-dir", str(gcodes_dir),
+                              "--speed", str(spawn.get("sim_speed", 1))], cwd=ROOT_DIR, env=env),
+            subprocess.Popen([sys.executable, "-m", "loadtest.serve", "--port", str(app_port)],
+                             cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL),
+        ]
+        try:
+            await _wait_http(f"http://127.0.0.1:{sim_port}/server/info")
+            await _wait_http(f"http://127.0.0.1:{app_port}/__loadtest/stats")
+            yield f"http://127.0.0.1:{app_port}"
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+
+async def sample_server_stats(base_url: str, interval: float, stop: asyncio.Event, out: List[Dict[str, Any]]) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as http:
+        while not await sleep_until_stop(stop, interval):
+            try:
+                r = await http.get("/__loadtest/stats")
+                if r.status_code == 200:
+                    out.append(r.json())
+            except httpx.HTTPError:
+                pass
+
+
+async def run_scenario(scenario: Dict[str, Any], target: Optional[str] = None) -> Dict[str, Any]:
+    if target:
+        return await _run_against(target, scenario)
+    async with spawned_stack(scenario.get("spawn") or {}) as base_url:
+        return await _run_against(base_url, scenario)
+
+
+async def _run_against(base_url: str, scenario: Dict[str, Any]) -> Dict[str, Any]:
+    rec = Recorder()
+    stop = asyncio.Event()
+    stats: List[Dict[str, Any]] = []
+
+    clients = []
+    for kind, cfg in (scenario.get("clients") or {}).items():
+        for _ in range(int(cfg.get("count", 0))):
+            clients.append(asyncio.create_task(CLIENT_TYPES[kind](base_url, cfg, rec, stop)))
+
+    await asyncio.sleep(scenario.get("warmup", 0))
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as http:
+        try:
+            await http.post("/__loadtest/reset")
+        except httpx.HTTPError:
+            pass
+    rec.active = True
+    sampler = asyncio.create_task(sample_server_stats(base_url, scenario.get("stats_interval", 1.0), stop, stats))
+    started = time.perf_counter()
+    await asyncio.sleep(scenario.get("duration", 30))
+    elapsed = time.perf_counter() - started
+    rec.active = False
+    stop.set()
+    await asyncio.gather(*clients, sampler, return_exceptions=True)
+
+    report = rec.summary(elapsed)
+    report["duration_s"] = round(elapsed, 2)
+    report["clients"] = {kind: cfg.get("count", 0) for kind, cfg in (scenario.get("clients") or {}).items()}
+    if stats:
+        rss = [s["rss_bytes"] for s in stats]
+        report["server"] = {
+            "rss_mb_max": round(max(rss) / 2**20, 1),
+            "rss_mb_last": round(rss[-1] / 2**20, 1),
+            "loop_lag": stats[-1]["loop_lag"],
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\nDuration {report['duration_s']} s, clients {report['clients']}, "
+          f"total {report['total_requests']} ops ({report['throughput_rps']:.1f} ops/s)")
+    print(f"{'operation':<24}{'count':>8}{'errors':>8}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, s in report["operations"].items():
+        fmt = lambda v: "-" if v is None else f"{v:.1f}"
+        print(f"{op:<24}{s['count']:>8}{s['errors']:>8}{s['throughput_rps']:>9.2f}"
+              f"{fmt(s['p50_ms']):>10}{fmt(s['p95_ms']):>10}{fmt(s['p99_ms']):>10}")
+    if report.get("events"):
+        print(f"notifications: {report['events']}")
+    server = report.get("server")
+    if server:
+        lag = server["loop_lag"]
+        print(f"server RSS max {server['rss_mb_max']} MB, loop lag p50 {lag.get('p50_ms', 0):.2f} ms, "
+              f"p99 {lag.get('p99_ms', 0):.2f} ms, max {lag.get('max_ms', 0):.2f} ms")
+
+
+def load_scenario(path: Optional[Path]) -> Dict[str, Any]:
+    scenario = json.loads(json.dumps(DEFAULT_SCENARIO))
+    if path:
+        loaded = json.loads(path.read_text(encoding="utf-8"))
+        clients = loaded.pop("clients", None)
+        scenario.update(loaded)
+        if clients is not None:
+            scenario["clients"] = clients
+    return scenario
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Load-test the Pizza Oven web app.")
+    parser.add_argument("scenario", type=Path, nargs="?", help="Scenario JSON file")
+    parser.add_argument("--target", help="Base URL of a running app; without it the app and simulator are spawned")
+    parser.add_argument("--duration", type=float, help="Override the scenario duration")
+    parser.add_argument("--output", type=Path, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    scenario = load_scenario(args.scenario)
+    if args.duration:
+        scenario["duration"] = args.duration
+    report = asyncio.run(run_scenario(scenario, args.target))
+    report["scenario"] = scenario
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
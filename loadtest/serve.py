@@ -0,0 +1,94 @@
+# loadtest/serve.py
+"""
+Runs the app under uvicorn with an extra `/__loadtest/stats` endpoint that
+reports event-loop lag and RSS of the server process. Used by the load-test
+harness so that production code does not need any instrumentation.
+
+    python -m loadtest.serve --port 8080
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Dict
+
+import uvicorn
+
+LAG_PROBE_INTERVAL = 0.05  # seconds
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic sleep wakes up, which is how long the loop was blocked."""
+
+    def __init__(self, interval: float = LAG_PROBE_INTERVAL, history: int = 20000):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=history)
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0., time.perf_counter() - start - self.interval))
+
+    def reset(self) -> None:
+        self.samples.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        values = sorted(self.samples)
+        if not values:
+            return {"count": 0}
+        pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+        return {"count": len(values), "mean_ms": sum(values) / len(values) * 1e3,
+                "p50_ms": pick(0.5) * 1e3, "p99_ms": pick(0.99) * 1e3, "max_ms": values[-1] * 1e3}
+
+
+def _rss_bytes() -> int:
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except ImportError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def instrument(app) -> LoopLagMonitor:
+    monitor = LoopLagMonitor()
+
+    @app.get("/__loadtest/stats", include_in_schema=False)
+    async def loadtest_stats() -> Dict[str, Any]:
+        return {"loop_lag": monitor.snapshot(), "rss_bytes": _rss_bytes()}
+
+    @app.post("/__loadtest/reset", include_in_schema=False)
+    async def loadtest_reset() -> Dict[str, bool]:
+        monitor.reset()
+        return {"ok": True}
+
+    return monitor
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the app with load-test instrumentation.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    from app.main import app
+    monitor = instrument(app)
+
+    class InstrumentedServer(uvicorn.Server):
+        # Same event loop setup as `uvicorn app.main:app`, with the lag probe running on it.
+        async def serve(self, sockets=None):
+            monitor.start()
+            await super().serve(sockets)
+
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+    InstrumentedServer(config).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# sim/__init__.py
+"""Local Moonraker/Klipper stand-in with a simulated pizza_oven heater (see `python -m sim --help`)."""
@@ -0,0 +1,97 @@
+# sim/__main__.py
+"""
+Runs the Moonraker/Klipper simulator.
+
+    python -m sim --port 7125 --speed 60
+    KLIPPER_API_URL=http://127.0.0.1:7125 uvicorn app.main:app
+
+    python -m sim --uds /tmp/moonraker.sock
+    KLIPPER_API_URL=unix:/tmp/moonraker.sock uvicorn app.main:app
+
+    python -m sim --replay oven_petg.gcode --csv trajectory.csv
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+from .klipper import SimKlipper
+from .thermal import FirstOrderOven
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m sim", description="Local Moonraker/Klipper stand-in with a simulated oven.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7125)
+    parser.add_argument("--uds", metavar="PATH", help="Listen on a Unix domain socket (like moonraker.sock) instead of TCP")
+    parser.add_argument("--gcodes-dir", type=Path, default=Path.home() / "printer_data" / "gcodes")
+    parser.add_argument("--speed", type=float, default=1., help="Simulated seconds per real second")
+    oven = parser.add_argument_group("oven")
+    oven.add_argument("--heat-rate", type=float, default=0.3, help="heat_rate in the [pizza_oven] section")
+    oven.add_argument("--cool-rate", type=float, default=0.1, help="cool_rate in the [pizza_oven] section")
+    oven.add_argument("--max-temp", type=float, default=300.)
+    oven.add_argument("--ambient", type=float, default=25.)
+    oven.add_argument("--gain", type=float, default=275., help="Steady-state temperature rise at full power")
+    oven.add_argument("--tau", type=float, default=600., help="Thermal time constant in seconds")
+    oven.add_argument("--dead-time", type=float, default=0.)
+    oven.add_argument("--zone", action="append", default=[], metavar="NAME",
+                      help="Add a [pizza_oven NAME] zone with its own heater (repeatable)")
+    replay = parser.add_argument_group("replay")
+    replay.add_argument("--replay", metavar="FILE", help="Run a profile from the gcodes dir as fast as possible and exit")
+    replay.add_argument("--csv", type=Path, help="Write the replayed trajectory to this CSV file")
+    replay.add_argument("--sample", type=float, default=10., help="Trajectory sample interval in simulated seconds")
+    replay.add_argument("--timeout", type=float, default=7 * 24 * 3600., help="Give up after this many simulated seconds")
+    return parser
+
+
+def build_klipper(args) -> SimKlipper:
+    model = FirstOrderOven(ambient=args.ambient, gain=args.gain, tau=args.tau, dead_time=args.dead_time)
+    oven_config = {"max_temp": args.max_temp, "heat_rate": args.heat_rate, "cool_rate": args.cool_rate}
+    return SimKlipper(args.gcodes_dir, oven_config=oven_config, model=model,
+                      zones={name: {} for name in args.zone})
+
+
+def replay(klipper: SimKlipper, args) -> int:
+    messages = []
+    klipper.add_gcode_listener(messages.append)
+    started = time.perf_counter()
+    klipper.run_script(f'SDCARD_PRINT_FILE FILENAME="{args.replay}"')
+    klipper.run_until(lambda: klipper.print_stats.state != "printing", args.timeout)
+
+    rows = []
+    end = klipper.now + args.timeout
+    while klipper.now < end and klipper.state == "ready":
+        status = klipper.get_object_status("pizza_oven")
+        rows.append((round(klipper.now, 1), status["temperature"], status["target"], round(status["power"], 3)))
+        if not klipper.program_running():
+            break
+        klipper.advance(args.sample)
+
+    if args.csv:
+        with args.csv.open("w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time_s", "temperature", "target", "power"])
+            writer.writerows(rows)
+
+    for msg in messages:
+        print(msg)
+    print(f"Simulated {klipper.now / 3600:.2f} h in {time.perf_counter() - started:.2f} s, "
+          f"print_stats={klipper.print_stats.state}, klippy={klipper.state}")
+    return 0 if klipper.state == "ready" and klipper.print_stats.state == "complete" else 1
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    klipper = build_klipper(args)
+    if args.replay:
+        return replay(klipper, args)
+
+    import uvicorn
+    from .moonraker import create_app
+    uvicorn.run(create_app(klipper, speed=args.speed), host=args.host, port=args.port, uds=args.uds, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
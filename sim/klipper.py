@@ -0,0 +1,592 @@
+# sim/klipper.py
+"""
+A minimal Klipper host that runs the real `klipper_module/pizza_oven.py`.
+
+Only the parts of Klipper the oven module touches are implemented: the reactor
+(timers and pause), the heaters object, the G-code dispatcher, configfile,
+virtual_sdcard and print_stats. Time is simulated; `advance()` moves the clock
+forward in steps of at most `max_step` seconds, firing timers and updating the
+thermal model on the way, so multi-hour programs can be replayed in seconds.
+"""
+import copy
+import logging
+import shlex
+from pathlib import Path
+
+from app.oven import load_oven_module
+from .thermal import FirstOrderOven, HeaterController
+
+OVEN_SECTION = "pizza_oven"
+
+
+class SimTimer:
+    def __init__(self, callback, waketime):
+        self.callback = callback
+        self.waketime = waketime
+        self.running = False
+
+
+class SimReactor:
+    NOW = 0.
+    NEVER = 9999999999999999.
+
+    def __init__(self, world):
+        self._world = world
+        self._timers = []
+
+    def monotonic(self):
+        return self._world.now
+
+    def register_timer(self, callback, waketime=NEVER):
+        timer = SimTimer(callback, waketime)
+        self._timers.append(timer)
+        return timer
+
+    def unregister_timer(self, timer):
+        if timer in self._timers:
+            self._timers.remove(timer)
+
+    def update_timer(self, timer, waketime):
+        timer.waketime = waketime
+
+    def pause(self, waketime):
+        self._world.advance_to(waketime)
+        return self._world.now
+
+    def next_waketime(self):
+        pending = [t.waketime for t in self._timers if not t.running]
+        return min(pending) if pending else self.NEVER
+
+    def run_due_timers(self):
+        now = self._world.now
+        for timer in list(self._timers):
+            if timer.running or timer.waketime > now or timer not in self._timers:
+                continue
+            timer.running = True
+            try:
+                timer.waketime = timer.callback(now)
+            finally:
+                timer.running = False
+
+
+class SimConfigError(Exception):
+    pass
+
+
+class SimConfig:
+    error = SimConfigError
+
+    def __init__(self, printer, name, options):
+        self._printer = printer
+        self._name = name
+        self._options = options
+
+    def get_printer(self):
+        return self._printer
+
+    def get_name(self):
+        return self._name
+
+    def get(self, option, default=None):
+        return self._options.get(option, default)
+
+    def getfloat(self, option, default=None, **kwargs):
+        value = self._options.get(option, default)
+        return None if value is None else float(value)
+
+    def getint(self, option, default=None, **kwargs):
+        value = self._options.get(option, default)
+        return None if value is None else int(value)
+
+
+class SimHeater:
+    def __init__(self, world, config):
+        self._world = world
+        self.name = config.get_name().split()[-1]
+        self.min_temp = config.getfloat("min_temp", 0.)
+        self.max_temp = config.getfloat("max_temp", 300.)
+        self.model = world.models[config.get_name()]
+        self.controller = HeaterController(self.model)
+        self.target_temp = 0.
+        self.last_pwm_value = 0.
+
+    def set_temp(self, degrees):
+        if degrees and (degrees < self.min_temp or degrees > self.max_temp):
+            raise self._world.command_error(
+                "Requested temperature (%.1f) out of range (%.1f:%.1f)"
+                % (degrees, self.min_temp, self.max_temp))
+        self.target_temp = degrees
+
+    def get_temp(self, eventtime):
+        return self.model.temp, self.target_temp
+
+    def update(self, dt, now):
+        self.last_pwm_value = self.controller.power(self.target_temp, self.model.temp)
+        self.model.step(self.last_pwm_value, dt, now)
+
+    def stats(self, eventtime):
+        return False, "%s: target=%.0f temp=%.1f pwm=%.3f" % (
+            self.name, self.target_temp, self.model.temp, self.last_pwm_value)
+
+    def get_status(self, eventtime):
+        return {"temperature": round(self.model.temp, 2), "target": self.target_temp,
+                "power": self.last_pwm_value}
+
+
+class SimHeaters:
+    def __init__(self, world):
+        self._world = world
+        self.heaters = {}
+
+    def setup_heater(self, config, gcode_id=None):
+        heater = SimHeater(self._world, config)
+        self.heaters[heater.name] = heater
+        return heater
+
+    def set_temperature(self, heater, temp, wait=False):
+        heater.set_temp(temp)
+
+
+class SimGCodeCommand:
+    def __init__(self, world, command, params, commandline):
+        self._world = world
+        self.error = world.command_error
+        self._command = command
+        self._params = params
+        self._commandline = commandline
+
+    def get_command(self):
+        return self._command
+
+    def get_commandline(self):
+        return self._commandline
+
+    def get_command_parameters(self):
+        return dict(self._params)
+
+    def get(self, name, default=Ellipsis, parser=str):
+        value = self._params.get(name.upper())
+        if value is None:
+            if default is Ellipsis:
+                raise self.error("Error on '%s': missing %s" % (self._commandline, name))
+            return default
+        try:
+            return parser(value)
+        except ValueError:
+            raise self.error("Error on '%s': unable to parse %s" % (self._commandline, value))
+
+    def get_float(self, name, default=Ellipsis, **kwargs):
+        return self.get(name, default, parser=float)
+
+    def get_int(self, name, default=Ellipsis, **kwargs):
+        return self.get(name, default, parser=int)
+
+    def respond_info(self, msg, log=True):
+        self._world.respond(msg)
+
+    def respond_raw(self, msg):
+        self._world.respond(msg)
+
+
+class SimGCode:
+    def __init__(self, world):
+        self._world = world
+        self.handlers = {}
+        self.help = {}
+        self.mux_commands = {}
+
+    def register_command(self, cmd, func, when_not_ready=False, desc=None):
+        self.handlers[cmd.upper()] = func
+        if desc:
+            self.help[cmd.upper()] = desc
+
+    def register_mux_command(self, cmd, key, value, func, desc=None):
+        """Same dispatch as Klipper: `value` None is the default when `key` is missing."""
+        prev = self.mux_commands.get(cmd)
+        if prev is None:
+            self.register_command(cmd, lambda gcmd: self._cmd_mux(cmd, gcmd), desc=desc)
+            prev = self.mux_commands[cmd] = (key, {})
+        prev_key, prev_values = prev
+        if prev_key != key:
+            raise self._world.command_error("mux command %s %s %s may have only one key (%s)"
+                                            % (cmd, key, value, prev_key))
+        if value in prev_values:
+            raise self._world.command_error("mux command %s %s %s already registered"
+                                            % (cmd, key, value))
+        prev_values[value] = func
+
+    def _cmd_mux(self, command, gcmd):
+        key, values = self.mux_commands[command]
+        key_param = gcmd.get(key, None) if None in values else gcmd.get(key)
+        if key_param not in values:
+            raise gcmd.error("The value '%s' is not valid for %s" % (key_param, key))
+        values[key_param](gcmd)
+
+    def respond_info(self, msg, log=True):
+        self._world.respond(msg)
+
+    def run_script(self, script):
+        for line in script.split("\n"):
+            line = line.split(";", 1)[0].strip()
+            if line:
+                self._run_line(line)
+
+    def _run_line(self, line):
+        try:
+            parts = shlex.split(line)
+        except ValueError:
+            parts = line.split()
+        cmd = parts[0].upper()
+        params = {}
+        for part in parts[1:]:
+            key, _, value = part.partition("=")
+            params[key.upper()] = value
+        handler = self.handlers.get(cmd)
+        if handler is None:
+            if cmd[:1] in ("G", "M") and cmd[1:].replace(".", "").isdigit():
+                return
+            self._world.respond('Unknown command:"%s"' % cmd)
+            return
+        if self._world.state != "ready" and cmd not in ("FIRMWARE_RESTART", "RESTART"):
+            raise self._world.command_error("Printer is not ready")
+        handler(SimGCodeCommand(self._world, cmd, params, line))
+
+
+class SimConfigfile:
+    def __init__(self, world):
+        self._world = world
+        self.pending = {}
+
+    def set(self, section, option, value):
+        self.pending.setdefault(section, {})[option] = str(value)
+
+
+class SimPrintStats:
+    def __init__(self, world):
+        self._world = world
+        self.state = "standby"
+        self.filename = ""
+        self.message = ""
+        self.start_time = None
+        self.end_time = None
+
+    def start(self, filename):
+        self.state = "printing"
+        self.filename = filename
+        self.message = ""
+        self.start_time = self._world.now
+        self.end_time = None
+
+    def finish(self, state, message=""):
+        self.state = state
+        self.message = message
+        self.end_time = self._world.now
+
+    def get_status(self, eventtime):
+        duration = 0.
+        if self.start_time is not None:
+            duration = (self.end_time if self.end_time is not None else eventtime) - self.start_time
+        return {"state": self.state, "filename": self.filename, "message": self.message,
+                "print_duration": duration, "total_duration": duration,
+                "filament_used": 0., "info": {"total_layer": None, "current_layer": None}}
+
+
+class SimVirtualSD:
+    """Feeds a G-code file line by line through the dispatcher, like virtual_sdcard."""
+
+    LINES_PER_WAKE = 50
+
+    def __init__(self, world, sdcard_dirname):
+        self._world = world
+        self.sdcard_dirname = str(sdcard_dirname)
+        self._lines = []
+        self._pos = 0
+        self._timer = None
+
+    def start_print(self, filename):
+        path = Path(self.sdcard_dirname) / filename
+        if not path.is_file():
+            raise self._world.command_error("Unable to open file")
+        self._lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
+        self._pos = 0
+        self._world.print_stats.start(filename)
+        reactor = self._world.reactor
+        if self._timer is None:
+            self._timer = reactor.register_timer(self._work)
+        reactor.update_timer(self._timer, reactor.NOW)
+
+    def cancel(self):
+        if self._timer is not None:
+            self._world.reactor.update_timer(self._timer, self._world.reactor.NEVER)
+        if self._world.print_stats.state in ("printing", "paused"):
+            self._world.print_stats.finish("cancelled")
+
+    def progress(self):
+        return self._pos / len(self._lines) if self._lines else 0.
+
+    def _work(self, eventtime):
+        end = min(len(self._lines), self._pos + self.LINES_PER_WAKE)
+        while self._pos < end:
+            line = self._lines[self._pos]
+            self._pos += 1
+            try:
+                self._world.gcode.run_script(line)
+            except self._world.command_error as e:
+                self._world.respond("!! %s" % e)
+                self._world.print_stats.finish("error", str(e))
+                return self._world.reactor.NEVER
+        if self._pos >= len(self._lines):
+            self._world.print_stats.finish("complete")
+            return self._world.reactor.NEVER
+        return eventtime + 0.001
+
+
+class SimPrinter:
+    def __init__(self, world):
+        self._world = world
+        self.objects = {}
+        self.event_handlers = {}
+        self.command_error = world.command_error
+
+    def get_reactor(self):
+        return self._world.reactor
+
+    def lookup_object(self, name, default=Ellipsis):
+        if name in self.objects:
+            return self.objects[name]
+        if default is Ellipsis:
+            raise self._world.command_error("Unknown config object '%s'" % name)
+        return default
+
+    def load_object(self, config, name, default=Ellipsis):
+        return self.lookup_object(name, default)
+
+    def add_object(self, name, obj):
+        if name in self.objects:
+            raise self._world.command_error("Printer object '%s' already created" % name)
+        self.objects[name] = obj
+
+    def register_event_handler(self, event, callback):
+        self.event_handlers.setdefault(event, []).append(callback)
+
+    def send_event(self, event, *params):
+        return [cb(*params) for cb in self.event_handlers.get(event, [])]
+
+    def is_shutdown(self):
+        return self._world.state == "shutdown"
+
+    def invoke_shutdown(self, msg):
+        self._world.shutdown(msg)
+
+
+class SimToolhead:
+    def get_last_move_time(self):
+        return 0.
+
+
+class SimKlipper:
+    """
+    The simulated printer host. Holds the clock, the thermal model and a Klipper
+    "printer" with the pizza_oven module loaded from `klipper_module/`.
+
+    `zones` adds [pizza_oven <zone>] sections: {zone: options}; every zone
+    heater gets its own copy of the thermal model.
+    """
+
+    def __init__(self, gcodes_dir, oven_config=None, model=None, max_step=1., zones=None):
+        self.gcodes_dir = Path(gcodes_dir)
+        # Program checkpoints stay next to the simulated gcodes
+        self.oven_config = {"max_temp": "300", "heat_rate": "0.3", "cool_rate": "0.1",
+                            "checkpoint_dir": str(gcodes_dir)}
+        self.oven_config.update({k: str(v) for k, v in (oven_config or {}).items()})
+        self.model = model or FirstOrderOven()
+        self.sections = {OVEN_SECTION: self.oven_config}
+        self.models = {OVEN_SECTION: self.model}
+        for zone, options in (zones or {}).items():
+            section = f"{OVEN_SECTION} {zone}"
+            self.sections[section] = dict(self.oven_config, **{k: str(v) for k, v in options.items()})
+            self.models[section] = copy.deepcopy(self.model)
+        self.max_step = max_step
+        self.now = 0.
+        self.state = "startup"
+        self.state_message = ""
+        self.oven_module = load_oven_module()
+        self.command_error = self.oven_module.CommandError
+        self._gcode_listeners = []
+        self._state_listeners = []
+        self.start()
+
+    # --- lifecycle -------------------------------------------------------
+
+    def start(self):
+        """(Re)creates the printer objects, like a Klipper firmware restart."""
+        self.reactor = SimReactor(self)
+        self.printer = SimPrinter(self)
+        self.gcode = SimGCode(self)
+        self.print_stats = SimPrintStats(self)
+        self.virtual_sdcard = SimVirtualSD(self, self.gcodes_dir)
+        self.configfile = SimConfigfile(self)
+        self.heaters = SimHeaters(self)
+        self.printer.objects.update({
+            "gcode": self.gcode, "heaters": self.heaters, "configfile": self.configfile,
+            "virtual_sdcard": self.virtual_sdcard, "print_stats": self.print_stats,
+            "toolhead": SimToolhead(),
+        })
+        self._register_builtin_commands()
+        for section, options in self.sections.items():
+            config = SimConfig(self.printer, section, options)
+            load = self.oven_module.load_config if section == OVEN_SECTION else self.oven_module.load_config_prefix
+            self.printer.objects[section] = load(config)
+        self.oven = self.printer.objects[OVEN_SECTION]
+        self.state = "ready"
+        self.state_message = "Printer is ready"
+        self.printer.send_event("klippy:ready")
+        self._notify_state("ready")
+
+    def shutdown(self, msg):
+        if self.state == "shutdown":
+            return
+        logging.warning(f"Simulated Klipper shutdown: {msg}")
+        self.state = "shutdown"
+        self.state_message = msg
+        self.respond("!! %s" % msg)
+        if self.print_stats.state in ("printing", "paused"):
+            self.print_stats.finish("error", msg)
+        self.printer.send_event("klippy:shutdown")
+        self._notify_state("shutdown")
+
+    def restart(self):
+        self.printer.send_event("klippy:disconnect")
+        for section, options in self.configfile.pending.items():
+            if section in self.sections:
+                self.sections[section].update(options)
+        self.start()
+
+    # --- time ------------------------------------------------------------
+
+    def advance_to(self, target):
+        while self.now < target:
+            self._run_timers()
+            step_end = min(target, self.now + self.max_step, self.reactor.next_waketime())
+            if step_end <= self.now:
+                step_end = min(target, self.now + self.max_step)
+            self._update_heaters(step_end - self.now, self.now)
+            self.now = step_end
+        self._run_timers()
+
+    def advance(self, seconds):
+        self.advance_to(self.now + seconds)
+
+    def run_until(self, predicate, timeout, step=1.):
+        """Advances simulated time until `predicate()` is true or `timeout` seconds passed."""
+        end = self.now + timeout
+        while self.now < end and not predicate():
+            self.advance(step)
+        return predicate()
+
+    def program_running(self):
+        """True while any zone has a program scheduled on the shared step timer."""
+        zones = self.oven.zones
+        return zones.timer in self.reactor._timers and zones.timer.waketime < self.reactor.NEVER
+
+    def _update_heaters(self, dt, now):
+        for heater in self.heaters.heaters.values():
+            heater.update(dt, now)
+
+    def _run_timers(self):
+        if self.state == "shutdown":
+            return
+        try:
+            self.reactor.run_due_timers()
+        except Exception as e:
+            # Unhandled timer exceptions shut Klipper down.
+            self.shutdown(str(e))
+
+    # --- G-code ----------------------------------------------------------
+
+    def run_script(self, script):
+        """Runs a script the way Moonraker's gcode/script does; raises command_error on failure."""
+        try:
+            self.gcode.run_script(script)
+        except self.command_error as e:
+            self.respond("!! %s" % e)
+            raise
+
+    def respond(self, msg):
+        for listener in list(self._gcode_listeners):
+            listener(msg)
+
+    def add_gcode_listener(self, callback):
+        self._gcode_listeners.append(callback)
+
+    def remove_gcode_listener(self, callback):
+        if callback in self._gcode_listeners:
+            self._gcode_listeners.remove(callback)
+
+    def add_state_listener(self, callback):
+        self._state_listeners.append(callback)
+
+    def remove_state_listener(self, callback):
+        if callback in self._state_listeners:
+            self._state_listeners.remove(callback)
+
+    def _notify_state(self, state):
+        for listener in list(self._state_listeners):
+            listener(state)
+
+    def _register_builtin_commands(self):
+        reg = self.gcode.register_command
+        reg("M112", lambda gcmd: self.shutdown("Shutdown due to M112 command"), True)
+        reg("FIRMWARE_RESTART", lambda gcmd: self.restart(), True)
+        reg("RESTART", lambda gcmd: self.restart(), True)
+        reg("SAVE_CONFIG", lambda gcmd: self.restart())
+        reg("SDCARD_PRINT_FILE", lambda gcmd: self.virtual_sdcard.start_print(gcmd.get("FILENAME")))
+        reg("CANCEL_PRINT", lambda gcmd: self.virtual_sdcard.cancel())
+        reg("SET_HEATER_TEMPERATURE", self._cmd_set_heater_temperature)
+
+    def _cmd_set_heater_temperature(self, gcmd):
+        name = gcmd.get("HEATER")
+        heater = self.heaters.heaters.get(name)
+        if heater is None:
+            raise gcmd.error("Heater %s not known" % name)
+        self.heaters.set_temperature(heater, gcmd.get_float("TARGET", 0.))
+
+    # --- status ----------------------------------------------------------
+
+    def list_objects(self):
+        return ["webhooks", "print_stats", "display_status", "virtual_sdcard", "toolhead",
+                "gcode_move", "heaters"] + list(self.sections)
+
+    def get_object_status(self, name):
+        eventtime = self.now
+        if name == "webhooks":
+            return {"state": self.state, "state_message": self.state_message}
+        if name == "print_stats":
+            return self.print_stats.get_status(eventtime)
+        if name == "display_status":
+            return {"progress": self.virtual_sdcard.progress(), "message": None}
+        if name == "virtual_sdcard":
+            return {"file_path": None, "progress": self.virtual_sdcard.progress(),
+                    "is_active": self.print_stats.state == "printing", "file_position": 0}
+        if name == "toolhead":
+            return {"position": [0., 0., 0., 0.], "homed_axes": "", "print_time": eventtime}
+        if name == "gcode_move":
+            return {"speed_factor": 1.0, "extrude_factor": 1.0}
+        if name == "heaters":
+            return {"available_heaters": list(self.heaters.heaters),
+                    "available_sensors": list(self.heaters.heaters)}
+        if name in self.sections:
+            return self.printer.objects[name].get_status(eventtime)
+        return None
+
+    def query_objects(self, objects):
+        """Same shape as Moonraker's `printer.objects.query`: {name: None | [attrs]}."""
+        status = {}
+        for name, attrs in objects.items():
+            full = self.get_object_status(name)
+            if full is None:
+                continue
+            if attrs:
+                full = {k: v for k, v in full.items() if k in attrs}
+            status[name] = full
+        return status
@@ -0,0 +1,249 @@
+# sim/moonraker.py
+"""
+Moonraker stand-in on top of `SimKlipper`.
+
+Implements the HTTP endpoints and WebSocket JSON-RPC methods the backend and the
+frontend use, plus a few `/sim/*` endpoints to control simulated time.
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from fastapi import Body, FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+
+from .klipper import SimKlipper
+
+MAX_CATCHUP = 3600.  # Simulated seconds advanced per clock tick at most
+
+
+class SimClock:
+    """Drives `SimKlipper` from wall-clock time, `speed` simulated seconds per real second."""
+
+    def __init__(self, klipper: SimKlipper, speed: float = 1., tick: float = 0.05):
+        self.klipper = klipper
+        self.speed = speed
+        self.tick = tick
+
+    async def run(self) -> None:
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(self.tick)
+            now = time.monotonic()
+            if self.speed > 0:
+                self.klipper.advance(min((now - last) * self.speed, MAX_CATCHUP))
+            last = now
+
+
+def _error(code: int, message: str) -> JSONResponse:
+    return JSONResponse(status_code=code, content={"error": {"code": code, "message": message}})
+
+
+def _parse_query_params(params) -> Dict[str, Optional[list]]:
+    """`?print_stats=state,filename&pizza_oven` -> {"print_stats": ["state", "filename"], "pizza_oven": None}"""
+    objects: Dict[str, Optional[list]] = {}
+    for key, value in params.multi_items():
+        objects[key] = [a for a in value.split(",") if a] or None
+    return objects
+
+
+def create_app(klipper: SimKlipper, speed: float = 1., update_interval: float = 0.25) -> FastAPI:
+    clock = SimClock(klipper, speed)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        task = asyncio.create_task(clock.run())
+        try:
+            yield
+        finally:
+            task.cancel()
+
+    app = FastAPI(title="Moonraker simulator", lifespan=lifespan)
+    app.state.klipper = klipper
+    app.state.clock = clock
+
+    def run_gcode(script: str) -> Any:
+        try:
+            klipper.run_script(script)
+        except klipper.command_error as e:
+            return _error(400, str(e))
+        return {"result": "ok"}
+
+    # --- HTTP API --------------------------------------------------------
+
+    @app.get("/server/info")
+    async def server_info() -> Dict[str, Any]:
+        return {"result": {"klippy_connected": True, "klippy_state": klipper.state,
+                           "moonraker_version": "simulator"}}
+
+    @app.get("/printer/info")
+    async def printer_info() -> Dict[str, Any]:
+        return {"result": {"state": klipper.state, "state_message": klipper.state_message,
+                           "hostname": "simulator", "software_version": "simulator"}}
+
+    @app.get("/printer/objects/list")
+    async def objects_list() -> Dict[str, Any]:
+        return {"result": {"objects": klipper.list_objects()}}
+
+    @app.get("/printer/objects/query")
+    async def objects_query_get(request: Request) -> Dict[str, Any]:
+        status = klipper.query_objects(_parse_query_params(request.query_params))
+        return {"result": {"eventtime": klipper.now, "status": status}}
+
+    @app.post("/printer/objects/query")
+    async def objects_query_post(payload: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+        status = klipper.query_objects(payload.get("objects") or {})
+        return {"result": {"eventtime": klipper.now, "status": status}}
+
+    @app.post("/printer/gcode/script")
+    async def gcode_script(request: Request, script: Optional[str] = Query(None)):
+        if script is None:
+            try:
+                script = (await request.json()).get("script")
+            except Exception:
+                script = None
+        if not script:
+            return _error(400, "No script provided")
+        return run_gcode(script)
+
+    @app.post("/printer/print/start")
+    async def print_start(filename: str = Query(...)):
+        return run_gcode(f'SDCARD_PRINT_FILE FILENAME="{filename}"')
+
+    @app.post("/printer/print/cancel")
+    async def print_cancel():
+        return run_gcode("CANCEL_PRINT")
+
+    @app.post("/printer/emergency_stop")
+    async def emergency_stop():
+        return run_gcode("M112")
+
+    @app.post("/printer/firmware_restart")
+    async def firmware_restart():
+        return run_gcode("FIRMWARE_RESTART")
+
+    @app.get("/machine/update/status")
+    async def update_status() -> Dict[str, Any]:
+        return {"result": {"busy": False, "version_info": {
+            "klipper": {"version": "simulator", "remote_version": "simulator"},
+            "moonraker": {"version": "simulator", "remote_version": "simulator"},
+        }}}
+
+    @app.post("/machine/update/refresh")
+    async def update_refresh() -> Dict[str, Any]:
+        return await update_status()
+
+    # --- simulator control -----------------------------------------------
+
+    @app.get("/sim/state")
+    async def sim_state() -> Dict[str, Any]:
+        return {"now": klipper.now, "speed": clock.speed, "state": klipper.state,
+                "program_running": klipper.program_running(), "oven_temp": klipper.model.temp}
+
+    @app.post("/sim/speed")
+    async def sim_speed(value: float = Query(..., ge=0)) -> Dict[str, Any]:
+        clock.speed = value
+        return await sim_state()
+
+    @app.post("/sim/advance")
+    async def sim_advance(seconds: float = Query(..., gt=0)) -> Dict[str, Any]:
+        klipper.advance(seconds)
+        return await sim_state()
+
+    # --- WebSocket JSON-RPC ----------------------------------------------
+
+    @app.websocket("/websocket")
+    async def websocket_endpoint(ws: WebSocket):
+        await ws.accept()
+        outgoing: asyncio.Queue = asyncio.Queue()
+        subscriptions: Dict[str, Optional[list]] = {}
+        last_sent: Dict[str, Dict[str, Any]] = {}
+
+        def notify(method: str, params: list) -> None:
+            outgoing.put_nowait({"jsonrpc": "2.0", "method": method, "params": params})
+
+        def on_gcode(msg: str) -> None:
+            notify("notify_gcode_response", [msg])
+
+        def on_state(state: str) -> None:
+            last_sent.clear()
+            notify("notify_klippy_ready" if state == "ready" else "notify_klippy_shutdown", [])
+
+        def handle(method: str, params: Dict[str, Any]) -> Any:
+            if method == "printer.objects.list":
+                return {"objects": klipper.list_objects()}
+            if method == "printer.objects.query":
+                return {"eventtime": klipper.now, "status": klipper.query_objects(params.get("objects") or {})}
+            if method == "printer.objects.subscribe":
+                subscriptions.clear()
+                subscriptions.update(params.get("objects") or {})
+                status = klipper.query_objects(subscriptions)
+                last_sent.clear()
+                last_sent.update(json.loads(json.dumps(status)))
+                return {"eventtime": klipper.now, "status": status}
+            if method == "printer.gcode.script":
+                klipper.run_script(params.get("script", ""))
+                return "ok"
+            if method == "printer.emergency_stop":
+                klipper.run_script("M112")
+                return "ok"
+            if method == "printer.firmware_restart":
+                klipper.run_script("FIRMWARE_RESTART")
+                return "ok"
+            if method == "printer.info":
+                return {"state": klipper.state, "state_message": klipper.state_message,
+                        "hostname": "simulator", "software_version": "simulator"}
+            if method == "server.info":
+                return {"klippy_connected": True, "klippy_state": klipper.state}
+            raise LookupError(method)
+
+        async def reader() -> None:
+            while True:
+                request = json.loads(await ws.receive_text())
+                req_id = request.get("id")
+                try:
+                    result = handle(request.get("method", ""), request.get("params") or {})
+                    response = {"jsonrpc": "2.0", "result": result, "id": req_id}
+                except LookupError as e:
+                    response = {"jsonrpc": "2.0", "error": {"code": -32601, "message": f"Method not found: {e}"}, "id": req_id}
+                except klipper.command_error as e:
+                    response = {"jsonrpc": "2.0", "error": {"code": 400, "message": str(e)}, "id": req_id}
+                outgoing.put_nowait(response)
+
+        async def status_pusher() -> None:
+            while True:
+                await asyncio.sleep(update_interval)
+                if not subscriptions:
+                    continue
+                diff: Dict[str, Dict[str, Any]] = {}
+                for name, values in json.loads(json.dumps(klipper.query_objects(subscriptions))).items():
+                    prev = last_sent.setdefault(name, {})
+                    changed = {k: v for k, v in values.items() if prev.get(k) != v}
+                    if changed:
+                        prev.update(changed)
+                        diff[name] = changed
+                if diff:
+                    notify("notify_status_update", [diff, klipper.now])
+
+        async def writer() -> None:
+            while True:
+                await ws.send_text(json.dumps(await outgoing.get()))
+
+        klipper.add_gcode_listener(on_gcode)
+        klipper.add_state_listener(on_state)
+        tasks = [asyncio.create_task(coro) for coro in (reader(), status_pusher(), writer())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                    logging.error(f"Simulator WebSocket error: {task.exception()}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            klipper.remove_gcode_listener(on_gcode)
+            klipper.remove_state_listener(on_state)
+
+    return app
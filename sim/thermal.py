@@ -0,0 +1,64 @@
+# sim/thermal.py
+import math
+from collections import deque
+
+
+class FirstOrderOven:
+    """
+    First-order thermal model of an oven chamber:
+
+        tau * dT/dt = ambient + gain * power - T
+
+    `gain` is the steady-state temperature rise at full power and `tau` the time
+    constant in seconds. The update uses the exact discretization, so it stays
+    stable for any step size (useful for accelerated time). `dead_time` delays
+    the effect of heater power changes.
+    """
+
+    def __init__(self, ambient=25., gain=275., tau=600., dead_time=0., temp=None):
+        self.ambient = ambient
+        self.gain = gain
+        self.tau = tau
+        self.dead_time = dead_time
+        self.temp = ambient if temp is None else temp
+        self._history = deque()  # (time, power) commands waiting out the dead time
+        self._effective = 0.
+
+    def max_heat_rate(self, temp=None):
+        """Rate in degrees/s at full power for the given (or current) temperature."""
+        temp = self.temp if temp is None else temp
+        return (self.ambient + self.gain - temp) / self.tau
+
+    def max_cool_rate(self, temp=None):
+        """Rate in degrees/s with the heater off for the given (or current) temperature."""
+        temp = self.temp if temp is None else temp
+        return (temp - self.ambient) / self.tau
+
+    def step(self, power, dt, now=0.):
+        if dt <= 0:
+            return self.temp
+        if self.dead_time:
+            self._history.append((now, power))
+            while self._history and self._history[0][0] <= now - self.dead_time:
+                self._effective = self._history.popleft()[1]
+            power = self._effective
+        steady = self.ambient + self.gain * power
+        self.temp = steady + (self.temp - steady) * math.exp(-dt / self.tau)
+        return self.temp
+
+
+class HeaterController:
+    """
+    Feed-forward plus proportional controller that stands in for Klipper's PID.
+    Returns a PWM value in the range [0, 1].
+    """
+
+    def __init__(self, model, kp=1.0):
+        self.model = model
+        self.kp = kp
+
+    def power(self, target, temp):
+        if target <= 0:
+            return 0.
+        feed_forward = (target - self.model.ambient) / self.model.gain
+        return min(1., max(0., feed_forward + self.kp * (target - temp)))
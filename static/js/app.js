@@ -393,6 +393,9 @@ function connectWebSocket() {
             if (msg.method === 'notify_gcode_response') {
                 document.dispatchEvent(new CustomEvent('klipper-gcode-response', { detail: msg.params[0] }));
             }
+            if (msg.method === 'notify_oven_queue_changed') {
+                document.dispatchEvent(new CustomEvent('oven-queue-update', { detail: msg.params[0] }));
+            }
         };
         ws.onclose = () => {
             console.log("Global WS: Disconnected. Reconnecting in 3s...");
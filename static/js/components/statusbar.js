@@ -24,7 +24,12 @@ function updateStatusBarUI(panel, statusData) {
   }
 
   const ovenTemp = statusData["pizza_oven"]?.temperature;
-  if (tempEl) {
+  const zones = statusData["pizza_oven"]?.zones;
+  if (tempEl && zones && Object.keys(zones).length > 1) {
+    // Multi-zone oven: one temperature per zone, names in the tooltip
+    tempEl.textContent = Object.values(zones).map(z => Number(z.temperature).toFixed(0)).join(' / ') + ' °C';
+    tempEl.title = Object.entries(zones).map(([name, z]) => `${name}: ${Number(z.temperature).toFixed(1)} °C`).join('\n');
+  } else if (tempEl) {
     tempEl.textContent = (ovenTemp != null ? Number(ovenTemp).toFixed(1) : '--') + ' °C';
   }
 }
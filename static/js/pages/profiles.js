@@ -20,7 +20,7 @@ import { humanSize, humanTime } from '../utils.js';
         let gcodeLines = [
             `; METADATA: ${JSON.stringify(metadata)}`,
             `; Profile generated by Klipper PIZZA Oven`,
-            'PROGRAM_CLEAR'
+            'CLEAR_PROGRAM'
         ];
         if (state.programType === 'annealing') {
             state.segments.forEach(seg => {
@@ -3,6 +3,7 @@ import pytest
 from httpx import AsyncClient, ASGITransport
 from typing import AsyncGenerator, Generator
 from pathlib import Path
+import shutil
 import tempfile
 from unittest.mock import AsyncMock, MagicMock
 
@@ -10,6 +11,15 @@ from app.main import app
 from app import settings
 from app.routers import config, gcodes
 
+@pytest.fixture(scope="session", autouse=True)
+def assets_build_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """
+    Keeps the static asset build of tests that run the app lifespan out of the source tree.
+    """
+    build_dir = tmp_path_factory.mktemp("assets") / "static"
+    app.state.assets.build_dir = build_dir
+    return build_dir
+
 @pytest.fixture
 def test_config_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[Path, None, None]:
     """
@@ -65,4 +75,44 @@ def mock_http_client() -> AsyncMock:
     mock_response.json.return_value = {"result": {"status": {}}}
     mock_client.get.return_value = mock_response
     mock_client.post.return_value = mock_response
-    return mock_client
\ No newline at end of file
+    return mock_client
+
+@pytest.fixture
+def sim_klipper(test_gcodes_dir: Path):
+    """
+    Simulated Klipper host running the real pizza_oven module on the gcodes test dir.
+    """
+    from sim.klipper import SimKlipper
+    return SimKlipper(test_gcodes_dir)
+
+@pytest.fixture(params=["tcp", "unix"])
+async def moonraker_sim(request, sim_klipper, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[str, None]:
+    """
+    Serves the Moonraker simulator on a free local port (or a Unix socket, like
+    moonraker.sock) and points the app at it.
+    """
+    import asyncio
+    import uvicorn
+    from sim.moonraker import create_app
+
+    sim_app = create_app(sim_klipper, speed=0)
+    sock_dir = None
+    if request.param == "unix":
+        sock_dir = tempfile.mkdtemp(prefix="pizza_uds_")  # Short path, socket paths are limited to ~100 chars
+        config = uvicorn.Config(sim_app, uds=f"{sock_dir}/moonraker.sock", log_level="warning")
+    else:
+        config = uvicorn.Config(sim_app, host="127.0.0.1", port=0, log_level="warning")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    if sock_dir:
+        url = f"unix:{sock_dir}/moonraker.sock"
+    else:
+        url = f"http://127.0.0.1:{server.servers[0].sockets[0].getsockname()[1]}"
+    monkeypatch.setattr(settings, "KLIPPER_API_URL", url)
+    yield url
+    server.should_exit = True
+    await task
+    if sock_dir:
+        shutil.rmtree(sock_dir, ignore_errors=True)
@@ -0,0 +1,79 @@
+# tests/test_assets.py
+import gzip
+import pytest
+from pathlib import Path
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from app.assets import AssetPipeline, AssetStaticFiles, IMMUTABLE_CACHE_CONTROL
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def pipeline(tmp_path: Path) -> AssetPipeline:
+    src = tmp_path / "static"
+    (src / "js" / "pages").mkdir(parents=True)
+    (src / "css").mkdir()
+    (src / "js" / "app.js").write_text("export const x = 1;\n" + "// padding\n" * 100)
+    (src / "js" / "pages" / "page.js").write_text("import { x } from '../app.js';\nconsole.log(x);\n")
+    (src / "css" / "styles.css").write_text("body { background: url('../img/bg.png'); }\n")
+    return AssetPipeline(src, tmp_path / "build")
+
+
+async def test_build_rewrites_imports_and_reuses_manifest(pipeline: AssetPipeline):
+    pipeline.load_or_build()
+    app_hashed = pipeline.manifest["js/app.js"]
+    assert app_hashed != "js/app.js" and app_hashed.startswith("js/app.")
+    assert pipeline.url("/js/app.js") == f"/static/{app_hashed}"
+    assert pipeline.url("missing.js") == "/static/missing.js"
+
+    page = (pipeline.build_dir / pipeline.manifest["js/pages/page.js"]).read_text()
+    assert f"'../{Path(app_hashed).name}'" in page
+    # References to files outside the source tree stay untouched
+    css = (pipeline.build_dir / pipeline.manifest["css/styles.css"]).read_text()
+    assert "url('../img/bg.png')" in css
+    assert "gzip" in pipeline.variants[app_hashed]
+
+    # Unchanged sources: the existing build is loaded, not rebuilt
+    marker = pipeline.build_dir / "marker"
+    marker.write_text("x")
+    fresh = AssetPipeline(pipeline.source_dir, pipeline.build_dir)
+    fresh.load_or_build()
+    assert fresh.manifest == pipeline.manifest and marker.exists()
+
+    # A changed dependency changes the hash of its importers too
+    (pipeline.source_dir / "js" / "app.js").write_text("export const x = 2;\n")
+    fresh.load_or_build()
+    assert fresh.manifest["js/app.js"] != app_hashed
+    assert fresh.manifest["js/pages/page.js"] != pipeline.manifest["js/pages/page.js"]
+
+
+async def test_serves_hashed_assets_precompressed_and_immutable(pipeline: AssetPipeline):
+    pipeline.load_or_build()
+    app = FastAPI()
+    app.mount("/static", AssetStaticFiles(pipeline), name="static")
+    hashed_url = pipeline.url("js/app.js")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get(hashed_url, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert "javascript" in response.headers["content-type"]
+        assert response.text.startswith("export const x = 1;")
+
+        response = await ac.get(hashed_url, headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.content == (pipeline.build_dir / pipeline.manifest["js/app.js"]).read_bytes()
+
+        # Unhashed paths are still served from the source tree, without the long cache
+        response = await ac.get("/static/js/app.js")
+        assert response.status_code == 200
+        assert "immutable" not in response.headers.get("cache-control", "")
+
+        response = await ac.get("/static/js/nope.js")
+        assert response.status_code == 404
+
+    assert gzip.decompress((pipeline.build_dir / (pipeline.manifest["js/app.js"] + ".gz")).read_bytes()).startswith(b"export")
@@ -4,6 +4,8 @@ from httpx import AsyncClient
 from pathlib import Path
 import json
 
+from app import settings
+
 # Fixtures are now correctly handled by conftest.py
 pytestmark = pytest.mark.asyncio
 
@@ -86,4 +88,135 @@ async def test_delete_profile(client: AsyncClient, test_gcodes_dir: Path):
     assert response.json()["ok"] is True
     
     # Verify that the file was actually deleted
-    assert not (test_gcodes_dir / f"oven_{profile_name}.gcode").exists()
\ No newline at end of file
+    assert not (test_gcodes_dir / f"oven_{profile_name}.gcode").exists()
+
+
+async def test_list_profiles_large_is_gzipped(client: AsyncClient, test_gcodes_dir: Path):
+    """
+    Large lists are compressed for clients that accept gzip; the schema still documents the typed model.
+    """
+    for i in range(50):
+        (test_gcodes_dir / f"oven_profile_{i:03d}.gcode").write_text(
+            f"; METADATA: {json.dumps(SAMPLE_METADATA)}\n{SAMPLE_GCODE_BODY}\n", encoding="utf-8")
+
+    response = await client.get("/api/gcodes/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    files = response.json()["files"]
+    assert len(files) == 50
+    assert files[0] == {"name": "profile_000", "filament_type": "PETG", "size": files[0]["size"], "mtime": files[0]["mtime"]}
+
+    response = await client.get("/api/gcodes/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+    schema = (await client.get("/openapi.json")).json()
+    ref = schema["paths"]["/api/gcodes/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]["$ref"]
+    assert ref.endswith("/ProfileList")
+
+
+async def test_simulate_profile(client: AsyncClient, test_gcodes_dir: Path, monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    """
+    Simulates a profile with the Klipper module's engine, with rates from the
+    query or from the SAVE_CONFIG block of printer.cfg.
+    """
+    (test_gcodes_dir / "oven_sim.gcode").write_text(SAMPLE_FULL_GCODE_TO_SAVE)
+    (test_gcodes_dir / "oven_steep.gcode").write_text("ADD_SEGMENT TEMP=250 RAMP_TIME=300 RAMP_MODE=CUBIC_IN")
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    monkeypatch.setattr(settings, "CONFIG_DIR", str(config_dir))
+
+    response = await client.get("/api/gcodes/sim/simulation")
+    assert response.status_code == 400  # Not calibrated
+
+    response = await client.get("/api/gcodes/sim/simulation", params={"heat_rate": 0.3, "cool_rate": 0.1})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["duration"] == 5400 and data["failures"] == []
+    assert max(data["trajectory"]["setpoint"]) == 150 and data["trajectory"]["time"][-1] == 5400
+
+    (config_dir / "printer.cfg").write_text("[include pizza_oven.cfg]\n\n#*# <---------------------- SAVE_CONFIG ---------------------->\n"
+                                            "#*# [pizza_oven]\n#*# heat_rate = 0.3\n#*# cool_rate = 0.1\n")
+    response = await client.get("/api/gcodes/steep/simulation")
+    assert response.status_code == 200
+    failures = response.json()["failures"]
+    assert failures[0]["check"] == "segment" and "too fast" in failures[0]["message"]
+    # The oven keeps heating at its calibrated rate, so only the segment check fails
+    assert [f["check"] for f in failures] == ["segment"]
+
+    # 0.3 C/s to 150 C is within the calibrated heat rate, but not what the thermal model heats at
+    (test_gcodes_dir / "oven_quick.gcode").write_text("ADD_SEGMENT TEMP=150 RAMP_TIME=500 HOLD_TIME=600")
+    response = await client.get("/api/gcodes/quick/simulation")
+    assert response.status_code == 200 and response.json()["failures"] == []
+    (config_dir / "printer.cfg").write_text("[include pizza_oven.cfg]\n\n#*# <---------------------- SAVE_CONFIG ---------------------->\n"
+                                            "#*# [pizza_oven]\n#*# heat_rate = 0.3\n#*# cool_rate = 0.1\n"
+                                            "#*# model_gain = 300\n#*# model_time_constant = 1500\n#*# model_ambient = 25\n"
+                                            "#*# rate_grace_period = 120\n")
+    response = await client.get("/api/gcodes/quick/simulation")
+    assert response.status_code == 200
+    failures = response.json()["failures"]
+    assert [f["check"] for f in failures] == ["tracking"] and failures[0]["time"] >= 120
+
+    assert (await client.get("/api/gcodes/missing/simulation")).status_code == 404
+
+
+async def test_plan_profile(client: AsyncClient, test_gcodes_dir: Path, monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    """
+    Plans the shortest ramps for a profile's targets and holds, compares them
+    with the profile and saves the plan as a new profile.
+    """
+    (test_gcodes_dir / "oven_slow.gcode").write_text(SAMPLE_FULL_GCODE_TO_SAVE + "\nADD_SEGMENT TEMP=50 RAMP_TIME=200")
+    monkeypatch.setattr(settings, "CONFIG_DIR", str(tmp_path))
+    assert (await client.post("/api/gcodes/plan", json={"name": "slow"})).status_code == 400  # Not calibrated
+
+    response = await client.post("/api/gcodes/plan", json={"name": "slow", "heat_rate": 0.3, "cool_rate": 0.1,
+                                                           "save_as": "slow_fast"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["failures"] == [] and data["original_duration"] == 5600
+    first, last = data["segments"]
+    # The module checks the first ramp from 0 C, so it cannot be shorter than 150 / 0.3
+    assert first == {"temp": 150, "ramp_time": 500, "ramp_mode": "LINEAR", "hold_time": 1800,
+                     "original_ramp_time": 3600, "original_ramp_mode": "LINEAR"}
+    assert last["ramp_time"] == 1000  # Cooling 100 degrees at 0.1 C/s
+    assert data["duration"] == 3300 and data["saved"] == "slow_fast"
+
+    saved = (await client.get("/api/gcodes/slow_fast")).json()
+    assert saved["metadata"]["planned_from"] == "slow" and saved["metadata"]["filament_type"] == "PETG"
+    assert {"time": round(500 / 60, 2), "temp": 150} in saved["points"]
+    response = await client.post("/api/gcodes/plan", json={"name": "slow", "heat_rate": 0.3, "cool_rate": 0.1,
+                                                           "save_as": "slow_fast"})
+    assert response.status_code == 400  # Exists
+
+    # Near its top temperature the oven slows down; an eased-out ramp follows it
+    model = {"gain": 300, "time_constant": 1500, "ambient": 25}
+    response = await client.post("/api/gcodes/plan", json={
+        "segments": [{"temp": 150}, {"temp": 300, "hold_time": 600}], "heat_rate": 0.3, "cool_rate": 0.1, "model": model})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["segments"][1]["ramp_mode"].endswith("_OUT") and data["failures"] == []
+    assert data["original_duration"] is None and "RAMP_MODE=" in data["gcode"]
+    response = await client.post("/api/gcodes/plan", json={
+        "segments": [{"temp": 150}, {"temp": 300, "hold_time": 600}], "heat_rate": 0.3, "cool_rate": 0.1,
+        "model": model, "use_model": False})
+    assert response.json()["segments"][1]["ramp_mode"] == "LINEAR"
+
+    response = await client.post("/api/gcodes/plan", json={
+        "segments": [{"temp": 400}], "heat_rate": 0.3, "cool_rate": 0.1, "model": model})
+    assert response.status_code == 400 and "can reach" in response.json()["detail"]
+    assert (await client.post("/api/gcodes/plan", json={"name": "missing"})).status_code == 404
+
+
+async def test_plan_verification_rejects_infeasible_ramp():
+    """A ramp within the calibrated heat rate still fails when the thermal model cannot follow it."""
+    from app.oven import verify_plan
+
+    model = {"gain": 300., "time_constant": 1500., "dead_time": 0., "ambient": 25.}
+    plan = [{"temp": 150, "ramp_time": 500, "ramp_mode": "LINEAR", "hold_time": 600}]
+    assert verify_plan(plan, 0.3, 0.1) == []
+    failures = verify_plan(plan, 0.3, 0.1, model)
+    # 0.25 C/s is more than the model heats at from the start, (325 - 25) / 1500 = 0.2 C/s
+    assert [f["check"] for f in failures] == ["tracking"] and failures[0]["segment"] == 0
+    assert 60 <= failures[0]["time"] <= 500 and failures[0]["setpoint"] > failures[0]["temperature"]
+
+    plan[0]["ramp_time"] = 1200  # 0.104 C/s; the model still heats at 0.117 C/s at 150 C
+    assert verify_plan(plan, 0.3, 0.1, model) == []
@@ -0,0 +1,142 @@
+# tests/test_jobqueue.py
+import json
+import pytest
+from httpx import AsyncClient, ASGITransport
+from pathlib import Path
+
+from app.main import app
+from app.jobqueue import JobQueue, DONE, FAILED, profile_shape
+from sim.klipper import SimKlipper
+from sim.moonraker import create_app
+
+pytestmark = pytest.mark.asyncio
+
+SHORT = """CLEAR_PROGRAM
+ADD_SEGMENT TEMP=80 RAMP_TIME=600 HOLD_TIME=600
+EXECUTE_PROGRAM
+"""
+# Ends with a slow cool-down ramp from 150 to 50
+COOL_DOWN = """CLEAR_PROGRAM
+ADD_SEGMENT TEMP=150 RAMP_TIME=1200 HOLD_TIME=300
+ADD_SEGMENT TEMP=50 RAMP_TIME=900
+EXECUTE_PROGRAM
+"""
+PREHEAT_100 = """CLEAR_PROGRAM
+ADD_SEGMENT TEMP=100 RAMP_TIME=600 HOLD_TIME=300
+EXECUTE_PROGRAM
+"""
+
+
+async def _run(queue: JobQueue, klipper: SimKlipper, seconds: float, step: float = 10.) -> None:
+    """Simulated time with a queue poll every `step` seconds."""
+    end = klipper.now + seconds
+    while klipper.now < end:
+        klipper.advance(step)
+        await queue.poll()
+
+
+async def test_profiles_run_back_to_back(tmp_path: Path, test_gcodes_dir: Path):
+    """
+    Queued profiles start one after another once the previous program (not just its file) is done;
+    the queue survives a backend restart.
+    """
+    (test_gcodes_dir / "oven_a.gcode").write_text(SHORT)
+    (test_gcodes_dir / "oven_b.gcode").write_text(SHORT.replace("TEMP=80", "TEMP=90"))
+    klipper = SimKlipper(test_gcodes_dir)
+    queue_file = tmp_path / "queue.json"
+    async with AsyncClient(transport=ASGITransport(app=create_app(klipper, speed=0)), base_url="http://sim") as sim:
+        queue = JobQueue(queue_file, test_gcodes_dir, sim)
+        first = queue.add("a", "oven_a.gcode")
+        queue.add("b", "oven_b.gcode")
+        await queue.poll()
+        assert queue.state()["current"]["id"] == first["id"] and len(queue.state()["queued"]) == 1
+
+        await _run(queue, klipper, 900)
+        assert klipper.print_stats.state == "complete"  # The file is done, the program is not
+        assert queue.current()["name"] == "a"
+
+        await _run(queue, klipper, 400)
+        assert queue.current()["name"] == "b"
+        a = queue.history[0]
+        assert a["state"] == DONE and queue.current()["started"] - a["finished"] < 1
+        assert klipper.get_object_status("pizza_oven")["program"]["segment_count"] == 2  # Not appended to a's program
+
+        await _run(queue, klipper, 1300)
+        assert [job["state"] for job in queue.history] == [DONE, DONE] and not queue.jobs
+
+    restored = JobQueue(queue_file, test_gcodes_dir, None)
+    assert [job["name"] for job in restored.history] == ["a", "b"]
+    assert restored.add("c", "oven_a.gcode")["id"] == 3
+
+
+async def test_next_preheat_overlaps_the_cool_down(tmp_path: Path, test_gcodes_dir: Path):
+    (test_gcodes_dir / "oven_hot.gcode").write_text(COOL_DOWN)
+    (test_gcodes_dir / "oven_warm.gcode").write_text(PREHEAT_100)
+    assert profile_shape(test_gcodes_dir / "oven_hot.gcode") == (150, True)
+    assert profile_shape(test_gcodes_dir / "oven_warm.gcode") == (100, False)
+
+    klipper = SimKlipper(test_gcodes_dir)
+    async with AsyncClient(transport=ASGITransport(app=create_app(klipper, speed=0)), base_url="http://sim") as sim:
+        queue = JobQueue(tmp_path / "queue.json", test_gcodes_dir, sim)
+        queue.add("hot", "oven_hot.gcode")
+        queue.add("warm", "oven_warm.gcode", overlap=True)
+        await queue.poll()
+        await _run(queue, klipper, 1500)
+        assert queue.current()["name"] == "hot"
+
+        # Half-way down the 150 -> 50 ramp the oven is at 100, the first target of the next profile
+        await _run(queue, klipper, 600)
+        hot = queue.history[0]
+        assert hot["state"] == DONE and "overlapped" in hot["message"]
+        assert queue.current()["name"] == "warm"
+        assert hot["finished"] - hot["started"] < 1500 + 900
+        assert klipper.model.temp <= 101
+
+        # The preheat ramps up from the oven's temperature rather than from ambient
+        temp = klipper.model.temp
+        await _run(queue, klipper, 30)
+        program = klipper.get_object_status("pizza_oven")["program"]
+        assert program["state"] == "running" and program["segment"] == 0
+        assert temp - 1 <= program["setpoint"] <= 100
+
+
+async def test_failed_job_pauses_the_queue(tmp_path: Path, test_gcodes_dir: Path):
+    (test_gcodes_dir / "oven_a.gcode").write_text(SHORT)
+    klipper = SimKlipper(test_gcodes_dir)
+    async with AsyncClient(transport=ASGITransport(app=create_app(klipper, speed=0)), base_url="http://sim") as sim:
+        queue = JobQueue(tmp_path / "queue.json", test_gcodes_dir, sim)
+        queue.add("a", "oven_a.gcode")
+        queue.add("b", "oven_a.gcode")
+        await queue.poll()
+        klipper.run_script("M112")
+        await _run(queue, klipper, 60)
+        assert queue.history[0]["state"] == FAILED and queue.paused
+        assert queue.state()["queued"][0]["name"] == "b"
+
+
+async def test_queue_api(client: AsyncClient, tmp_path: Path, test_gcodes_dir: Path):
+    assert (await client.get("/api/queue")).status_code == 503
+    (test_gcodes_dir / "oven_a.gcode").write_text(SHORT)
+    app.state.job_queue = queue = JobQueue(tmp_path / "queue.json", test_gcodes_dir, None)
+    try:
+        assert (await client.post("/api/queue", json={"name": "missing"})).status_code == 404
+        response = await client.post("/api/queue", json={"name": "a", "overlap": True})
+        assert response.status_code == 200
+        job = response.json()["job"]
+        assert job["file"] == "oven_a.gcode" and job["overlap"] and "_active" not in job
+
+        version = queue.version
+        assert (await client.post("/api/queue/pause")).json() == {"ok": True}
+        assert await queue.wait_changed(version) == version + 1
+        state = (await client.get("/api/queue")).json()
+        assert state["paused"] and [j["id"] for j in state["queued"]] == [job["id"]]
+        assert json.loads((tmp_path / "queue.json").read_text())["paused"]
+
+        queue.jobs[0]["state"] = "running"
+        assert (await client.delete(f"/api/queue/{job['id']}")).status_code == 409
+        queue.jobs[0]["state"] = "queued"
+        assert (await client.delete(f"/api/queue/{job['id']}")).status_code == 200
+        assert (await client.delete(f"/api/queue/{job['id']}")).status_code == 404
+        assert (await client.post("/api/queue/resume")).status_code == 200 and not queue.paused
+    finally:
+        del app.state.job_queue
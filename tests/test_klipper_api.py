@@ -1,6 +1,7 @@
 # tests/test_klipper_api.py
 import pytest
 from httpx import AsyncClient, RequestError
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock
 
 from app.main import app
@@ -38,4 +39,50 @@ async def test_console_send_moonraker_unavailable(client: AsyncClient, mock_http
     assert response.status_code == 503
     assert "Moonraker service unavailable" in response.json()["detail"]
     
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+
+async def test_console_send_admission_control(client: AsyncClient, mock_http_client: AsyncMock, monkeypatch: pytest.MonkeyPatch):
+    """
+    Testuje odmítnutí příkazů nad limit (429), doplnění limitu po čase a průchod nouzového zastavení.
+    """
+    from app.admission import GcodeAdmission
+    from app.dependencies import get_gcode_admission
+
+    clock = [1000.]
+    monkeypatch.setattr("app.admission.time", SimpleNamespace(monotonic=lambda: clock[0]))
+    admission = GcodeAdmission(rate=0.5, burst=2, max_in_flight=3)
+    app.dependency_overrides[get_http_client] = lambda: mock_http_client
+    app.dependency_overrides[get_gcode_admission] = lambda: admission
+
+    statuses = [(await client.post("/api/console/send", json={"script": "G28"})).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    response = await client.post("/api/console/send", json={"script": "STATUS"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) == 2
+
+    # M112 nesmí být nikdy odmítnut
+    response = await client.post("/api/console/send", json={"script": "M112"})
+    assert response.status_code == 200
+
+    # Po 2 s (0.5 příkazu/s) projde právě jeden další příkaz
+    clock[0] += 2.
+    statuses = [(await client.post("/api/console/send", json={"script": "G28"})).status_code for _ in range(2)]
+    assert statuses == [200, 429]
+
+    # Globální limit souběžných skriptů: ostatní klienti drží všechna místa
+    for other in ("10.0.0.2", "10.0.0.3", "10.0.0.4"):
+        admission.acquire(other, "G28")
+    clock[0] += 10.
+    response = await client.post("/api/console/send", json={"script": "G28"})
+    assert response.status_code == 429
+    for _ in range(3):
+        admission.release()
+
+    metrics = (await client.get("/api/console/admission")).json()
+    assert metrics["accepted"] == {"console": 4, "http": 3}
+    assert metrics["priority_total"] == 1
+    assert metrics["rejected"] == {"console:rate_limited": 3, "console:overloaded": 1}
+    assert metrics["in_flight"] == 0 and metrics["clients"] == 4
+
+    app.dependency_overrides.clear()
@@ -0,0 +1,70 @@
+# tests/test_memory.py
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import pytest
+import httpx
+from pathlib import Path
+
+from benchmarks.bench_backend import make_profile_library
+from loadtest.harness import free_port
+
+pytestmark = pytest.mark.asyncio
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+STEADY_STATE_ROUNDS = 20
+PAGES = ["/dashboard", "/console", "/profiles", "/machine", "/display"]
+API = ["/api/gcodes/", "/api/gcodes/profile_00001", "/api/config/files", "/api/system/host",
+       "/api/system/host/history", "/api/temps", "/api/console/admission"]
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not found")
+
+
+@pytest.mark.skipif(not Path("/proc/self/status").exists(), reason="RSS is read from /proc (Linux only)")
+async def test_low_memory_rss_budget(tmp_path: Path):
+    """
+    Runs the app in LOW_MEMORY mode with a 1k-profile library, drives every page
+    and the large API endpoints until steady state and checks the process RSS
+    against the configured budget (RSS_BUDGET_MB).
+    """
+    gcodes_dir = make_profile_library(tmp_path / "gcodes", 1000)
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    port = free_port()
+    env = dict(os.environ, LOW_MEMORY="1", GCODES_DIR=str(gcodes_dir), CONFIG_DIR=str(config_dir),
+               ASSETS_BUILD_DIR=str(tmp_path / "assets"), KLIPPER_API_URL=f"http://127.0.0.1:{free_port()}")
+    budget_mb = int(subprocess.check_output(
+        [sys.executable, "-c", "from app import settings; print(settings.RSS_BUDGET_MB)"], cwd=ROOT_DIR, env=env))
+
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=10) as http:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    await http.get("/api/system/startup")
+                    break
+                except httpx.TransportError:
+                    assert time.monotonic() < deadline and proc.poll() is None, "app did not start"
+                    await asyncio.sleep(0.1)
+
+            for _ in range(STEADY_STATE_ROUNDS):
+                for url in PAGES + API:
+                    response = await http.get(url)
+                    assert response.status_code < 500 or url == "/api/temps"
+            assert len((await http.get("/api/gcodes/")).json()["files"]) == 1000
+
+        rss_mb = _rss_mb(proc.pid)
+        assert rss_mb <= budget_mb, f"RSS {rss_mb:.1f} MB is over the {budget_mb} MB budget"
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
@@ -0,0 +1,61 @@
+# tests/test_pages.py
+import gzip
+import os
+import pytest
+from pathlib import Path
+from httpx import AsyncClient
+from jinja2 import Environment, FileSystemLoader
+
+from app.pages import PageCache
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.parametrize("path", ["/dashboard", "/console", "/profiles", "/machine", "/display"])
+async def test_page_etag_and_not_modified(client: AsyncClient, path: str):
+    """
+    Pages are served with an ETag and answer 304 when the client already has them.
+    """
+    response = await client.get(path)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    assert "<html" in response.text.lower()
+    etag = response.headers["etag"]
+
+    response = await client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+async def test_page_active_link_and_gzip(client: AsyncClient):
+    response = await client.get("/console", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert 'href="/console"   class="active"' in response.text
+    assert 'href="/dashboard" class=""' in response.text
+
+
+async def test_page_cache_renders_once_and_reloads_on_change(tmp_path: Path):
+    template = tmp_path / "page.html"
+    template.write_text("v1 {{ page_id }}")
+    env = Environment(loader=FileSystemLoader(str(tmp_path)))
+    version = ["a"]
+    cache = PageCache(env, tmp_path, version=lambda: version[0], check_interval=0)
+
+    first = cache.get("page.html", page_id="x")
+    assert first.body == b"v1 x"
+    assert cache.get("page.html", page_id="x") is first
+    assert cache.get("page.html", page_id="y").body == b"v1 y"
+
+    template.write_text("v2 {{ page_id }}")
+    st = template.stat()
+    os.utime(template, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    second = cache.get("page.html", page_id="x")
+    assert second.body == b"v2 x" and second.etag != first.etag
+
+    version[0] = "b"
+    assert cache.get("page.html", page_id="x") is not second
+
+    big = tmp_path / "big.html"
+    big.write_text("<p>pizza</p>" * 500)
+    page = cache.get("big.html")
+    assert gzip.decompress(page.gzip_body) == page.body
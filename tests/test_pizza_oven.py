@@ -0,0 +1,400 @@
+# tests/test_pizza_oven.py
+import pytest
+
+from sim.klipper import load_oven_module
+
+oven = load_oven_module()
+
+
+def test_ramp_modes_dispatch_and_names():
+    """
+    Every named ramp mode resolves without eval and its easing runs 0 -> 1.
+    """
+    for name, mode in oven.RAMP_MODES.items():
+        assert oven.parse_ramp_mode(name.lower()) == mode
+        assert oven.parse_ramp_mode(mode) == mode
+        assert oven.calc_temp_ramp(mode, 0) == 0 and oven.calc_temp_ramp(mode, 1) == 1
+        assert oven.calc_temp_ramp(mode, 0.5) == pytest.approx(oven.EASINGS[mode](0.5))
+    assert oven.calc_temp_ramp(oven.QUADRATIC_IN, 0.5) == pytest.approx(0.25)
+    assert oven.calc_temp_ramp(oven.CUBIC_OUT, 0.5) == pytest.approx(0.875)
+
+    with pytest.raises(ValueError):
+        oven.parse_ramp_mode("__import__('os')")
+    with pytest.raises(ValueError):
+        oven.parse_ramp_mode(0x42)
+    with pytest.raises(AttributeError):
+        oven.ProgramSegment(100, 60, "LINEAR").extra = 1  # __slots__
+
+
+@pytest.mark.parametrize("mode", sorted(set(oven.RAMP_MODES) - {"NONE"}))
+def test_setpoint_table_matches_direct_evaluation(mode):
+    direct = oven.ProgramSegment(200, 3600, mode, start_temp=25)
+    tabled = oven.ProgramSegment(200, 3600, mode, start_temp=25, table_size=256)
+    for t in range(0, 3601, 7):
+        assert tabled.setpoint(t) == pytest.approx(direct.setpoint(t), abs=0.05)
+    assert tabled.setpoint(0) == 25 and tabled.setpoint(3600) == 200
+    assert tabled.setpoint(5000) == 200
+
+
+def test_program_segments_start_from_previous_target():
+    program = oven.Program(table_size=64)
+    program.add_segment(100, 600, "QUADRATIC_IN", 300)
+    program.add_segment(60, 600, "LINEAR", 0)
+    segments = program._segments
+    assert [s.start_temp for s in segments] == [oven.AMBIENT_TEMP, 100, 100]
+    assert [s.method for s in segments] == [oven.QUADRATIC_IN, oven.NONE, oven.LINEAR]
+    # Hold keeps the target; a cooling ramp sets the target at once and lets the oven cool
+    assert segments[1].setpoint(10) == 100
+    assert segments[2].setpoint(10) == 60
+    assert list(program) == [(100, 600, 300, oven.QUADRATIC_IN), (60, 600, 0, oven.LINEAR)]
+
+    # A warm oven starts the first ramp from its temperature; a copy keeps its own start
+    warm = program.copy()
+    warm.set_start_temp(70)
+    assert warm.start_temp == 70 and warm.setpoint_at(0) == 70 and warm.setpoint_at(600) == 100
+    assert program.start_temp == oven.AMBIENT_TEMP and list(warm) == list(program)
+
+
+def test_next_wake_follows_the_segment():
+    """
+    Holds wake only at their end, ramps once the setpoint moved by the resolution.
+    """
+    program = oven.Program()
+    program.add_segment(125, 100, "LINEAR", 600)  # 1 C/s ramp, then a 10 min hold
+    program.start(0.)
+    program.get_step(0.)
+    assert program.next_wake(0., 0.5) == pytest.approx(0.5)
+    assert program.next_wake(0., 5.) == pytest.approx(5.)
+
+    program.get_step(100.)  # Ramp done
+    program.get_step(100.)  # Hold started
+    assert program.next_wake(100., 0.5) == pytest.approx(700.)
+
+
+def test_late_timer_still_ends_the_segment():
+    program = oven.Program()
+    program.add_segment(100, 10, "LINEAR", 0)
+    program.add_segment(50, 10, "LINEAR", 0)
+    program.start(0.)
+    program.get_step(0.)
+    # The timer overslept the end of the first segment by 3 s
+    assert program.get_step(13.) == 50
+    assert program.get_current_target() == 50
+    program.get_step(30.)
+    assert program.is_done()
+
+
+def test_setpoint_depends_only_on_elapsed_time():
+    """
+    Irregular timer ticks give the same setpoints as a direct lookup, and the
+    program can seek to any point without replaying the earlier steps.
+    """
+    program = oven.Program(table_size=256)
+    program.add_segment(200, 1800, "CUBIC_INOUT", 600)
+    program.add_segment(80, 900, "LINEAR", 300)
+    assert program.duration() == 3600
+
+    program.start(1000.)
+    t = 0.
+    for dt in [0.3, 7.1, 1.9, 0.05, 33.3] * 80:
+        t += dt
+        assert program.get_step(1000. + t) == pytest.approx(program.setpoint_at(t))
+
+    program.seek(5000., 2000.)
+    assert program.get_step(5000.) == 200 and program.get_current_target() == 200
+    program.seek(5000., 1800.)  # Exactly at a boundary: the hold has started
+    assert program.segment_index == 1
+    program.seek(5000., 10_000.)
+    assert program.get_step(5000.) == 0 and program.is_done()
+
+
+def test_telemetry_ring_buffer_wraps_and_decimates():
+    buffer = oven.TelemetryBuffer(5)
+    assert buffer.snapshot(2)["time"] == [] and buffer.latest() is None
+    for i in range(8):
+        buffer.append(float(i), 20. + i, 30., i // 3, 0.5)
+    assert len(buffer) == 5 and buffer.count == 8
+    snapshot = buffer.snapshot()
+    assert snapshot["time"] == [3., 4., 5., 6., 7.]
+    assert snapshot["segment"] == [1, 1, 1, 2, 2]
+    # Every 2nd sample, always ending with the newest one
+    assert buffer.snapshot(2)["time"] == [3., 5., 7.]
+    assert buffer.latest() == {"time": 7., "temperature": 27., "setpoint": 30., "segment": 2, "power": 0.5}
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.snapshot()["temperature"] == []
+
+
+def test_parse_program_validates_every_line():
+    text = "; METADATA: {}\nCLEAR_PROGRAM\nADD_SEGMENT TEMP=80 RAMP_TIME=600 HOLD_TIME=60 ; comment\n" \
+           "add_segment temp=40 ramp_time=900 ramp_mode=cubic_out\nEXECUTE_PROGRAM\n"
+    assert oven.parse_program(text) == [(80., 600, oven.LINEAR, 60), (40., 900, oven.CUBIC_OUT, 0)]
+    for bad, message in [("ADD_SEGMENT RAMP_TIME=60", "line 1: missing TEMP"),
+                         ("\nADD_SEGMENT TEMP=x RAMP_TIME=60", "line 2"),
+                         ("ADD_SEGMENT TEMP=80 RAMP_TIME=60 RAMP_MODE=FAST", "Invalid method name"),
+                         ("ADD_SEGMENT TEMP=80 RAMP_TIME=-1", "negative time")]:
+        with pytest.raises(ValueError, match=message):
+            oven.parse_program(bad)
+
+
+def test_load_program_parses_once_per_file_version(sim_klipper, test_gcodes_dir):
+    profile = test_gcodes_dir / "oven_fine.gcode"
+    profile.write_text("ADD_SEGMENT TEMP=60 RAMP_TIME=600\n" + "".join(f"ADD_SEGMENT TEMP={70 - 10 * (i % 2)} RAMP_TIME=60 HOLD_TIME=10\n"
+                               for i in range(2000)))
+    messages = []
+    sim_klipper.add_gcode_listener(messages.append)
+
+    sim_klipper.run_script("LOAD_PROGRAM FILE=oven_fine.gcode")
+    oven_obj = sim_klipper.oven
+    first = oven_obj.program
+    assert len(first._segments) == 4001 and "4001 segments" in messages[-1]
+    template = oven_obj._program_cache[profile.resolve()][2]
+
+    sim_klipper.run_script("ADD_SEGMENT TEMP=25 RAMP_TIME=60")
+    sim_klipper.run_script("LOAD_PROGRAM FILE=oven_fine.gcode")
+    assert oven_obj._program_cache[profile.resolve()][2] is template  # Cache hit, copy not shared
+    assert len(oven_obj.program._segments) == 4001
+
+    profile.write_text("ADD_SEGMENT TEMP=60 RAMP_TIME=600\n")
+    sim_klipper.run_script("LOAD_PROGRAM FILE=oven_fine.gcode")
+    assert len(oven_obj.program._segments) == 1
+
+    for filename, error in [("oven_fast.gcode", "segment 1: Ramp rate too fast"),
+                            ("../outside.gcode", "not found"), ("missing.gcode", "not found")]:
+        if filename == "oven_fast.gcode":
+            (test_gcodes_dir / filename).write_text("ADD_SEGMENT TEMP=250 RAMP_TIME=10\n")
+        with pytest.raises(sim_klipper.command_error, match=error):
+            sim_klipper.run_script(f"LOAD_PROGRAM FILE={filename}")
+    assert len(oven_obj.program._segments) == 1
+
+    sim_klipper.run_script("EXECUTE_PROGRAM")
+    with pytest.raises(sim_klipper.command_error, match="running"):
+        sim_klipper.run_script("LOAD_PROGRAM FILE=oven_fine.gcode")
+
+
+def test_simulate_program_reports_failed_checks(sim_klipper, test_gcodes_dir):
+    program = oven.Program()
+    program.add_segment(80, 600, "LINEAR", 3600)
+    program.add_segment(50, 300, "LINEAR", 0)
+    result = oven.simulate_program(program, heat_rate=0.3, cool_rate=0.1)
+    assert result["duration"] == 4500 and result["failures"] == []
+    assert max(result["trajectory"]["temperature"]) == pytest.approx(80, abs=0.5)
+
+    # An oven that heats slower than its thermal model predicts fails the heating check
+    model = {"gain": 275., "time_constant": 600., "dead_time": 0., "ambient": 25.}
+    steep = oven.Program()
+    steep.add_segment(200, 600, "LINEAR", 0)
+    result = oven.simulate_program(steep, heat_rate=0.1, cool_rate=0.1, model=model)
+    heating = [f for f in result["failures"] if f["check"] == "heating"]
+    assert heating and heating[0]["time"] >= 60 and heating[0]["setpoint"] > heating[0]["temperature"]
+
+    # Faster than the oven can follow: the segment check fails
+    (test_gcodes_dir / "oven_steep.gcode").write_text("ADD_SEGMENT TEMP=250 RAMP_TIME=300 HOLD_TIME=60\n")
+    messages = []
+    sim_klipper.add_gcode_listener(messages.append)
+    sim_klipper.run_script("SIMULATE_PROGRAM FILE=oven_steep.gcode")
+    assert "6 min" in messages[-1] and "Ramp rate too fast" in messages[-1]
+    assert sim_klipper.now == 0 and sim_klipper.model.temp == pytest.approx(oven.AMBIENT_TEMP, abs=5)
+
+
+@pytest.mark.parametrize("dead_time", [0., 15.])
+def test_calibration_runs_in_background_and_fits_model(test_gcodes_dir, dead_time):
+    """
+    CALIBRATE_OVEN returns at once, samples on a timer and fits the simulated
+    oven's first-order-plus-dead-time parameters.
+    """
+    from sim.klipper import SimKlipper
+    from sim.thermal import FirstOrderOven
+
+    klipper = SimKlipper(test_gcodes_dir, model=FirstOrderOven(gain=275., tau=600., dead_time=dead_time))
+    messages = []
+    klipper.add_gcode_listener(messages.append)
+    klipper.run_script("CALIBRATE_OVEN TEMP=150 COOL_RATE_TIME=600")
+    assert klipper.now == 0.  # Nothing blocks in the G-code handler
+    with pytest.raises(klipper.command_error, match="already running"):
+        klipper.run_script("CALIBRATE_OVEN")
+    klipper.run_script("ADD_SEGMENT TEMP=100 RAMP_TIME=600")  # Other G-code keeps working
+
+    calibration = klipper.oven.calibration
+    assert klipper.run_until(lambda: not calibration.is_active(), 2 * 3600)
+    status = klipper.get_object_status("pizza_oven")["calibration"]
+    assert status["state"] == "done" and status["samples"] == len(calibration.times) > 1500
+    model = status["model"]
+    assert model["gain"] == pytest.approx(275., rel=0.05)
+    assert model["time_constant"] == pytest.approx(600., rel=0.05)
+    assert model["ambient"] == pytest.approx(25., abs=2.)
+    assert model["dead_time"] == pytest.approx(dead_time, abs=2 * calibration.interval)
+
+    pending = klipper.configfile.pending["pizza_oven"]
+    assert calibration.heat_rate > 0 and float(pending["heat_rate"]) == pytest.approx(calibration.heat_rate, abs=1e-5)
+    assert float(pending["model_time_constant"]) == pytest.approx(model["time_constant"], abs=1e-3)
+    assert "Run SAVE_CONFIG" in messages[-1] and klipper.oven.heat_rate == calibration.heat_rate
+
+    klipper.run_script("FIRMWARE_RESTART")  # Parameters are read back from the config
+    assert klipper.oven.thermal_model["dead_time"] == pytest.approx(model["dead_time"], abs=1e-3)
+
+
+def test_calibration_fit_is_split_by_sample_budget():
+    """The fit result does not depend on how many samples each wake-up goes through."""
+    models = []
+    for budget in (37, 10 ** 6):
+        calibration = oven.OvenCalibration(150., 600., 1.)
+        temp = 25.
+        for i in range(1200):
+            power = 1. if i < 600 else 0.
+            calibration.times.append(float(i))
+            calibration.temps.append(temp)
+            calibration.powers.append(power)
+            temp += (25. + 275. * power - temp) / 600.
+        calibration.state = calibration.FITTING
+        steps = 1
+        while calibration.fit_step(budget):
+            steps += 1
+        assert (steps > 100) == (budget == 37)
+        models.append(calibration.model)
+    assert models[0] == pytest.approx(models[1])
+    assert models[0]["time_constant"] == pytest.approx(600., rel=0.05)
+
+
+def test_slope_estimator_tracks_the_window():
+    estimator = oven.SlopeEstimator(window=10., capacity=8)
+    for i in range(200):  # Rebases several times; old samples are evicted
+        estimator.add(1e5 + i * 0.5, 3. * i * 0.5 + (0.2 if i % 2 else -0.2))
+    assert estimator.count == 8 and estimator.span() == pytest.approx(3.5)
+    assert estimator.slope() == pytest.approx(3., rel=0.1)
+    estimator.add(1e5 + 200., 0.)  # A gap empties the window
+    assert estimator.count == 1 and estimator.slope() is None
+
+
+def test_rate_monitor_needs_a_persistent_failure():
+    monitor = oven.RateMonitor(window=30., grace_period=60., capacity=64, heat_rate=0.3, cool_rate=0.1)
+    # A single outlier while the oven heats normally does not trip the check
+    for t in range(0, 300):
+        temp = 25 + 0.3 * t + (-20 if t == 150 else 0)
+        assert monitor.update(float(t), temp, 200.) is None
+    # A dead heater: stuck temperature, well below the setpoint
+    failed = [t for t in range(300, 500) if monitor.update(float(t), 115., 200.)]
+    assert failed and 300 + 60 <= failed[0] <= 300 + 60 + 30
+    # Stuck above the setpoint is a cooling failure only with a model
+    monitor = oven.RateMonitor(30., 60., 64, 0.3, 0.1,
+                               model={"gain": 275., "time_constant": 600., "dead_time": 0., "ambient": 25.})
+    assert any(monitor.update(float(t), 150., 100.) for t in range(200)) and monitor._direction == "cooling"
+
+
+def test_rate_monitor_follows_a_slow_ramp():
+    """An oven lagging a ramp slower than half its heat rate is not reported as failing to heat."""
+    program = oven.Program()
+    program.add_segment(100., 1500, "LINEAR", 600)
+    program.start(0.)
+    assert program.setpoint_rate(10.) == pytest.approx(0.05)
+    assert program.setpoint_rate(1600.) == 0.
+    monitor = oven.RateMonitor(window=30., grace_period=60., capacity=64, heat_rate=0.3, cool_rate=0.1)
+    for t in range(0, 1500):
+        # 5 degrees behind the setpoint, rising at the ramp's 0.05 C/s
+        setpoint = program.setpoint_at(float(t))
+        assert monitor.update(float(t), setpoint - 5., setpoint, program.setpoint_rate(float(t))) is None
+    # Without the setpoint slope the full heat rate is expected
+    monitor = oven.RateMonitor(window=30., grace_period=60., capacity=64, heat_rate=0.3, cool_rate=0.1)
+    assert any(monitor.update(float(t), 20. + 0.05 * t, 25. + 0.05 * t) for t in range(300))
+
+
+def test_program_progress_in_status(sim_klipper):
+    sim_klipper.run_script("ADD_SEGMENT TEMP=80 RAMP_TIME=600 HOLD_TIME=600\nADD_SEGMENT TEMP=60 RAMP_TIME=120")
+    program = sim_klipper.get_object_status("pizza_oven")["program"]
+    assert program["state"] == "idle" and program["segment_count"] == 3
+    assert program["remaining"] == program["duration"] == 1320 and program["phase"] == "ramp"
+
+    sim_klipper.run_script("EXECUTE_PROGRAM")
+    sim_klipper.advance(900)
+    status = sim_klipper.get_object_status("pizza_oven")
+    assert sim_klipper.get_object_status("pizza_oven") is status  # Cached for the same eventtime
+    program = status["program"]
+    assert program["state"] == "running" and program["segment"] == 1 and program["phase"] == "hold"
+    assert program["elapsed"] == pytest.approx(900, abs=1) and program["remaining"] == pytest.approx(420, abs=1)
+    assert program["segment_remaining"] == pytest.approx(300, abs=1) and program["setpoint"] == 80
+
+    sim_klipper.advance(500)
+    program = sim_klipper.get_object_status("pizza_oven")["program"]
+    assert program["state"] == "complete" and program["progress"] == 1 and program["phase"] is None
+
+    sim_klipper.run_script("EXECUTE_PROGRAM")
+    sim_klipper.advance(100)
+    sim_klipper.run_script("CANCEL_PROGRAM")
+    sim_klipper.advance(100)
+    program = sim_klipper.get_object_status("pizza_oven")["program"]
+    assert program["state"] == "cancelled" and program["elapsed"] == pytest.approx(100, abs=1)
+
+
+def test_resume_program_after_restart(sim_klipper, test_gcodes_dir):
+    sim_klipper.run_script("ADD_SEGMENT TEMP=80 RAMP_TIME=600 HOLD_TIME=1200\nADD_SEGMENT TEMP=60 RAMP_TIME=120")
+    sim_klipper.run_script("EXECUTE_PROGRAM")
+    sim_klipper.advance(1000)
+    sim_klipper.run_script("FIRMWARE_RESTART")  # Last checkpoint is written on disconnect
+    status = sim_klipper.get_object_status("pizza_oven")
+    assert status["resumable"] and "program" not in status
+
+    messages = []
+    sim_klipper.add_gcode_listener(messages.append)
+    sim_klipper.run_script("RESUME_PROGRAM")
+    assert "segment 2 of 3" in messages[-1]
+    sim_klipper.advance(10)
+    program = sim_klipper.get_object_status("pizza_oven")["program"]
+    assert program["state"] == "running" and program["elapsed"] == pytest.approx(1010, abs=2)
+    assert program["segment_count"] == 3 and program["setpoint"] == 80
+    assert not sim_klipper.get_object_status("pizza_oven")["resumable"]
+    with pytest.raises(sim_klipper.command_error, match="busy"):
+        sim_klipper.run_script("RESUME_PROGRAM")
+
+    # Too long without heat: the checkpoint is kept but not resumed
+    sim_klipper.run_script("FIRMWARE_RESTART")
+    wall_time = sim_klipper.oven.wall_clock()
+    sim_klipper.oven.wall_clock = lambda: wall_time + 3600
+    with pytest.raises(sim_klipper.command_error, match="MAX_GAP"):
+        sim_klipper.run_script("RESUME_PROGRAM")
+    sim_klipper.run_script("RESUME_PROGRAM MAX_GAP=7200")
+    sim_klipper.advance(1200)
+    assert sim_klipper.get_object_status("pizza_oven")["program"]["state"] == "complete"
+
+    # A finished (or cancelled) program is not resumed
+    sim_klipper.run_script("FIRMWARE_RESTART")
+    with pytest.raises(sim_klipper.command_error, match="complete"):
+        sim_klipper.run_script("RESUME_PROGRAM")
+    (test_gcodes_dir / (oven.CHECKPOINT_PROGRAM_FILE % "pizza_oven")).write_text('{"hash": "other", "segments": []}')
+    with pytest.raises(sim_klipper.command_error, match="does not match"):
+        sim_klipper.run_script("RESUME_PROGRAM")
+
+
+def test_zones_run_from_one_timer(test_gcodes_dir):
+    from sim.klipper import SimKlipper
+    klipper = SimKlipper(test_gcodes_dir, zones={"top": {"max_temp": 250}})
+    top = klipper.printer.objects["pizza_oven top"]
+    assert top.heater.max_temp == 250 and klipper.heaters.heaters.keys() == {"pizza_oven", "top"}
+    with pytest.raises(klipper.command_error, match="No zone has a program"):
+        klipper.run_script("EXECUTE_PROGRAM ZONE=ALL")
+    with pytest.raises(klipper.command_error, match="not valid for ZONE"):
+        klipper.run_script("ADD_SEGMENT ZONE=bottom TEMP=80 RAMP_TIME=600")
+
+    klipper.run_script("ADD_SEGMENT TEMP=80 RAMP_TIME=600 HOLD_TIME=600\n"
+                       "ADD_SEGMENT ZONE=top TEMP=120 RAMP_TIME=600 HOLD_TIME=1200")
+    timers = len(klipper.reactor._timers)
+    klipper.run_script("EXECUTE_PROGRAM ZONE=all")  # ZONE= ignores case like other parameters
+    assert len(klipper.reactor._timers) == timers  # Both zones step from the shared timer
+    assert klipper.oven.program._start_time == top.program._start_time
+    klipper.advance(900)
+    status = klipper.get_object_status("pizza_oven")
+    assert status["target"] == 80 and klipper.get_object_status("pizza_oven top")["target"] == 120
+    assert klipper.models["pizza_oven top"].temp > klipper.model.temp + 20
+    zones = status["zones"]
+    assert list(zones) == ["pizza_oven", "top"] and zones["top"]["state"] == "running"
+    assert zones["top"]["progress"] == pytest.approx(900 / 1800, abs=1e-3)
+    assert (test_gcodes_dir / (oven.CHECKPOINT_FILE % "pizza_oven_top")).is_file()
+
+    klipper.run_script("CANCEL_PROGRAM ZONE=Top")  # The other zone keeps running
+    klipper.advance(10)
+    zones = klipper.get_object_status("pizza_oven")["zones"]
+    assert zones["top"]["state"] == "cancelled" and zones["pizza_oven"]["state"] == "running"
+    assert klipper.run_until(lambda: not klipper.program_running(), 600)
+    assert klipper.get_object_status("pizza_oven")["zones"]["pizza_oven"]["state"] == "complete"
+
+    from sim.klipper import SimConfigError
+    with pytest.raises(SimConfigError, match="defined twice"):
+        SimKlipper(test_gcodes_dir, zones={"top": {}, "TOP": {}})
@@ -0,0 +1,62 @@
+# tests/test_profiling_api.py
+import pytest
+from httpx import AsyncClient, ASGITransport
+from pathlib import Path
+
+from app.main import app
+from app import settings
+from app.profiling import ProfilingMiddleware
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def profiles_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    return tmp_path
+
+
+async def test_flagged_request_is_profiled(profiles_dir: Path, test_gcodes_dir: Path):
+    """
+    Only requests with the header or query flag produce a .prof file.
+    """
+    transport = ASGITransport(app=ProfilingMiddleware(app, max_files=5))
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        assert (await ac.get("/api/gcodes/")).status_code == 200
+        assert list(profiles_dir.glob("*.prof")) == []
+
+        assert (await ac.get("/api/gcodes/", headers={"X-Profile": "1"})).status_code == 200
+        assert (await ac.get("/api/gcodes/?__profile=1")).status_code == 200
+
+    assert len(list(profiles_dir.glob("*.prof"))) == 2
+
+
+async def test_profile_ring_is_bounded(profiles_dir: Path, test_gcodes_dir: Path):
+    """
+    Older profiles are dropped once the ring is full.
+    """
+    transport = ASGITransport(app=ProfilingMiddleware(app, max_files=2))
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        for _ in range(4):
+            await ac.get("/api/gcodes/", headers={"X-Profile": "1"})
+
+    assert len(list(profiles_dir.glob("*.prof"))) == 2
+
+
+async def test_list_and_download_profiles(client: AsyncClient, profiles_dir: Path):
+    """
+    Tests listing stored profiles and downloading one of them.
+    """
+    (profiles_dir / "1000_GET_api_gcodes.prof").write_bytes(b"data")
+
+    response = await client.get("/api/profiling/")
+    assert response.status_code == 200
+    files = response.json()["files"]
+    assert [f["name"] for f in files] == ["1000_GET_api_gcodes.prof"]
+
+    response = await client.get("/api/profiling/1000_GET_api_gcodes.prof")
+    assert response.status_code == 200
+    assert response.content == b"data"
+
+    response = await client.get("/api/profiling/missing.prof")
+    assert response.status_code == 404
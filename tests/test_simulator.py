@@ -0,0 +1,143 @@
+# tests/test_simulator.py
+import json
+import pytest
+from httpx import AsyncClient, ASGITransport
+from pathlib import Path
+from async_asgi_testclient import TestClient
+
+from app.main import app
+from app.dependencies import get_http_client
+from sim.moonraker import create_app
+
+pytestmark = pytest.mark.asyncio
+
+PROFILE = """; METADATA: {"name": "sim", "type": "annealing"}
+ADD_SEGMENT TEMP=80 RAMP_TIME=600 HOLD_TIME=3600
+ADD_SEGMENT TEMP=50 RAMP_TIME=300 HOLD_TIME=0
+EXECUTE_PROGRAM
+"""
+
+
+async def test_replay_program_in_accelerated_time(sim_klipper, test_gcodes_dir: Path):
+    """
+    A 75-minute program runs to completion on the simulated oven and tracks the setpoint.
+    """
+    (test_gcodes_dir / "oven_sim.gcode").write_text(PROFILE)
+    sim_klipper.run_script('SDCARD_PRINT_FILE FILENAME="oven_sim.gcode"')
+
+    assert sim_klipper.run_until(lambda: sim_klipper.print_stats.state == "complete", 10)
+    sim_klipper.advance(1800)
+    assert sim_klipper.model.temp == pytest.approx(80, abs=1)
+
+    assert sim_klipper.run_until(lambda: not sim_klipper.program_running(), 4 * 3600)
+    assert sim_klipper.state == "ready"
+    status = sim_klipper.get_object_status("pizza_oven")
+    assert status["target"] == 0
+
+    # The status has the newest sample only; GET_TELEMETRY reports the whole
+    # run, decimated; segments 0..3 (ramp, hold, cooling ramp, end)
+    assert set(status["telemetry"]) == {"time", "temperature", "setpoint", "segment", "power"}
+    responses = []
+    sim_klipper.add_gcode_listener(responses.append)
+    sim_klipper.run_script("GET_TELEMETRY")
+    sim_klipper.remove_gcode_listener(responses.append)
+    telemetry = json.loads(responses[-1].split("telemetry: ", 1)[1])
+    assert 0 < len(telemetry["time"]) < 4 * 3600
+    assert telemetry["time"] == sorted(telemetry["time"])
+    assert set(telemetry["segment"]) <= {0, 1, 2, 3} and max(telemetry["setpoint"]) == 80
+
+
+async def test_app_http_flows_against_simulator(sim_klipper, client: AsyncClient, test_gcodes_dir: Path):
+    """
+    Temperatures, console and profile start go through real HTTP to the simulator.
+    """
+    (test_gcodes_dir / "oven_sim.gcode").write_text(PROFILE)
+    transport = ASGITransport(app=create_app(sim_klipper, speed=0))
+    async with AsyncClient(transport=transport, base_url="http://sim") as sim_client:
+        app.dependency_overrides[get_http_client] = lambda: sim_client
+        try:
+            response = await client.post("/api/gcodes/start", json={"name": "sim"})
+            assert response.status_code == 200
+            sim_klipper.advance(300)
+
+            temps = (await client.get("/api/temps")).json()
+            assert temps["pizza_oven"]["target"] > 25
+            assert temps["pizza_oven"]["actual"] > 25
+
+            status = (await client.get("/api/printer/status_ext")).json()
+            assert status["state"] == "complete"
+            # The file is done, the program is not: progress and ETA come from the oven module
+            program = status["program"]
+            assert program["state"] == "running" and program["segment"] == 0 and program["phase"] == "ramp"
+            assert status["elapsed_s"] == pytest.approx(299, abs=2) and status["eta_s"] == pytest.approx(4500 - 299, abs=2)
+            assert status["progress"] == pytest.approx(299 / 4500, abs=1e-3)
+
+            response = await client.post("/api/console/send", json={"script": "ADD_SEGMENT TEMP=100"})
+            assert response.status_code == 400
+        finally:
+            app.dependency_overrides.clear()
+
+
+async def test_websocket_proxy_against_simulator(moonraker_sim: str):
+    """
+    The WebSocket proxy forwards JSON-RPC to the simulator and relays its answers;
+    runs over TCP and over a Unix socket (KLIPPER_API_URL=unix:...).
+    """
+    async with TestClient(app) as client:
+        response = await client.get("/api/temps")
+        assert response.status_code == 200
+        assert "pizza_oven" in response.json()
+
+        async with client.websocket_connect("/websocket") as ws:
+            await ws.send_text(json.dumps({
+                "jsonrpc": "2.0", "method": "printer.objects.subscribe",
+                "params": {"objects": {"pizza_oven": None, "print_stats": None}}, "id": 1,
+            }))
+            response = json.loads(await ws.receive_text())
+            assert response["id"] == 1
+            assert "temperature" in response["result"]["status"]["pizza_oven"]
+
+            await ws.send_text(json.dumps({"jsonrpc": "2.0", "method": "printer.gcode.script",
+                                           "params": {"script": "FOO"}, "id": 2}))
+            messages = [json.loads(await ws.receive_text()) for _ in range(2)]
+            assert {"jsonrpc": "2.0", "result": "ok", "id": 2} in messages
+            assert any(m.get("method") == "notify_gcode_response" for m in messages)
+
+
+async def test_dead_heater_trips_the_heating_check(sim_klipper):
+    """
+    A heater that stops delivering power mid-ramp shuts the printer down once
+    the estimated rate stayed too low for the grace period.
+    """
+    sim_klipper.run_script("ADD_SEGMENT TEMP=150 RAMP_TIME=1800 HOLD_TIME=600\nEXECUTE_PROGRAM")
+    sim_klipper.advance(600)
+    assert sim_klipper.state == "ready"
+
+    sim_klipper.heaters.heaters["pizza_oven"].controller.power = lambda target, temp: 0.
+    failed_at = sim_klipper.now
+    assert sim_klipper.run_until(lambda: sim_klipper.state == "shutdown", 600)
+    assert sim_klipper.state_message == "Oven not heating at expected rate."
+    assert 60 <= sim_klipper.now - failed_at <= 180
+
+
+async def test_zones_in_temps_and_status(client: AsyncClient, test_gcodes_dir: Path):
+    """
+    Every [pizza_oven <zone>] heater is listed by /api/temps; status_ext reports the zones.
+    """
+    from sim.klipper import SimKlipper
+    sim_klipper = SimKlipper(test_gcodes_dir, zones={"top": {}, "bottom": {}})
+    sim_klipper.run_script("ADD_SEGMENT ZONE=top TEMP=100 RAMP_TIME=600\nEXECUTE_PROGRAM ZONE=top")
+    sim_klipper.advance(300)
+    transport = ASGITransport(app=create_app(sim_klipper, speed=0))
+    async with AsyncClient(transport=transport, base_url="http://sim") as sim_client:
+        app.dependency_overrides[get_http_client] = lambda: sim_client
+        try:
+            temps = (await client.get("/api/temps")).json()
+            assert {"pizza_oven", "pizza_oven top", "pizza_oven bottom"} <= set(temps)
+            assert temps["pizza_oven top"]["target"] > 25 and temps["pizza_oven bottom"]["target"] == 0
+
+            zones = (await client.get("/api/printer/status_ext")).json()["zones"]
+            assert list(zones) == ["pizza_oven", "top", "bottom"]
+            assert zones["top"]["state"] == "running" and zones["bottom"]["state"] == "idle"
+        finally:
+            app.dependency_overrides.clear()
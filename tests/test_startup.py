@@ -0,0 +1,80 @@
+# tests/test_startup.py
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import httpx
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from pathlib import Path
+
+from app.main import DEFERRED_ROUTERS
+from app.startup import LazyRouters, StartupMiddleware
+from loadtest.harness import free_port
+
+pytestmark = pytest.mark.asyncio
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+async def test_deferred_router_loads_on_first_request(klipper_environ: Path):
+    """
+    A deferred router is not included until a request hits its prefix.
+    """
+    app = FastAPI()
+    app.add_middleware(StartupMiddleware)
+    app.state.lazy_routers = LazyRouters(app, {"/api/installer": "installer"}, "app.routers")
+    assert not any(getattr(r, "path", "").startswith("/api/installer") for r in app.routes)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/api/installer/status")
+        assert response.status_code == 200
+        assert "installed" in response.json()
+
+    assert app.state.lazy_routers.pending == {}
+
+
+async def test_startup_report(client: AsyncClient):
+    """
+    The start-up report lists the import and app creation phases in order.
+    """
+    response = await client.get("/api/system/startup")
+    assert response.status_code == 200
+    phases = [p["name"] for p in response.json()["phases"]]
+    assert phases.index("fastapi imported") < phases.index("core routers imported") < phases.index("app created")
+
+
+async def test_display_served_before_deferred_startup(tmp_path: Path):
+    """
+    With FAST_START the first /display is served by a fresh process while the
+    deferred routers are still waiting for their warm-up.
+    """
+    port = free_port()
+    env = dict(os.environ, FAST_START="1", FAST_START_WARMUP_DELAY="60", GCODES_DIR=str(tmp_path / "gcodes"),
+               CONFIG_DIR=str(tmp_path / "config"), ASSETS_BUILD_DIR=str(tmp_path / "assets"),
+               JOB_QUEUE_FILE=str(tmp_path / "queue.json"), KLIPPER_API_URL=f"http://127.0.0.1:{free_port()}")
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=10) as http:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    response = await http.get("/display")
+                    break
+                except httpx.TransportError:
+                    assert time.monotonic() < deadline and proc.poll() is None, "app did not start"
+                    await asyncio.sleep(0.05)
+            assert response.status_code == 200
+
+            report = (await http.get("/api/system/startup")).json()
+            assert report["deferred_routers"] == sorted(DEFERRED_ROUTERS)
+            phases = [p["name"] for p in report["phases"]]
+            assert phases.index("ready to serve") < phases.index("/display served")
+            assert "first request served (/display)" in phases
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
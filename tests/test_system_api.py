@@ -54,4 +54,36 @@ async def test_get_system_host_info(client: AsyncClient):
         interface = network_info[0]
         assert "name" in interface
         assert "ip_address" in interface
-        assert "type" in interface
\ No newline at end of file
+        assert "type" in interface
+
+async def test_system_host_served_from_sampler(client: AsyncClient, monkeypatch: pytest.MonkeyPatch):
+    """
+    Testuje, že /api/system/host vrací poslední vzorek a historie obsahuje všechny vzorky.
+    """
+    from app.main import app
+    from app.host_stats import HostSampler
+
+    monkeypatch.setattr("app.host_stats._get_throttled", lambda: None)  # Bez firmwaru Raspberry Pi
+    sampler = HostSampler(interval=10, history_size=3)
+    for _ in range(5):
+        sampler.sample()
+    app.state.host_sampler = sampler
+    try:
+        response = await client.get("/api/system/host")
+        assert response.status_code == 200
+        assert response.json()["sampled_at"] == sampler.latest["sampled_at"]
+
+        response = await client.get("/api/system/host/history")
+        assert response.status_code == 200
+        data = response.json()
+        # Kruhový buffer drží jen poslední 3 vzorky
+        assert len(data["samples"]["t"]) == 3
+        assert data["samples"]["t"] == sorted(data["samples"]["t"])
+        assert set(data["samples"]) >= {"cpu_temp_c", "mem_used_kb", "throttled"}
+        # Neznámý stav throttlingu chybí v historii, není to nula
+        assert data["samples"]["throttled"] == [None, None, None]
+
+        response = await client.get("/api/system/host/history", params={"points": 2})
+        assert len(response.json()["samples"]["t"]) == 2
+    finally:
+        del app.state.host_sampler
@@ -43,4 +43,65 @@ async def test_websocket_proxy():
     finally:
         moonraker_server.close()
         await moonraker_server.wait_closed()
-        settings.KLIPPER_API_URL = original_url
\ No newline at end of file
+        settings.KLIPPER_API_URL = original_url
+
+async def gcode_moonraker_server(websocket):
+    """
+    Moonraker, který na G-code odpovídá až po zprávě "release".
+    """
+    import json
+    held = []
+    try:
+        async for message in websocket:
+            request = json.loads(message)
+            if request.get("method") == "release":
+                for request_id in held:
+                    await websocket.send(json.dumps({"jsonrpc": "2.0", "result": "ok", "id": request_id}))
+                held.clear()
+            else:
+                held.append(request["id"])
+    except websockets.exceptions.ConnectionClosed:
+        pass
+
+async def test_websocket_gcode_admission():
+    """
+    G-code přes WebSocket nad limit souběžných skriptů dostane JSON-RPC chybu 429.
+    """
+    import json
+    from app.admission import GcodeAdmission
+
+    moonraker_server = await websockets.serve(gcode_moonraker_server, "127.0.0.1", 0)
+    moonraker_port = moonraker_server.sockets[0].getsockname()[1]
+    original_url = settings.KLIPPER_API_URL
+    original_admission = app.state.gcode_admission
+    settings.KLIPPER_API_URL = f"http://127.0.0.1:{moonraker_port}"
+    app.state.gcode_admission = admission = GcodeAdmission(rate=100, burst=100, max_in_flight=2)
+
+    def gcode(request_id, script="G28"):
+        return json.dumps({"jsonrpc": "2.0", "method": "printer.gcode.script", "params": {"script": script}, "id": request_id})
+
+    try:
+        async with TestClient(app) as client:
+            async with client.websocket_connect("/websocket") as ws:
+                await ws.send_text(gcode(1))
+                await ws.send_text(gcode(2))
+                await ws.send_text(gcode(3))
+                rejected = json.loads(await ws.receive_text())
+                assert rejected["id"] == 3 and rejected["error"]["code"] == 429
+                assert rejected["error"]["data"]["reason"] == "overloaded"
+
+                # Nouzové zastavení projde i při plné frontě
+                await ws.send_text(gcode(4, "M112"))
+                await ws.send_text(json.dumps({"jsonrpc": "2.0", "method": "release", "id": 5}))
+                ids = {json.loads(await ws.receive_text())["id"] for _ in range(3)}
+                assert ids == {1, 2, 4}
+                assert admission.in_flight == 0
+
+        metrics = admission.metrics()
+        assert metrics["accepted"] == {"websocket": 3}
+        assert metrics["rejected"] == {"websocket:overloaded": 1}
+    finally:
+        app.state.gcode_admission = original_admission
+        moonraker_server.close()
+        await moonraker_server.wait_closed()
+        settings.KLIPPER_API_URL = original_url